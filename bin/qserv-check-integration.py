@@ -43,6 +43,9 @@ from lsst.qserv.admin import commons
 from lsst.qserv.admin import logger
 from lsst.qserv.tests import benchmark
 from lsst.qserv.tests import dataCustomizer
+from lsst.qserv.tests import loadScheduler
+from lsst.qserv.tests import timingBaseline
+from lsst.qserv.tests.sql.resultWriter import QueryError
 
 _LOG = logging.getLogger()
 
@@ -84,6 +87,40 @@ def _parse_args():
     group.add_argument("-l", "--load", action="store_true", dest="load_data",
                        default=False,
                        help="Load test dataset prior to query execution")
+    group.add_argument("-L", "--incremental", action="store_true",
+                       dest="incremental", default=False,
+                       help="With --load, only load tables whose input data, "
+                       "schema or configuration changed since previous load, "
+                       "or which were not loaded because of a failure")
+    group.add_argument("-J", "--load-jobs", type=int, dest="load_jobs",
+                       default=loadScheduler.LOAD_JOBS,
+                       help="Maximum number of tables loaded simultaneously, "
+                       "default is %(default)s, the first table is loaded "
+                       "alone and partitioned tables are always loaded after "
+                       "their director")
+    group.add_argument("--loader", dest="loader", choices=benchmark.LOADERS,
+                       default='qserv-data-loader',
+                       help="Qserv loader, 'qserv-data-loader' runs the "
+                       "user-friendly loader for each table, 'ingest' uses "
+                       "the ingest HTTP API of the replication system, whose "
+                       "URL is read from option 'url' of section 'ingest' in "
+                       "qserv.conf")
+    group.add_argument("--in-process-loader", action="store_true",
+                       dest="in_process_loader", default=False,
+                       help="Call user-friendly loader Python API in-process, "
+                       "sharing wmgr and CSS connections between tables, "
+                       "instead of running qserv-data-loader.py for each table")
+    group.add_argument("--stream-chunks", action="store_true",
+                       dest="stream_chunks", default=False,
+                       help="Stream chunks of duplicated tables to the loader "
+                       "through a named pipe, instead of concatenating them "
+                       "into a file")
+    group.add_argument("--stream-input", action="store_true",
+                       dest="stream_input", default=False,
+                       help="Decompress compressed input data files into a "
+                       "named pipe read by the loader, instead of on disk, "
+                       "for all tables in mysql mode and for non-partitioned "
+                       "tables in single-node qserv mode")
 
     default_testdata_dir = None
     if os.environ.get('QSERV_TESTDATA_DIR') is not None:
@@ -111,6 +148,57 @@ def _parse_args():
     group.add_argument("-s", "--stop-at-query", type=int, dest="stop_at_query",
                        default=benchmark.MAX_QUERY,
                        help="Stop at query with given number")
+    group.add_argument("-e", "--executor", dest="executor",
+                       choices=benchmark.EXECUTORS, default='mysql-client',
+                       help="Query executor, 'mysql-client' launches a mysql "
+                       "client per query, 'pooled' reuses in-process connections")
+    group.add_argument("-k", "--keep-going", action="store_true",
+                       dest="keep_going", default=False,
+                       help="Record failing queries as failed and run "
+                       "following ones, instead of aborting the run")
+    group.add_argument("-P", "--parallel", type=int, dest="parallel",
+                       default=1,
+                       help="Number of queries running simultaneously, "
+                       "longest queries of previous run are launched first")
+    group.add_argument("-M", "--concurrent-modes", action="store_true",
+                       dest="concurrent_modes", default=False,
+                       help="Run queries for all modes at the same time")
+    group.add_argument("-A", "--async-inflight", type=int, dest="async_inflight",
+                       default=0,
+                       help="In qserv_async mode, submit queries without waiting "
+                       "for previous ones, with at most this number of detached "
+                       "queries running simultaneously, 0 disables pipelining")
+
+    group.add_argument("-R", "--result-cache", action="store_true",
+                       dest="use_cache", default=False,
+                       help="Restore mysql results from cache when dataset and "
+                       "queries did not change since last run, mysql data are "
+                       "then neither loaded nor queried")
+    group.add_argument("--no-outputs", action="store_false", dest="keep_outputs",
+                       default=True,
+                       help="Do not store query results, only their digests, "
+                       "results are then compared using digests only")
+
+    group = parser.add_argument_group('Benchmark options',
+                                      'Options related to query timing')
+    group.add_argument("-n", "--iterations", type=int, dest="iterations",
+                       default=0,
+                       help="Run each query this number of times and compute "
+                       "timing statistics, 0 runs each query once without statistics")
+    group.add_argument("-w", "--warmup", type=int, dest="warmup",
+                       default=0,
+                       help="Number of untimed executions of each query before "
+                       "timed iterations")
+    group.add_argument("-b", "--baseline", dest="baseline", default=None,
+                       help="Timing baseline file to check timings against")
+    group.add_argument("-B", "--save-baseline", dest="save_baseline",
+                       default=None,
+                       help="Store timings in this file, to be used as baseline")
+    group.add_argument("-r", "--regression-threshold", type=float,
+                       dest="regression_threshold",
+                       default=timingBaseline.DEFAULT_THRESHOLD,
+                       help="Relative slowdown of median query time reported as "
+                       "a regression")
 
     group = parser.add_argument_group('Input dataset customization options',
                                       ('Options related to input data set customization'
@@ -138,6 +226,20 @@ def _parse_args():
     group.add_argument("-U", "--username", dest="username",
                        default=None,
                        help="rsync username")
+    group.add_argument("--download-jobs", type=int, dest="download_jobs",
+                       default=dataCustomizer.DOWNLOAD_JOBS,
+                       help="Maximum number of big datasets downloaded "
+                       "simultaneously")
+    group.add_argument("--download-cache", dest="download_cache",
+                       default=None,
+                       help="Directory where downloaded big datasets are "
+                       "stored by checksum and reused by all custom cases, "
+                       "default is <WORK_DIR>/" + dataCustomizer.DOWNLOAD_CACHE_DIR)
+    group.add_argument("--link", action="store_true", dest="link",
+                       default=False,
+                       help="Create custom case with reflinks, hard links or "
+                       "symbolic links to source dataset files, instead of "
+                       "copying them, description.yaml is still copied")
 
     args = parser.parse_args()
 
@@ -167,20 +269,34 @@ def _parse_args():
     return args
 
 
-def _run_integration_test(case_id, testdata_dir, out_dir, mode_list,
-                          multi_node, load_data, stop_at_query):
+def _run_integration_test(args, multi_node):
     """ Run integration tests, eventually perform data-loading and query results
     comparison
-    @param case_id: test case number
-    @param testdata_dir: directory containing test datasets
-    @param out_dir: directory containing query results
-    @param mode_list: run test for Qserv, MySQL or both
+    @param args: parsed command-line arguments, with test case number,
+                 datasets and results directories, modes, data-loading and
+                 query execution options
     @param multi_node: run test in multi-node setup
-    @param load_data: load data before running queries
-    @param stop_at_query: run queries between 0 and it
     """
-    bench = benchmark.Benchmark(case_id, multi_node, testdata_dir, out_dir)
-    bench.run(mode_list, load_data, stop_at_query)
+    case_id = args.case_id
+    mode_list = args.mode
+    bench = benchmark.Benchmark(case_id, multi_node, args.testdata_dir,
+                                args.out_dir, executor=args.executor,
+                                keep_outputs=args.keep_outputs,
+                                stream_chunks=args.stream_chunks,
+                                loader=args.loader,
+                                in_process_loader=args.in_process_loader,
+                                stream_input=args.stream_input,
+                                keep_going=args.keep_going)
+    try:
+        bench.run(mode_list, args.load_data, args.stop_at_query,
+                  parallel=args.parallel, concurrent_modes=args.concurrent_modes,
+                  async_inflight=args.async_inflight, iterations=args.iterations,
+                  warmup=args.warmup, use_cache=args.use_cache,
+                  incremental=args.incremental, load_jobs=args.load_jobs)
+    except QueryError as exc:
+        _LOG.fatal("Test case #%s aborted, %s, use --keep-going to run "
+                   "following queries", case_id, exc)
+        return 1
 
     return_code = 1
     if len(mode_list) > 1:
@@ -191,7 +307,7 @@ def _run_integration_test(case_id, testdata_dir, out_dir, mode_list,
             return_code = 0
         else:
             _LOG.fatal("Test case #%s failed", case_id)
-            if not load_data:
+            if not args.load_data:
                 _LOG.warn("Please check that case%s data are loaded, " +
                           "otherwise run %s with --load option.",
                           case_id,
@@ -200,6 +316,14 @@ def _run_integration_test(case_id, testdata_dir, out_dir, mode_list,
     else:
         _LOG.info("No result comparison")
         return_code = 0
+
+    if args.iterations > 0:
+        if args.baseline:
+            if bench.checkTimings(args.baseline, args.regression_threshold):
+                _LOG.fatal("Test case #%s has timing regressions", case_id)
+                return_code = 1
+        if args.save_baseline:
+            bench.saveTimings(args.save_baseline)
     return return_code
 
 # -----------------------
@@ -220,15 +344,15 @@ def main():
                                                    args.work_dir,
                                                    args.do_download,
                                                    args.custom_case_id,
-                                                   args.username)
+                                                   args.username,
+                                                   args.download_jobs,
+                                                   args.download_cache,
+                                                   args.link)
 
         customizer.run()
 
     else:
-        ret_code = _run_integration_test(args.case_id, args.testdata_dir,
-                                         args.out_dir, args.mode,
-                                         multi_node,
-                                         args.load_data, args.stop_at_query)
+        ret_code = _run_integration_test(args, multi_node)
 
     sys.exit(ret_code)
 
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Convert input data of an integration test case into typed, memory-mapped
+columns, read by DataConfig.getColumn()
+"""
+
+from __future__ import absolute_import, division, print_function
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import argparse
+import logging
+import os
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import columnCache
+from lsst.qserv.tests.dataConfig import DataConfig
+
+_LOG = logging.getLogger()
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+
+def _parse_args():
+
+    parser = argparse.ArgumentParser(
+        description="Convert input data files of one Qserv integration test "
+        "case into columns stored as .npy files, typed from table schemas. "
+        "Tables already converted from current input data are skipped.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser = logger.add_logfile_opt(parser)
+
+    default_testdata_dir = None
+    if os.environ.get('QSERV_TESTDATA_DIR') is not None:
+        default_testdata_dir = os.path.join(
+            os.environ.get('QSERV_TESTDATA_DIR'), "datasets"
+        )
+
+    parser.add_argument("-i", "--case-id", dest="case_id",
+                        default="01",
+                        help="Test case number")
+    parser.add_argument("-t", "--testdata-dir", dest="testdata_dir",
+                        default=default_testdata_dir,
+                        help="Absolute path to directory containing test "
+                        "datasets, default is QSERV_TESTDATA_DIR/datasets/")
+    parser.add_argument("-c", "--cache-dir", dest="cache_dir", default=None,
+                        help="Cache directory, default is a directory named "
+                        "after test case in " + columnCache.COLUMN_CACHE_DIR)
+    parser.add_argument("tables", nargs='*',
+                        help="Tables to convert, default is all tables with "
+                        "input data")
+
+    args = parser.parse_args()
+
+    # Configure logger
+    logger.setup_logging(args.log_conf)
+
+    return args
+
+# -----------------------
+# Exported definitions --
+# -----------------------
+
+
+def main():
+
+    args = _parse_args()
+
+    dataConfig = DataConfig(os.path.join(args.testdata_dir,
+                                         "case" + args.case_id, "data"))
+    cache = dataConfig.getColumnCache(args.cache_dir)
+    tables = args.tables
+    if not tables:
+        tables = [table for table in dataConfig.orderedTables
+                  if dataConfig.getInputDataFile(table) and
+                  os.path.exists(dataConfig.getInputDataFile(table))]
+    for table in tables:
+        if cache.build(table):
+            _LOG.info("Table %s: %s rows cached", table, cache.rows(table))
+
+
+if __name__ == '__main__':
+    main()
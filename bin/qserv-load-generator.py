@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Replay queries of an integration test case from concurrent clients, at
+increasing concurrency levels, and report throughput and latencies
+
+Test case data must have been loaded before, e.g. with
+qserv-check-integration.py --load.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import argparse
+import logging
+import os
+import sys
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+import lsst.log
+from lsst.qserv.admin import commons
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import benchmark
+from lsst.qserv.tests import loadGenerator
+
+_LOG = logging.getLogger()
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+
+def _parse_concurrency(value):
+    try:
+        steps = [int(v) for v in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid concurrency list: " + value)
+    if not steps or min(steps) < 1:
+        raise argparse.ArgumentTypeError("concurrency must be positive: " + value)
+    return steps
+
+
+def _parse_args():
+
+    # used to get default values
+    config = commons.read_user_config()
+
+    parser = argparse.ArgumentParser(
+        description="Replay queries of one Qserv integration test case from "
+        "concurrent closed-loop clients, at increasing concurrency levels, "
+        "and report throughput and latency percentiles for each level. "
+        "Configuration values are read from ~/.lsst/qserv.conf.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser = logger.add_logfile_opt(parser)
+
+    default_testdata_dir = None
+    if os.environ.get('QSERV_TESTDATA_DIR') is not None:
+        default_testdata_dir = os.path.join(
+            os.environ.get('QSERV_TESTDATA_DIR'), "datasets"
+        )
+
+    parser.add_argument("-i", "--case-id", dest="case_id",
+                        default="01",
+                        help="Test case number")
+    parser.add_argument("-m", "--mode", dest="mode", choices=benchmark.MODES,
+                        default='qserv',
+                        help="Qserv test mode (direct mysql, qserv, or qserv "
+                        "in async mode)")
+    parser.add_argument("-t", "--testdata-dir", dest="testdata_dir",
+                        default=default_testdata_dir,
+                        help="Absolute path to directory containing test "
+                        "datasets, default is QSERV_TESTDATA_DIR/datasets/")
+    parser.add_argument("-o", "--out-dir", dest="out_dir",
+                        default=config['qserv']['tmp_dir'],
+                        help="Absolute path to directory for storing results "
+                        "in <OUT_DIR>/qservTest_case<CASE_ID>/load_<MODE>.{json,csv}")
+    parser.add_argument("-s", "--stop-at-query", type=int, dest="stop_at_query",
+                        default=benchmark.MAX_QUERY,
+                        help="Only use queries up to this number")
+    parser.add_argument("-e", "--executor", dest="executor",
+                        choices=benchmark.EXECUTORS, default='mysql-client',
+                        help="Query executor, 'mysql-client' launches a mysql "
+                        "client per query, 'pooled' reuses in-process connections")
+    parser.add_argument("-c", "--concurrency", type=_parse_concurrency,
+                        dest="concurrency", default=None,
+                        help="Comma-separated list of concurrency levels, "
+                        "default is 1, 2, 4, ... up to --max-concurrency")
+    parser.add_argument("-C", "--max-concurrency", type=int,
+                        dest="max_concurrency", default=64,
+                        help="Highest concurrency level")
+    parser.add_argument("-d", "--duration", type=float, dest="duration",
+                        default=60.,
+                        help="Duration of each concurrency level, in seconds")
+    parser.add_argument("-x", "--mix", dest="mix", default=None,
+                        help="YAML file with query weights, by default all "
+                        "queries have the same weight")
+    parser.add_argument("-S", "--seed", type=int, dest="seed", default=None,
+                        help="Seed for random query choice")
+
+    args = parser.parse_args()
+
+    # Configure logger
+    logger.setup_logging(args.log_conf)
+
+    # configure log4cxx logging based on the logging level of Python logger
+    levels = {logging.ERROR: lsst.log.ERROR,
+              logging.WARNING: lsst.log.WARN,
+              logging.INFO: lsst.log.INFO,
+              logging.DEBUG: lsst.log.DEBUG}
+    lsst.log.setLevel('', levels.get(_LOG.level, lsst.log.DEBUG))
+
+    if args.concurrency is None:
+        args.concurrency = loadGenerator.concurrencySteps(args.max_concurrency)
+
+    return args
+
+# -----------------------
+# Exported definitions --
+# -----------------------
+
+
+def main():
+
+    args = _parse_args()
+
+    multi_node = benchmark.is_multi_node()
+
+    mix = None
+    if args.mix:
+        mix = loadGenerator.loadMix(args.mix)
+
+    bench = benchmark.Benchmark(args.case_id, multi_node, args.testdata_dir,
+                                args.out_dir, executor=args.executor)
+    dbName = "qservTest_case%s_%s" % (args.case_id,
+                                      'qserv' if args.mode == 'qserv_async' else args.mode)
+    results = bench.loadSweep(args.mode, dbName, args.concurrency,
+                              args.duration, mix, args.stop_at_query,
+                              seed=args.seed)
+
+    ret_code = 0
+    if any(r['failed'] for r in results):
+        _LOG.warn("Some queries failed during load test")
+        ret_code = 1
+    sys.exit(ret_code)
+
+
+if __name__ == '__main__':
+    main()
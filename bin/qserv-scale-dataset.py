@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Write a scaled copy of an integration test case
+
+Scaled case is written in <OUT_DIR>/case<CASE_ID>x<FACTOR>, with the queries
+of original case, and can be loaded and queried like other cases, e.g. with
+qserv-check-integration.py --case=<CASE_ID>x<FACTOR> --testdata-dir=<OUT_DIR>.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+# -------------------------------
+#  Imports of standard modules --
+# -------------------------------
+import argparse
+import logging
+import os
+import shutil
+
+# ----------------------------
+# Imports for other modules --
+# ----------------------------
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import dataScaler
+
+_LOG = logging.getLogger()
+
+# ---------------------------------
+# Local non-exported definitions --
+# ---------------------------------
+
+
+def _parse_args():
+
+    parser = argparse.ArgumentParser(
+        description="Write a copy of one Qserv integration test case where "
+        "each row of partitioned tables is repeated FACTOR times, with "
+        "unique ids and positions moved by at most JITTER degrees.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser = logger.add_logfile_opt(parser)
+
+    default_testdata_dir = None
+    if os.environ.get('QSERV_TESTDATA_DIR') is not None:
+        default_testdata_dir = os.path.join(
+            os.environ.get('QSERV_TESTDATA_DIR'), "datasets"
+        )
+
+    parser.add_argument("-i", "--case-id", dest="case_id",
+                        default="01",
+                        help="Test case number")
+    parser.add_argument("-t", "--testdata-dir", dest="testdata_dir",
+                        default=default_testdata_dir,
+                        help="Absolute path to directory containing test "
+                        "datasets, default is QSERV_TESTDATA_DIR/datasets/")
+    parser.add_argument("-o", "--out-dir", dest="out_dir", required=True,
+                        help="Absolute path to directory for storing scaled "
+                        "case in <OUT_DIR>/case<CASE_ID>x<FACTOR>")
+    parser.add_argument("-f", "--factor", type=int, dest="factor",
+                        default=10,
+                        help="Number of copies of each row of partitioned tables")
+    parser.add_argument("-j", "--jitter", type=float, dest="jitter",
+                        default=dataScaler.JITTER,
+                        help="Maximum offset of positions in copies, in degrees")
+    parser.add_argument("-S", "--seed", type=int, dest="seed", default=0,
+                        help="Seed of position offsets")
+
+    args = parser.parse_args()
+
+    # Configure logger
+    logger.setup_logging(args.log_conf)
+
+    return args
+
+# -----------------------
+# Exported definitions --
+# -----------------------
+
+
+def main():
+
+    args = _parse_args()
+
+    caseDir = os.path.join(args.testdata_dir, "case" + args.case_id)
+    outDir = os.path.join(args.out_dir, "case%sx%s" % (args.case_id, args.factor))
+
+    scaler = dataScaler.DataScaler(os.path.join(caseDir, "data"),
+                                   jitter=args.jitter, seed=args.seed)
+    scaler.scale(os.path.join(outDir, "data"), args.factor)
+    shutil.copytree(os.path.join(caseDir, "queries"),
+                    os.path.join(outDir, "queries"))
+    _LOG.info("Scaled case written in %s", outDir)
+
+
+if __name__ == '__main__':
+    main()
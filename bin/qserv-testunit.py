@@ -30,8 +30,29 @@ from __future__ import absolute_import, division, print_function
 import sys
 import unittest
 
+from lsst.qserv.tests.unittest import testBenchmark
+from lsst.qserv.tests.unittest import testCmd
+from lsst.qserv.tests.unittest import testColumnCache
 from lsst.qserv.tests.unittest import testDataConfig
 from lsst.qserv.tests.unittest import testDataCustomizer
+from lsst.qserv.tests.unittest import testDataRows
+from lsst.qserv.tests.unittest import testDataScaler
+from lsst.qserv.tests.unittest import testDataStream
+from lsst.qserv.tests.unittest import testDbLoader
+from lsst.qserv.tests.unittest import testExternalSort
+from lsst.qserv.tests.unittest import testIngestLoader
+from lsst.qserv.tests.unittest import testInputStaging
+from lsst.qserv.tests.unittest import testLoadGenerator
+from lsst.qserv.tests.unittest import testLoadScheduler
+from lsst.qserv.tests.unittest import testLoadState
+from lsst.qserv.tests.unittest import testPoller
+from lsst.qserv.tests.unittest import testPooledCmd
+from lsst.qserv.tests.unittest import testQueryCorpus
+from lsst.qserv.tests.unittest import testQueryReport
+from lsst.qserv.tests.unittest import testResultCache
+from lsst.qserv.tests.unittest import testResultComparator
+from lsst.qserv.tests.unittest import testResultDigest
+from lsst.qserv.tests.unittest import testTimingBaseline
 
 from lsst.qserv.admin import logger
 
@@ -39,7 +60,13 @@ if __name__ == '__main__':
 
     logger.setup_logging(logger.get_default_log_conf())
 
-    modules = [testDataConfig, testDataCustomizer]
+    modules = [testBenchmark, testCmd, testColumnCache, testDataConfig,
+               testDataCustomizer, testDataRows, testDataScaler,
+               testDataStream, testDbLoader, testExternalSort,
+               testIngestLoader, testInputStaging, testLoadGenerator,
+               testLoadScheduler, testLoadState, testPoller, testPooledCmd,
+               testQueryCorpus, testQueryReport, testResultCache,
+               testResultComparator, testResultDigest, testTimingBaseline]
 
     retcode = 0
     for m in modules:
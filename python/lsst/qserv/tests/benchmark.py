@@ -37,26 +37,56 @@ try:
 except ImportError:
     import ConfigParser as configparser  # python2
 import errno
-from filecmp import dircmp
+import json
 import logging
 import os
-import re
 import shutil
 import stat
 import sys
+import threading
+import time
+
+from concurrent import futures
 
 from lsst.qserv.admin import commons
 from lsst.qserv.admin import dataDuplicator
 from . import dataConfig
+from . import dbLoader
+from . import externalSort
+from . import fileDigest
+from . import ingestLoader
+from . import inputStaging
+from . import loadGenerator
+from . import loadScheduler
+from . import loadState
 from . import mysqlDbLoader
 from . import qservDbLoader
-from .sql import cmd, const
+from . import queryCorpus
+from . import queryReport
+from . import resultCache
+from . import resultComparator
+from . import resultManifest
+from . import timingBaseline
+from .sql import cmd, const, pooledCmd
+from .sql.resultWriter import QueryError, failedStats
 
 # list of possible modes accepted by run() metho
 MODES = ['mysql', 'qserv', 'qserv_async']
 
+# list of possible query executors: 'mysql-client' forks a mysql client
+# per query, 'pooled' runs queries on persistent in-process connections
+EXECUTORS = ['mysql-client', 'pooled']
+
+# list of possible qserv loaders: 'qserv-data-loader' runs the user-friendly
+# loader per table, 'ingest' uses the ingest HTTP API of replication system
+LOADERS = ['qserv-data-loader', 'ingest']
+
 MAX_QUERY = 10000
 
+# modes whose results can be reused from result cache: they only depend on
+# input data and queries
+CACHED_MODES = ['mysql']
+
 _LOG = logging.getLogger(__name__)
 
 def is_multi_node():
@@ -100,10 +130,37 @@ class Benchmark(object):
         Top-level directory for test outputs.
     czar_list: list
         list of czar addresses (czar1.localdomain) that should be updated.
+    executor : str, optional
+        One of EXECUTORS values, defines how queries are sent to servers.
+    keep_outputs : boolean, optional
+        If `False`, query results are not stored, only their digests are
+        kept in per-mode manifests.
+    stream_chunks : boolean, optional
+        If `True`, chunks of duplicated tables are streamed to the loader
+        instead of being concatenated into a file.
+    loader : str, optional
+        One of LOADERS values, defines how data is loaded in qserv.
+    in_process_loader : boolean, optional
+        If `True`, user-friendly loader is called in-process instead of
+        running one loader process per table, it can not be used with
+        `czar_list`.
+    stream_input : boolean, optional
+        If `True`, compressed input data files are decompressed into a named
+        pipe read by the user-friendly loader, instead of being decompressed
+        on disk, for all tables in 'mysql' mode and for non-partitioned
+        tables in single-node 'qserv' mode.
+    keep_going : boolean, optional
+        If `True`, a failing query is recorded as failed and following
+        queries are run, otherwise `QueryError` is raised. Failing queries
+        of load sweeps are always recorded as failed.
     """
 
     def __init__(self, case_id, multi_node, testdata_dir,
-                 out_dirname_prefix=None, czar_list=None):
+                 out_dirname_prefix=None, czar_list=None,
+                 executor='mysql-client', keep_outputs=True,
+                 stream_chunks=False, loader='qserv-data-loader',
+                 in_process_loader=False, stream_input=False,
+                 keep_going=False):
 
         self.config = commons.read_user_config()
 
@@ -112,18 +169,44 @@ class Benchmark(object):
         if czar_list is None:
             czar_list = []
         self._czar_list = czar_list
+        if executor not in EXECUTORS:
+            raise ValueError("unexpected executor: " + str(executor))
+        self._executor = executor
+        self._keepGoing = keep_going
+        if loader not in LOADERS:
+            raise ValueError("unexpected loader: " + str(loader))
+        self._loader = loader
+        if in_process_loader and czar_list:
+            raise ValueError("in-process loader can not update czars")
+        self._inProcessLoader = in_process_loader
+        self._streamInput = stream_input
+        self._stateLock = threading.Lock()
+        self._report = queryReport.QueryReport()
+        self._keepOutputs = keep_outputs
+        self._streamChunks = stream_chunks
+        self._manifests = {}
+        self.timings = None
 
         if not out_dirname_prefix:
             out_dirname_prefix = self.config['qserv']['tmp_dir']
         self._out_dirname = os.path.join(out_dirname_prefix,
                                          "qservTest_case%s" % case_id)
+        self._fileDigests = fileDigest.FileDigests(
+            self._stateFile("file_digests.json"))
+        self._resultCache = resultCache.ResultCache(
+            self._stateFile("result_cache"), self._fileDigests)
 
         dataset_dir = Benchmark.getDatasetDir(testdata_dir, case_id)
         self._in_dirname = os.path.join(dataset_dir, 'data')
 
         self.dataReader = dataConfig.DataConfig(self._in_dirname)
+        self._inputStaging = inputStaging.InputStaging(
+            self.dataReader, os.path.join(self._out_dirname, "staging"))
 
         self._queries_dirname = os.path.join(dataset_dir, "queries")
+        self._corpus = queryCorpus.QueryCorpus(
+            self._queries_dirname, self._stateFile("queries.json"),
+            self.dataReader.orderedTables + self.dataReader.notLoadedTables)
 
         self.dataDuplicator = dataDuplicator.DataDuplicator(self.dataReader,
                                                             self._in_dirname,
@@ -153,7 +236,8 @@ class Benchmark(object):
         dataset_dir = os.path.join(testdata_dir, "case{0}".format(case_id))
         return dataset_dir
 
-    def runQueries(self, mode, dbName, stopAt=MAX_QUERY, qservServer=""):
+    def runQueries(self, mode, dbName, stopAt=MAX_QUERY, qservServer="",
+                   parallel=1, async_inflight=0):
         """Run all queries agains loaded data.
 
         Parameters
@@ -166,159 +250,527 @@ class Benchmark(object):
             Max query number.
         qservServer: str 
             address of the effective qserv master (master.localdomain)
+        parallel : int, optional
+            Number of queries running simultaneously, queries which took
+            longest during previous runs are launched first.
+        async_inflight : int, optional
+            If >0 and mode is 'qserv_async', all queries are submitted
+            without waiting for completion of previous ones, with at most
+            this number of detached queries running simultaneously.
+
+        Raises
+        ------
+        QueryError
+            If a query failed and executor does not keep going, queries which
+            are not started yet are cancelled, and report of completed
+            queries is written.
         """
         _LOG.debug("Running queries : (stop-at: %s)", stopAt)
-        if mode in ('qserv', 'qserv_async'):
-            withQserv = True
-            if not qservServer:
-                sqlInterface = cmd.Cmd(config=self.config,
-                                       mode=const.MYSQL_PROXY,
-                                       database=dbName)
+        withQserv = mode in ('qserv', 'qserv_async')
+        sqlInterface = self._sqlInterface(mode, dbName, qservServer)
+
+        myOutDir = self._outputDir(mode)
+        dbNameDot = dbName + '.'
+        selected, queryRunCount, queryCount = self._selectQueries(stopAt)
+
+        def _run(qFN):
+            _LOG.info("Launch %s mode=%s db=%s", qFN, mode, dbNameDot)
+            record = self._runQuery(sqlInterface, mode, qFN, withQserv,
+                                    dbNameDot, myOutDir)
+            return record['wall_time']
+
+        durations = self._loadDurations(mode)
+        try:
+            if mode == 'qserv_async' and async_inflight > 0:
+                self._runPipelined(sqlInterface, selected, dbNameDot, myOutDir,
+                                   async_inflight, durations)
+            elif parallel > 1:
+                # unknown queries first, then longest ones
+                order = sorted(selected,
+                               key=lambda qFN: -durations.get(qFN, float('inf')))
+                with futures.ThreadPoolExecutor(max_workers=parallel) as pool:
+                    running = dict((pool.submit(_run, qFN), qFN) for qFN in order)
+                    try:
+                        for future in futures.as_completed(running):
+                            durations[running[future]] = future.result()
+                    except QueryError:
+                        cancelled = [f for f in running if f.cancel()]
+                        _LOG.error("Query %s failed, %s queries cancelled",
+                                   running[future], len(cancelled))
+                        # queries already started are completed
+                        for other, qFN in running.items():
+                            if other is not future and not other.cancelled():
+                                try:
+                                    durations[qFN] = other.result()
+                                except QueryError as exc:
+                                    _LOG.error("Query %s also failed: %s", qFN, exc)
+                        raise
             else:
-                conf = self.config
-                conf['qserv']['master'] = qservServer
-                _LOG.debug(" conf=%s", conf)
-                sqlInterface = cmd.Cmd(conf,
-                                       mode=const.MYSQL_PROXY,
-                                       database=dbName)
-        elif mode == 'mysql':
-            withQserv = False
-            sqlInterface = cmd.Cmd(config=self.config,
-                                   mode=const.MYSQL_SOCK,
-                                   database=dbName)
-        else:
-            raise ValueError("unexpected mode: " + str(mode))
+                for qFN in selected:
+                    durations[qFN] = _run(qFN)
+        finally:
+            self._saveDurations(mode, durations)
+            self._writeReports(mode)
+
+        _LOG.info("Test case #%s: %s queries launched on a total of %s",
+                  self._case_id, queryRunCount, queryCount)
+
+    def _runQuery(self, sqlInterface, mode, qFN, withQserv, dbNameDot,
+                  outDir):
+        """Run a single query and store its result.
+
+        Parameters
+        ----------
+        sqlInterface : `cmd.Cmd`
+            SQL client
+        mode : str
+            One of MODES values
+        qFN : str
+            Query file name
+        withQserv : bool
+            if `True` then prepare query for QServ, otherwise for mysql.
+        dbNameDot : str
+            Database name followed by a dot
+        outDir : str
+            Directory for query results
+
+        Returns
+        -------
+        Query record, see `QueryReport.add()`.
+        """
+        outFile = self._outputFile(outDir, qFN)
+        pragmas, start, end, stats = self._executeQuery(
+            sqlInterface, mode, qFN, withQserv, dbNameDot, outFile)
+        record = self._record(mode, qFN, pragmas, start, end, stats)
+        self._postProcess(outFile, pragmas)
+        return record
+
+    def _executeQuery(self, sqlInterface, mode, qFN, withQserv, dbNameDot,
+                      outFile):
+        """Execute a single query, without any post-processing of its result.
+
+        Returns
+        -------
+        4-tuple of query pragmas, start and end timestamps, and query
+        statistics returned by `Cmd.execute()`.
+        """
+        qText, pragmas = self._prepareQuery(qFN, withQserv, dbNameDot)
+        #qText += " INTO OUTFILE '%s'" % outFile
+
+        column_names = 'noheader' not in pragmas
+        async_timeout = 0
+        if mode == 'qserv_async':
+            async_timeout = self._asyncTimeout(pragmas)
+        start = time.time()
+        stats = sqlInterface.execute(qText, outFile, column_names,
+                                     async_timeout)
+        return pragmas, start, time.time(), stats
+
+    def benchmarkQueries(self, mode, dbName, iterations, warmup=0,
+                         stopAt=MAX_QUERY, qservServer=""):
+        """Run each query repeatedly and measure its wall time.
 
+        Parameters
+        ----------
+        mode : str
+            One of MODES values
+        dbName : str
+            Database name
+        iterations : int
+            Number of timed executions of each query.
+        warmup : int, optional
+            Number of untimed executions of each query, run first.
+        stopAt : int, optional
+            Max query number.
+        qservServer: str
+            address of the effective qserv master (master.localdomain)
+
+        Returns
+        -------
+        `dict` mapping query file name to list of wall times in seconds.
+        """
+        _LOG.debug("Benchmarking queries : (iterations: %s, warmup: %s)",
+                   iterations, warmup)
+        withQserv = mode in ('qserv', 'qserv_async')
+        sqlInterface = self._sqlInterface(mode, dbName, qservServer)
+        myOutDir = self._outputDir(mode)
+        dbNameDot = dbName + '.'
+        selected, _, _ = self._selectQueries(stopAt)
+
+        samples = {}
+        try:
+            for qFN in selected:
+                _LOG.info("Benchmark %s mode=%s db=%s", qFN, mode, dbNameDot)
+                outFile = self._outputFile(myOutDir, qFN)
+                times = []
+                for i in range(warmup + iterations):
+                    pragmas, start, end, stats = self._executeQuery(
+                        sqlInterface, mode, qFN, withQserv, dbNameDot, outFile)
+                    if i >= warmup:
+                        times.append(end - start)
+                # last execution is the one stored in report and compared
+                self._record(mode, qFN, pragmas, start, end, stats)
+                self._postProcess(outFile, pragmas)
+                samples[qFN] = times
+        finally:
+            self._writeReports(mode)
+        return samples
+
+    def loadSweep(self, mode, dbName, steps, duration, mix=None,
+                  stopAt=MAX_QUERY, qservServer="", seed=None):
+        """Replay the query corpus from closed-loop concurrent clients at
+        increasing concurrency levels.
+
+        Parameters
+        ----------
+        mode : str
+            One of MODES values
+        dbName : str
+            Database name
+        steps : list
+            Concurrency levels, e.g. [1, 2, 4, 8].
+        duration : float
+            Duration of each concurrency level, in seconds.
+        mix : dict, optional
+            Keys are query file names, values are their weights, by default
+            all queries up to stopAt have the same weight.
+        stopAt : int, optional
+            Max query number.
+        qservServer: str
+            address of the effective qserv master (master.localdomain)
+        seed : int, optional
+            Seed of random query choice.
+
+        Returns
+        -------
+        List of step records, see `loadGenerator.LoadGenerator.runStep()`.
+        """
+        withQserv = mode in ('qserv', 'qserv_async')
+        dbNameDot = dbName + '.'
+        selected, _, _ = self._selectQueries(stopAt)
+        queries = dict((qFN, self._prepareQuery(qFN, withQserv, dbNameDot))
+                       for qFN in selected)
+        asyncTimeout = None
+        if mode == 'qserv_async':
+            asyncTimeout = self._asyncTimeout
+
+        generator = loadGenerator.LoadGenerator(
+            lambda: self._sqlInterface(mode, dbName, qservServer, keep_going=True),
+            queries,
+            mix, asyncTimeout, seed)
+        results = generator.sweep(steps, duration)
+        if self._executor == 'pooled':
+            pooledCmd.closePools()
+
+        if not os.path.exists(self._out_dirname):
+            os.makedirs(self._out_dirname)
+        loadGenerator.writeResults(
+            results, os.path.join(self._out_dirname, "load_" + mode))
+        return results
+
+    def _outputFile(self, outDir, qFN):
+        """Return file name for the result of a query.
+        """
+        if not self._keepOutputs:
+            return os.devnull
+        return os.path.join(outDir, qFN.replace('.sql', '.txt'))
+
+    def _record(self, mode, qFN, pragmas, start, end, stats):
+        """Store measurements and result digests of a query execution.
+
+        Returns
+        -------
+        Query record, see `QueryReport.add()`.
+        """
+        with self._stateLock:
+            manifest = self._manifests.setdefault(
+                mode, resultManifest.ResultManifest())
+        manifest.add(qFN, pragmas, stats)
+        return self._report.add(mode, qFN, pragmas, start, end, stats)
+
+    def _manifestFile(self, mode):
+        return os.path.join(self._out_dirname, "manifest_%s.json" % mode)
+
+    def _writeReports(self, mode):
+        """Write query report and result manifest of a mode.
+        """
+        with self._stateLock:
+            self._report.write(self._out_dirname)
+            manifest = self._manifests.get(mode)
+            if manifest is not None:
+                manifest.write(self._manifestFile(mode))
+
+    def _outputDir(self, mode):
+        """Return directory for query results of a mode, create it if needed.
+        """
         myOutDir = os.path.join(self._out_dirname, "outputs", mode)
         if not os.access(myOutDir, os.F_OK):
             os.makedirs(myOutDir)
             # because mysqld will write there
             os.chmod(myOutDir, stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO)
+        return myOutDir
 
-        qDir = self._queries_dirname
-        _LOG.debug("Testing queries from %s", qDir)
-        queries = sorted(os.listdir(qDir))
-        queryCount = 0
-        queryRunCount = 0
-        dbNameDot = dbName + '.'
-        for qFN in queries:
-            queryCount += 1
-            if qFN.endswith(".sql"):
-                queryRunCount += 1
-                if int(qFN[:4]) <= stopAt:
-                    _LOG.info("Launch %s mode=%s db=%s", qFN, mode, dbNameDot)
-                    query_filename = os.path.join(qDir, qFN)
-
-                    qF = open(query_filename, 'r')
-                    qText, pragmas = self._parseFile(qF, withQserv)
-                    # qText needs correct database name inserted.
-                    qText = qText.replace('{DBTAG_A}', dbNameDot)
-                    _LOG.debug("qText=%s", qText)
-
-                    outFile = os.path.join(
-                        myOutDir, qFN.replace('.sql', '.txt'))
-                    #qText += " INTO OUTFILE '%s'" % outFile
-
-                    _LOG.debug("SQL: %s pragmas: %s\n", qText, pragmas)
-                    column_names = 'noheader' not in pragmas
-
-                    async_timeout = 0
-                    if mode == 'qserv_async':
-                        # no_async pragma disables async behaviour
-                        if "no_async" not in pragmas:
-                            # default timeout for async queries is 10 minutes, allow to
-                            # override it via "pragma async_timeout=NNN"
-                            async_timeout = int(pragmas.get('async_timeout', 600))
-                    sqlInterface.execute(qText, outFile, column_names, async_timeout)
-                    if 'sortresult' in pragmas:
-                        try:
-                            with open(outFile, "r+b") as f:
-                                sortedLines = sorted(f.readlines())
-                                f.seek(0)
-                                f.writelines(sortedLines)
-                        except OSError as exc:
-                            # file probably does not exist
-                            _LOG.error("Failed to sort output: %s", exc)
+    def _selectQueries(self, stopAt):
+        """Select query files to run.
 
-        _LOG.info("Test case #%s: %s queries launched on a total of %s",
-                  self._case_id, queryRunCount, queryCount)
-
-    def _parseFile(self, qF, withQserv):
-        """Reads a file with SQL query, filters it based on qserv/mysql mode
-        and finds additional pragmas.
+        Returns
+        -------
+        3-tuple of selected query file names, number of query files and
+        number of files in queries directory.
+        """
+        _LOG.debug("Testing queries from %s", self._queries_dirname)
+        entries = self._corpus.entries
+        for qFN, reason in sorted(self._corpus.disabled().items()):
+            _LOG.debug("Skipping %s: %s", qFN, reason)
+        queryRunCount = len([entry for entry in entries if entry['enabled']])
+        return self._corpus.select(stopAt), queryRunCount, len(entries)
+
+    def _runPipelined(self, sqlInterface, selected, dbNameDot, outDir,
+                      inflight, durations):
+        """Run queries in detached mode, submitting them without waiting for
+        previous ones to complete, and retrieve each result as soon as its
+        query completes.
 
         Parameters
         ----------
-        qF : file object
-            open file with query text and extra stuff.
-        withQserv : bool
-            if `True` then prepare query for QServ, otherwise for mysql.
+        sqlInterface : `cmd.Cmd`
+            SQL client
+        selected : list
+            Query file names
+        dbNameDot : str
+            Database name followed by a dot
+        outDir : str
+            Directory for query results
+        inflight : int
+            Maximum number of detached queries running simultaneously.
+        durations : dict
+            Updated with durations in seconds, from submission to result
+            retrieval, keyed by query file name.
+        """
+        # query ID -> (query file name, pragmas, submission time)
+        submitted = {}
+
+        def _harvest():
+            qid, status = sqlInterface.waitAny()
+            qFN, pragmas, start = submitted.pop(qid)
+            _LOG.debug("Detached query %s (%s) finished", qid, qFN)
+            if sqlInterface.checkStatus(qid, status):
+                outFile = self._outputFile(outDir, qFN)
+                stats = sqlInterface.fetchResult(qid, outFile,
+                                                 'noheader' not in pragmas)
+                record = self._record('qserv_async', qFN, pragmas, start,
+                                      time.time(), stats)
+                self._postProcess(outFile, pragmas)
+            else:
+                record = self._record('qserv_async', qFN, pragmas, start,
+                                      time.time(), failedStats())
+            durations[qFN] = record['wall_time']
+
+        try:
+            for qFN in selected:
+                _LOG.info("Launch %s mode=%s db=%s", qFN, 'qserv_async', dbNameDot)
+                qText, pragmas = self._prepareQuery(qFN, True, dbNameDot)
+                if not self._asyncTimeout(pragmas):
+                    record = self._runQuery(sqlInterface, 'qserv_async', qFN, True,
+                                            dbNameDot, outDir)
+                    durations[qFN] = record['wall_time']
+                    continue
+                while len(submitted) >= inflight:
+                    _harvest()
+                start = time.time()
+                qid = sqlInterface.submit(qText, self._asyncTimeout(pragmas))
+                if qid is not None:
+                    submitted[qid] = (qFN, pragmas, start)
+                else:
+                    record = self._record('qserv_async', qFN, pragmas, start,
+                                          time.time(), failedStats())
+                    durations[qFN] = record['wall_time']
+            while submitted:
+                _harvest()
+        except QueryError:
+            _LOG.error("Query failed, results of %s detached queries are not "
+                       "retrieved: %s", len(submitted),
+                       ", ".join(sorted(qFN for qFN, _, _ in submitted.values())))
+            raise
+
+    def _prepareQuery(self, qFN, withQserv, dbNameDot):
+        """Read query file and return query text for a database.
 
         Returns
         -------
         2-tuple of query text and set of pragmas as a dictionary.
         """
+        qText, pragmas = self._corpus.query(qFN, withQserv)
+        # qText needs correct database name inserted.
+        qText = qText.replace('{DBTAG_A}', dbNameDot)
+        _LOG.debug("qText=%s", qText)
+        _LOG.debug("SQL: %s pragmas: %s\n", qText, pragmas)
+        return qText, pragmas
 
-        qText = []
-        pragmas = {}
-        for line in qF:
-
-            # squeeze/strip spaces
-            line = line.strip()
-            line = re.sub(' +', ' ', line)
-
-            if not line:
-                # empty
-                pass
-            elif withQserv and line.startswith("-- withQserv"):
-                # strip the "-- withQserv" text
-                qText.append(line[13:])
-            elif line.endswith("-- noQserv"):
-                if withQserv:
-                    # skip this line
-                    pass
-                else:
-                    # strip the "-- noQserv" text
-                    qText.append(line[:-10])
-            elif line.startswith("--"):
-                # check for pragma, format is:
-                #    '-- pragma keyval [keyval...]'
-                #    where keyval is 'key=value' or 'key'
-                words = line.split()
-                if len(words) > 1 and words[1] == 'pragma':
-                    for keyval in words[2:]:
-                        kv = keyval.split('=', 1) + [None]
-                        pragmas[kv[0]] = kv[1]
-            else:
-                # append all non-annotated lines
-                qText.append(line)
+    @staticmethod
+    def _asyncTimeout(pragmas):
+        """Return timeout for a query in qserv_async mode, 0 if query must
+        not run in detached mode.
+        """
+        # no_async pragma disables async behaviour
+        if "no_async" in pragmas:
+            return 0
+        # default timeout for async queries is 10 minutes, allow to
+        # override it via "pragma async_timeout=NNN"
+        return int(pragmas.get('async_timeout', 600))
+
+    def _postProcess(self, outFile, pragmas):
+        """Apply pragmas to query result file.
+        """
+        if 'sortresult' in pragmas and self._keepOutputs:
+            try:
+                externalSort.sortFile(outFile)
+            except (IOError, OSError) as exc:
+                # file probably does not exist
+                _LOG.error("Failed to sort output: %s", exc)
+
+    def _stateFile(self, name):
+        """Return path of a file which persists between runs of this test
+        case, it is located next to test outputs directory which is removed
+        at each run.
+        """
+        return self._out_dirname + "_" + name
+
+    def _loadDurations(self, mode):
+        """Return query durations (in seconds) measured during previous run,
+        keyed by query file name.
+        """
+        try:
+            with open(self._stateFile("durations.json")) as f:
+                return json.load(f).get(mode, {})
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _saveDurations(self, mode, durations):
+        """Store query durations for a mode, keep other modes ones.
+        """
+        filename = self._stateFile("durations.json")
+        with self._stateLock:
+            try:
+                with open(filename) as f:
+                    allDurations = json.load(f)
+            except (IOError, OSError, ValueError):
+                allDurations = {}
+            allDurations[mode] = durations
+            with open(filename, 'w') as f:
+                json.dump(allDurations, f, indent=2, sort_keys=True)
+
+    def _sqlInterface(self, mode, dbName, qservServer="", keep_going=None):
+        """Create SQL client for a given mode.
+
+        Parameters
+        ----------
+        mode : str
+            One of MODES values
+        dbName : str
+            Database name
+        qservServer: str
+            address of the effective qserv master (master.localdomain)
+        keep_going : boolean, optional
+            If `False`, the client raises `QueryError` when a query fails,
+            default is `keep_going` parameter of benchmark.
+
+        Returns
+        -------
+        `cmd.Cmd` instance, its type depends on executor.
+        """
+        if mode in ('qserv', 'qserv_async'):
+            sqlMode = const.MYSQL_PROXY
+            if qservServer:
+                self.config['qserv']['master'] = qservServer
+                _LOG.debug(" conf=%s", self.config)
+        elif mode == 'mysql':
+            sqlMode = const.MYSQL_SOCK
+        else:
+            raise ValueError("unexpected mode: " + str(mode))
 
-        return ' '.join(qText), pragmas
+        if keep_going is None:
+            keep_going = self._keepGoing
+        if self._executor == 'pooled':
+            return pooledCmd.PooledCmd(config=self.config, mode=sqlMode,
+                                       database=dbName, keep_going=keep_going)
+        return cmd.Cmd(config=self.config, mode=sqlMode, database=dbName,
+                       keep_going=keep_going)
 
-    def loadData(self, mode, dbName):
+    def loadData(self, mode, dbName, incremental=False,
+                 load_jobs=loadScheduler.LOAD_JOBS):
         """Loads data from input files located in caseXX/data/
 
+        Partitioned tables are loaded after their director, other tables are
+        loaded concurrently. Each loaded table is recorded with a fingerprint
+        of its inputs.
+
         Parameters
         ----------
         mode : str
             One of MODES values.
         dbName : str
             Database name
+        incremental : boolean, optional
+            If True, and if database was loaded before, only tables whose
+            fingerprint changed, or which were not loaded (e.g. because of a
+            failure), and tables depending on them are loaded. Otherwise
+            database is re-created and all tables are loaded.
+        load_jobs : int, optional
+            Maximum number of tables loaded simultaneously.
         """
-        dataLoader = self.connectAndInitDatabases(mode, dbName)
+        state = loadState.LoadState(self._stateFile("load_state.json"),
+                                    self._fileDigests)
+        loader = self._loader if mode == 'qserv' else LOADERS[0]
+        loaderVersion = [mode, loader, dbLoader.LOADER_VERSION]
+        if incremental and loader == 'ingest':
+            # tables cannot be added to a published database
+            _LOG.info("Incremental loading not supported by ingest loader")
+            incremental = False
+        fingerprints = dict((table, state.tableFingerprint(self.dataReader,
+                                                           table, loaderVersion))
+                            for table in self.dataReader.orderedTables)
+
+        if incremental and state.knows(dbName):
+            tables = state.tablesToLoad(self.dataReader, dbName, fingerprints)
+            dataLoader = self.connectAndInitDatabases(mode, dbName,
+                                                      prepare=False)
+        else:
+            state.reset(dbName)
+            tables = set(fingerprints)
+            dataLoader = self.connectAndInitDatabases(mode, dbName)
+
         _LOG.info("Loading data from %s (%s mode)", self._in_dirname, mode)
         for table in self.dataReader.orderedTables:
+            if table not in tables:
+                _LOG.info("Table %s is unchanged, skip loading", table)
+        tables = [table for table in self.dataReader.orderedTables
+                  if table in tables]
+        if not self.dataReader.duplicatedTables:
+            self._inputStaging.prefetch([table for table in tables
+                                         if not dataLoader.streamsInput(table)])
+
+        def _loadTable(table):
+            state.forget(dbName, table)
             dataLoader.createLoadTable(table)
+            state.record(dbName, table, fingerprints[table])
+
+        loadScheduler.runLoads(tables,
+                               loadScheduler.loadGraph(self.dataReader, tables),
+                               _loadTable, load_jobs)
         dataLoader.finalize()
 
     def cleanup(self):
         """Cleanup of previous tests output files
         """
+        self._report = queryReport.QueryReport()
+        self._manifests = {}
+        self._inputStaging.evict()
         if os.path.exists(self._out_dirname):
             shutil.rmtree(self._out_dirname)
         os.makedirs(self._out_dirname)
 
-    def connectAndInitDatabases(self, mode, dbName):
+    def connectAndInitDatabases(self, mode, dbName, prepare=True):
         """Establish database server connection and create database.
 
         Parameters
@@ -327,6 +779,8 @@ class Benchmark(object):
             One of MODES values.
         dbName : str
             Database name
+        prepare : boolean, optional
+            If False, existing database is kept.
 
         Returns
         -------
@@ -339,7 +793,19 @@ class Benchmark(object):
                 self.dataReader,
                 dbName,
                 self._multi_node,
-                self._out_dirname
+                self._out_dirname,
+                stream_chunks=self._streamChunks,
+                input_staging=self._inputStaging,
+                in_process=self._inProcessLoader,
+                stream_input=self._streamInput
+            )
+        elif mode == 'qserv' and self._loader == 'ingest':
+            dataLoader = ingestLoader.IngestLoader(
+                self.config,
+                self.dataReader,
+                dbName,
+                self._out_dirname,
+                input_staging=self._inputStaging
             )
         elif mode == 'qserv':
             dataLoader = qservDbLoader.QservLoader(
@@ -348,16 +814,24 @@ class Benchmark(object):
                 dbName,
                 self._multi_node,
                 self._out_dirname,
-                self._czar_list
+                self._czar_list,
+                stream_chunks=self._streamChunks,
+                input_staging=self._inputStaging,
+                in_process=self._inProcessLoader,
+                stream_input=self._streamInput
             )
         else:
             raise ValueError("unexpected mode: " + str(mode))
 
-        _LOG.debug("Initializing database for %s mode", mode)
-        dataLoader.prepareDatabase()
+        if prepare:
+            _LOG.debug("Initializing database for %s mode", mode)
+            dataLoader.prepareDatabase()
         return dataLoader
 
-    def run(self, mode_list, load_data, stop_at_query=MAX_QUERY, qservServer=""):
+    def run(self, mode_list, load_data, stop_at_query=MAX_QUERY, qservServer="",
+            parallel=1, concurrent_modes=False, async_inflight=0,
+            iterations=0, warmup=0, use_cache=False, incremental=False,
+            load_jobs=loadScheduler.LOAD_JOBS):
         """Execute all tests in a test case.
 
         Parameters
@@ -366,10 +840,44 @@ class Benchmark(object):
             List of strings like "mysql", "qserv".
         load_data : boolean
             If True the n load test data.
+        parallel : int, optional
+            Number of queries running simultaneously for each mode.
+        concurrent_modes : boolean, optional
+            If True queries for all modes are run at the same time, each mode
+            writes in its own output directory.
+        async_inflight : int, optional
+            If >0, queries in 'qserv_async' mode are submitted without waiting
+            for completion of previous ones, with at most this number of
+            detached queries running simultaneously.
+        iterations : int, optional
+            If >0, run in benchmark mode: each query is run `warmup` times,
+            then timed during `iterations` executions, timing statistics are
+            available through `timings` attribute.
+        warmup : int, optional
+            Number of untimed executions of each query in benchmark mode.
+        use_cache : boolean, optional
+            If True, results of CACHED_MODES are restored from result cache
+            when input data and queries did not change since they were
+            stored, such modes are then neither loaded nor run. Not used in
+            benchmark mode.
+        incremental : boolean, optional
+            If True, only tables which changed since previous load are
+            loaded, see `loadData()`.
+        load_jobs : int, optional
+            Maximum number of tables loaded simultaneously.
         """
 
         self.cleanup()
 
+        cacheKeys = {}
+        if use_cache and iterations == 0:
+            for mode in CACHED_MODES:
+                if mode in mode_list:
+                    cacheKeys[mode] = self._resultCacheKey(mode, stop_at_query)
+            restored = [mode for mode in cacheKeys
+                        if self._restoreCachedResults(mode, cacheKeys[mode])]
+            mode_list = [mode for mode in mode_list if mode not in restored]
+
         if load_data:
             if self.dataReader.duplicatedTables:
                 _LOG.info("Tables to Duplicate %s", self.dataReader.duplicatedTables)
@@ -378,21 +886,166 @@ class Benchmark(object):
         if load_data:
             # when loading qserv_async is the same as qserv (do not load twice)
             load_modes = set('qserv' if mode == 'qserv_async' else mode for mode in mode_list)
-            for mode in load_modes:
-                dbName = "qservTest_case%s_%s" % (self._case_id, mode)
-                self.loadData(mode, dbName)
+            try:
+                for mode in load_modes:
+                    dbName = "qservTest_case%s_%s" % (self._case_id, mode)
+                    self.loadData(mode, dbName, incremental, load_jobs)
+            finally:
+                # decompressed input data is shared by all modes
+                self._inputStaging.evict()
 
-        for mode in mode_list:
+        samples = {}
 
+        def _runMode(mode):
             dbName = "qservTest_case%s_%s" % (self._case_id,
                                               'qserv' if mode == 'qserv_async' else mode)
-            self.runQueries(mode, dbName, stop_at_query, qservServer)
+            if iterations > 0:
+                samples[mode] = self.benchmarkQueries(mode, dbName, iterations,
+                                                      warmup, stop_at_query,
+                                                      qservServer)
+            else:
+                self.runQueries(mode, dbName, stop_at_query, qservServer,
+                                parallel, async_inflight)
+                if mode in cacheKeys:
+                    self._storeCachedResults(mode, cacheKeys[mode])
+
+        try:
+            if concurrent_modes and len(mode_list) > 1:
+                _LOG.info("Running queries concurrently for modes %s", mode_list)
+                with futures.ThreadPoolExecutor(max_workers=len(mode_list)) as pool:
+                    sweeps = [pool.submit(_runMode, mode) for mode in mode_list]
+                    for sweep in sweeps:
+                        sweep.result()
+            else:
+                for mode in mode_list:
+                    _runMode(mode)
+        finally:
+            if self._executor == 'pooled':
+                pooledCmd.closePools()
+            self._report.logSummary()
+
+        if iterations > 0:
+            self.timings = timingBaseline.buildTimings(self._case_id,
+                                                       iterations, warmup,
+                                                       samples)
+            timingBaseline.save(self.timings,
+                                os.path.join(self._out_dirname, "timings.json"))
+
+    def _resultCacheKey(self, mode, stopAt):
+        """Return result cache key of a mode, it depends on input data files
+        and on query texts.
+        """
+        dbName = "qservTest_case%s_%s" % (self._case_id, mode)
+        withQserv = mode in ('qserv', 'qserv_async')
+        selected, _, _ = self._selectQueries(stopAt)
+        queries = [(qFN,) + self._prepareQuery(qFN, withQserv, dbName + '.')
+                   for qFN in selected]
+        return self._resultCache.key(self._in_dirname, queries,
+                                     dict(mode=mode, outputs=self._keepOutputs))
+
+    def _restoreCachedResults(self, mode, key):
+        """Restore results and manifest of a mode from result cache.
+
+        Returns
+        -------
+        `True` if results were found in cache.
+        """
+        if not self._resultCache.restore(key, self._outputDir(mode),
+                                         {"manifest.json": self._manifestFile(mode)}):
+            return False
+        _LOG.info("Results for %s mode restored from cache, queries are not run",
+                  mode)
+        return True
+
+    def _storeCachedResults(self, mode, key):
+        """Store results and manifest of a mode in result cache, unless some
+        queries failed.
+        """
+        manifest = self._manifests.get(mode)
+        if manifest is None:
+            return
+        if any(entry['status'] != 0 for entry in manifest.entries.values()):
+            _LOG.warning("Some queries failed, %s results are not cached", mode)
+            return
+        self._resultCache.store(key, self._outputDir(mode),
+                                {"manifest.json": self._manifestFile(mode)})
+
+    def checkTimings(self, baseline_file,
+                     threshold=timingBaseline.DEFAULT_THRESHOLD):
+        """Compare timings of last benchmark run against a baseline.
+
+        Parameters
+        ----------
+        baseline_file : str
+            Baseline file, written by a previous run with `saveTimings()`.
+        threshold : float, optional
+            Relative slowdown of median wall time reported as a regression.
+
+        Returns
+        -------
+        List of regressions, see `timingBaseline.findRegressions()`.
+        """
+        baseline = timingBaseline.load(baseline_file)
+        regressions = timingBaseline.findRegressions(self.timings, baseline,
+                                                     threshold)
+        for r in regressions:
+            _LOG.error("%s/%s: median wall time %.3fs, baseline %.3fs (+%.0f%%)",
+                       r['mode'], r['query'], r['current'], r['baseline'],
+                       100 * r['change'])
+        if not regressions:
+            _LOG.info("No timing regression above %.0f%% against %s",
+                      100 * threshold, baseline_file)
+        return regressions
+
+    def saveTimings(self, baseline_file):
+        """Store timings of last benchmark run as a baseline.
+        """
+        timingBaseline.save(self.timings, baseline_file)
+        _LOG.info("Timing baseline stored in %s", baseline_file)
+
+    def _compareManifests(self, baseline, mode):
+        """Compare result digests of two modes.
+
+        Returns
+        -------
+        `dict` mapping name of each differing result file to its mismatch,
+        see `resultComparator.compareDirs()`, `None` if manifest of a mode is
+        not available.
+        """
+        try:
+            left = resultManifest.ResultManifest.read(self._manifestFile(baseline))
+            right = resultManifest.ResultManifest.read(self._manifestFile(mode))
+        except (IOError, OSError, ValueError):
+            return None
+
+        outputs_dir = os.path.join(self._out_dirname, "outputs")
+        leftEntries = left.entries
+        rightEntries = right.entries
+        mismatches = {}
+        for qFN in left.diff(right):
+            name = qFN.replace('.sql', '.txt')
+            if any(entries.get(qFN, {}).get('status')
+                   for entries in (leftEntries, rightEntries)):
+                mismatches[name] = dict(reason=resultComparator.QUERY_FAILED)
+                continue
+            mismatch = dict(reason=resultComparator.DIGEST_DIFFERS)
+            leftFile = os.path.join(outputs_dir, baseline, name)
+            rightFile = os.path.join(outputs_dir, mode, name)
+            if self._keepOutputs and os.path.isfile(leftFile) \
+                    and os.path.isfile(rightFile):
+                # locate the difference for the log
+                mismatch = resultComparator.compareFiles(leftFile,
+                                                         rightFile) or mismatch
+            mismatches[name] = mismatch
+        return mismatches
 
     def analyzeQueryResults(self, mode_list):
         """Compare results from runs with different modes.
 
         If "mysql" is in the mode_list compare all other modes against "mysql",
-        otherwise compare all others against first.
+        otherwise compare all others against first. Result digests are
+        compared if manifests of both modes are available, otherwise result
+        files are compared.
 
         Parameters
         ----------
@@ -412,18 +1065,24 @@ class Benchmark(object):
 
             other_out_dir = os.path.join(outputs_dir, mode)
 
-            dcmp = dircmp(baseline_out_dir, other_out_dir)
+            mismatches = self._compareManifests(baseline, mode)
+            if mismatches is None:
+                mismatches = resultComparator.compareDirs(baseline_out_dir,
+                                                          other_out_dir)
 
             if self.dataReader.notLoadedTables:
                 _LOG.info("%s/%s: Tables/Views not loaded: %s",
                           baseline, mode, self.dataReader.notLoadedTables)
 
-            diffs = dcmp.left_only + dcmp.right_only + dcmp.diff_files
+            diffs = sorted(mismatches)
             if not diffs:
                 _LOG.info("%s/%s results are identical", baseline, mode)
             else:
                 _LOG.error("%s/%s differs for %s queries:",
                            baseline, mode, len(diffs))
+                for name in diffs:
+                    _LOG.error("  %s: %s", name,
+                               resultComparator.describe(mismatches[name]))
                 _LOG.error("Broken queries list in %s: %s",
                            other_out_dir, diffs)
 
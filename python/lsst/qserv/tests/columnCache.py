@@ -0,0 +1,366 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining ColumnCache class, which converts input data files of a
+dataset into typed columns, stored as .npy files and memory-mapped when read.
+
+Column names and types are read from table schema files, or from ingest
+configuration. Integer and floating point columns are stored with their
+MySQL size, BIT columns as unsigned integers, and other columns as
+fixed-size byte strings of unescaped values. NULL values are stored as 0,
+or NaN for floating point columns, and recorded in a separate mask for
+columns containing NULL values.
+
+Input files are converted by blocks of rows, in two passes: the first one
+finds the number of rows and the size of strings.
+
+Caches are stored outside of datasets, which are usually read-only and under
+version control, by default in a temporary directory, in one subdirectory
+per dataset.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import binascii
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+from .dataRows import BLOCK_ROWS, RowReader
+
+_LOG = logging.getLogger(__name__)
+
+# default directory containing caches of all datasets
+COLUMN_CACHE_DIR = os.path.join(tempfile.gettempdir(), "qserv_column_cache")
+
+# changed when cache format changes
+CACHE_VERSION = 1
+
+_MANIFEST = "manifest.json"
+
+_INT_TYPES = {'TINYINT': 1, 'SMALLINT': 2, 'MEDIUMINT': 4, 'INT': 4,
+              'INTEGER': 4, 'BIGINT': 8}
+_FLOAT_TYPES = {'FLOAT': 'f4', 'DOUBLE': 'f8', 'REAL': 'f8', 'DECIMAL': 'f8',
+                'NUMERIC': 'f8'}
+
+_TYPE = re.compile(r'\s*(\w+)(?:\s*\(\s*\d+(?:\s*,\s*\d+)?\s*\))?(\s+UNSIGNED)?', re.I)
+
+# column definition in CREATE TABLE statement
+_COLUMN = re.compile(r'\s*`([^`]+)`\s+(.*?),?\s*$')
+
+# MySQL escape sequences, other escaped characters stand for themselves
+_UNESCAPED = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+
+def columnType(sqlType):
+    """Return numpy type of a MySQL column type.
+
+    Parameters
+    ----------
+    sqlType : str
+        Column type, e.g. "bigint(20) NOT NULL".
+
+    Returns
+    -------
+    dtype : str
+        numpy type, 'S' for byte strings, whose size depends on data.
+    """
+    match = _TYPE.match(sqlType)
+    name = match.group(1).upper() if match else ''
+    if name in _INT_TYPES:
+        return '<%s%s' % ('u' if match.group(2) else 'i', _INT_TYPES[name])
+    if name in _FLOAT_TYPES:
+        return '<' + _FLOAT_TYPES[name]
+    if name in ('BIT', 'BOOL', 'BOOLEAN'):
+        return '<u8'
+    return 'S'
+
+
+def defaultCacheDir(data_dir):
+    """Return default cache directory of a dataset.
+
+    Parameters
+    ----------
+    data_dir : str
+        Dataset directory, e.g. datasets/case01/data.
+
+    Returns
+    -------
+    cache_dir : str
+        Subdirectory of COLUMN_CACHE_DIR, named after dataset case and a
+        hash of dataset directory path.
+    """
+    path = os.path.realpath(data_dir)
+    case = os.path.basename(os.path.dirname(path))
+    key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(COLUMN_CACHE_DIR, "%s-%s" % (case, key))
+
+
+class ColumnCache(object):
+    """
+    Memory-mapped columns of dataset tables
+
+    Parameters
+    ----------
+    data_config : `DataConfig`
+        Dataset configuration.
+    cache_dir : str, optional
+        Cache directory, default is given by `defaultCacheDir()`.
+    block_rows : int, optional
+        Number of rows converted at once.
+    """
+
+    def __init__(self, data_config, cache_dir=None, block_rows=BLOCK_ROWS):
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("numpy is required to cache columns")
+        self._np = numpy
+        self._dataConfig = data_config
+        self._cacheDir = cache_dir or defaultCacheDir(data_config.dataDir)
+        self._blockRows = block_rows
+        self._reader = RowReader(data_config.dataDir)
+        self._unescape = re.compile(re.escape(self._reader.escape) + '(.)', re.S)
+        self._manifests = {}
+
+    def _tableDir(self, table):
+        return os.path.join(self._cacheDir, table)
+
+    def _jsonConfig(self, *path):
+        path = os.path.join(self._dataConfig.dataDir, *path)
+        if not os.path.exists(path):
+            return {}
+        with io.open(path) as f:
+            return json.load(f)
+
+    def schema(self, table):
+        """Return names and MySQL types of columns in input data of a table.
+
+        Column order is the one of input data: fields of partitioner
+        configuration, otherwise columns of schema file, otherwise columns
+        of ingest configuration. Types are read from schema file, otherwise
+        from ingest configuration.
+        """
+        types = []
+        with io.open(self._dataConfig.getSchemaFile(table)) as f:
+            for line in f:
+                match = _COLUMN.match(line)
+                if match:
+                    types.append((match.group(1), match.group(2)))
+        ingestTypes = [(column['name'], column['type']) for column
+                       in self._jsonConfig("ingest", table + ".json").get('schema', [])]
+        if not types:
+            types = ingestTypes
+        typeOf = dict(ingestTypes)
+        typeOf.update(types)
+
+        fields = self._jsonConfig("partition", table + ".json").get(
+            'in', {}).get('csv', {}).get('field')
+        if not fields:
+            fields = [name for name, _ in types]
+        missing = [name for name in fields if name not in typeOf]
+        if missing:
+            raise ValueError("no type for columns %s of table %s" % (missing, table))
+        return [(name, typeOf[name]) for name in fields]
+
+    def _source(self, table):
+        path = self._dataConfig.getInputDataFile(table)
+        if not path or not os.path.exists(path):
+            raise ValueError("no input data for table " + table)
+        return path
+
+    def _signature(self, path):
+        st = os.stat(path)
+        return [CACHE_VERSION, st.st_size, st.st_mtime]
+
+    def _manifest(self, table):
+        """Return manifest of cached table, or None if table is not cached or
+        was cached from another version of input data.
+        """
+        manifest = self._manifests.get(table)
+        if manifest is None:
+            path = os.path.join(self._tableDir(table), _MANIFEST)
+            if not os.path.exists(path):
+                return None
+            with io.open(path) as f:
+                manifest = json.load(f)
+        if manifest['signature'] != self._signature(self._source(table)):
+            self._manifests.pop(table, None)
+            return None
+        self._manifests[table] = manifest
+        return manifest
+
+    def isCached(self, table):
+        """Return True if table columns are cached from current input data.
+        """
+        return self._manifest(table) is not None
+
+    def _unquote(self, values):
+        quote = self._reader.quote
+        return [v[1:-1] if len(v) > 1 and v[0] == quote and v[-1] == quote else v
+                for v in values]
+
+    def _convert(self, values, nulls, dtype):
+        """Return array of column values in a block.
+        """
+        np = self._np
+        values = self._unquote(values)
+        if dtype[0] == 'S' or dtype == '<u8':
+            values = [b'' if isNull else
+                      self._unescape.sub(lambda m: _UNESCAPED.get(m.group(1), m.group(1)),
+                                         v).encode('latin-1')
+                      for v, isNull in zip(values, nulls)]
+            if dtype == '<u8':
+                # BIT values are big-endian binary
+                values = [int(binascii.hexlify(v), 16) if v else 0 for v in values]
+            return values
+        text = np.array(values)
+        empty = '0' if dtype[1] in 'iu' else 'nan'
+        return np.where(nulls, empty, text).astype(dtype)
+
+    def build(self, table):
+        """Convert input data of a table into cached columns, unless they
+        are already cached.
+
+        Returns
+        -------
+        built : bool
+            True if columns were converted.
+        """
+        if self.isCached(table):
+            return False
+        np = self._np
+        source = self._source(table)
+        signature = self._signature(source)
+        schema = self.schema(table)
+        nFields = len(schema)
+        dtypes = [columnType(sqlType) for _, sqlType in schema]
+        strings = [i for i, dtype in enumerate(dtypes) if dtype == 'S']
+        _LOG.info("Caching columns of table %s", table)
+
+        # first pass: number of rows and size of strings
+        rows = 0
+        sizes = dict((i, 1) for i in strings)
+        for block in self._reader.blocks(source, nFields, self._blockRows):
+            rows += len(block)
+            for i in strings:
+                # unescaped values are not longer
+                sizes[i] = max(sizes[i], max(len(row[i]) for row in block))
+        for i in strings:
+            dtypes[i] = 'S%s' % sizes[i]
+
+        tableDir = self._tableDir(table)
+        tmpDir = tableDir + ".tmp"
+        if os.path.exists(tmpDir):
+            shutil.rmtree(tmpDir)
+        os.makedirs(tmpDir)
+
+        def columnFile(i, suffix=".npy"):
+            return os.path.join(tmpDir, "%s%s" % (schema[i][0], suffix))
+
+        columns = [np.lib.format.open_memmap(columnFile(i), mode='w+',
+                                             dtype=dtypes[i], shape=(rows,))
+                   for i in range(nFields)]
+        masks = [np.lib.format.open_memmap(columnFile(i, ".null.npy"), mode='w+',
+                                           dtype=bool, shape=(rows,))
+                 for i in range(nFields)]
+
+        # second pass: conversion
+        start = 0
+        null = self._reader.null
+        for block in self._reader.blocks(source, nFields, self._blockRows):
+            end = start + len(block)
+            for i in range(nFields):
+                values = [row[i] for row in block]
+                nulls = np.array([v == null for v in values])
+                try:
+                    columns[i][start:end] = self._convert(values, nulls, dtypes[i])
+                except ValueError as exc:
+                    raise ValueError("%s: column %s: %s" % (source, schema[i][0], exc))
+                masks[i][start:end] = nulls
+            start = end
+
+        nullable = []
+        for i in range(nFields):
+            columns[i].flush()
+            hasNulls = bool(masks[i].any())
+            masks[i] = None
+            if hasNulls:
+                nullable.append(schema[i][0])
+            else:
+                os.unlink(columnFile(i, ".null.npy"))
+        del columns, masks
+
+        manifest = {'signature': signature, 'rows': rows,
+                    'columns': [name for name, _ in schema],
+                    'nullable': nullable}
+        with io.open(os.path.join(tmpDir, _MANIFEST), 'w') as f:
+            f.write(json.dumps(manifest, indent=2))
+        if os.path.exists(tableDir):
+            shutil.rmtree(tableDir)
+        os.rename(tmpDir, tableDir)
+        self._manifests[table] = manifest
+        return True
+
+    def _cached(self, table):
+        manifest = self._manifest(table)
+        if manifest is None:
+            self.build(table)
+            manifest = self._manifest(table)
+        return manifest
+
+    def columns(self, table):
+        """Return names of cached columns of a table, converting input data
+        if needed.
+        """
+        return list(self._cached(table)['columns'])
+
+    def rows(self, table):
+        """Return number of rows of a table, converting input data if
+        needed.
+        """
+        return self._cached(table)['rows']
+
+    def column(self, table, column):
+        """Return read-only memory-mapped array of column values, converting
+        input data if needed.
+        """
+        if column not in self._cached(table)['columns']:
+            raise KeyError("no column %s in table %s" % (column, table))
+        return self._np.load(os.path.join(self._tableDir(table), column + ".npy"),
+                             mmap_mode='r')
+
+    def nulls(self, table, column):
+        """Return read-only memory-mapped array which is True for NULL values
+        of a column, or None if column has no NULL value.
+        """
+        manifest = self._cached(table)
+        if column not in manifest['columns']:
+            raise KeyError("no column %s in table %s" % (column, table))
+        if column not in manifest['nullable']:
+            return None
+        return self._np.load(os.path.join(self._tableDir(table), column + ".null.npy"),
+                             mmap_mode='r')
@@ -30,6 +30,7 @@ and set all parameters related to test dataset.
 from __future__ import absolute_import, division, print_function
 
 import io
+import json
 import logging
 import os
 
@@ -53,6 +54,7 @@ class DataConfig(dict):
         '''
         self.log = logging.getLogger(__name__)
         self.dataDir = data_dir_name
+        self._columnCache = None
 
         _topLevelConfigFile = os.path.join(self.dataDir, "description.yaml")
         with io.open(_topLevelConfigFile, 'r') as f:
@@ -67,6 +69,12 @@ class DataConfig(dict):
             self['tables']['load-order'] = fromFileTables
             self.notLoadedTables = []
         else:
+            # a table listed twice would be loaded twice
+            loadOrder = []
+            for table in self['tables']['load-order']:
+                if table not in loadOrder:
+                    loadOrder.append(table)
+            self['tables']['load-order'] = loadOrder
             self.notLoadedTables = list(set(fromFileTables) -
                                         set(self.orderedTables))
         self.log.debug("Tables to load : %s", self.orderedTables)
@@ -141,6 +149,15 @@ class DataConfig(dict):
         self.log.debug("rsync urls: %s", urls)
         return urls
 
+    @property
+    def remoteChecksums(self):
+        '''
+        @return dictionary mapping big data file names to their SHA-256
+                digest, read from remote/sha256 in description.yaml
+        '''
+        checksums = self._remote.get('sha256')
+        return checksums if checksums else {}
+
     def _tableFromSchemaFile(self):
         """
         Return a list of orderedTables names deduced from the input data
@@ -162,6 +179,27 @@ class DataConfig(dict):
             schema_filename = prefix + self._schemaExt
             return schema_filename
 
+    def getDirectorTables(self, table_name):
+        '''
+        Return director tables of a table, i.e. tables which must be loaded
+        before it. Director is read from table ingest configuration if
+        available, otherwise all directors are returned for non-director
+        partitioned tables
+        @param table_name: table name
+        @return list of director table names, empty for directors and
+                non-partitioned tables
+        '''
+        if table_name in self.directors:
+            return []
+        ingestCfg = os.path.join(self.dataDir, "ingest", table_name + ".json")
+        if os.path.exists(ingestCfg):
+            with io.open(ingestCfg, 'r') as f:
+                director = json.load(f).get('director_table')
+            return [director] if director else []
+        if table_name in self.partitionedTables:
+            return list(self.directors)
+        return []
+
     def getInputDataFile(self, table_name):
         if table_name not in self.orderedTables:
             raise
@@ -176,3 +214,39 @@ class DataConfig(dict):
         if self._zipExt:
             data_filename += self._zipExt
         return data_filename
+
+    def getColumnCache(self, cache_dir=None):
+        '''
+        Return cache of typed columns of input data, see ColumnCache,
+        requires numpy
+        @param cache_dir: cache directory, default is a directory named after
+                          dataset in temporary directory, see
+                          columnCache.defaultCacheDir()
+        '''
+        from .columnCache import ColumnCache
+        if self._columnCache is None or cache_dir is not None:
+            cache = ColumnCache(self, cache_dir)
+            if cache_dir is not None:
+                return cache
+            self._columnCache = cache
+        return self._columnCache
+
+    def getColumn(self, table_name, column_name):
+        '''
+        Return values of a column of input data as a read-only
+        memory-mapped numpy array, without copy. Input data are converted
+        once into the default column cache.
+        @param table_name: table name
+        @param column_name: column name
+        '''
+        return self.getColumnCache().column(table_name, column_name)
+
+    def getNullMask(self, table_name, column_name):
+        '''
+        Return read-only memory-mapped numpy array which is True for NULL
+        values of a column of input data, or None if column has no NULL
+        value.
+        @param table_name: table name
+        @param column_name: column name
+        '''
+        return self.getColumnCache().nulls(table_name, column_name)
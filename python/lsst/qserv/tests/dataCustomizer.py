@@ -21,13 +21,17 @@
 
 """
 Customize integration test datasets
-- download remote big data file
+- download remote big data files, concurrently, through a cache shared by
+  all customized datasets
 
 @author  Fabrice Jammes, IN2P3/SLAC
 """
 
 from __future__ import absolute_import, division, print_function
 
+from concurrent import futures
+import errno
+import fcntl
 import logging
 import os
 import shutil
@@ -35,25 +39,55 @@ import shutil
 from lsst.qserv.admin import commons
 from lsst.qserv.tests import dataConfig
 from lsst.qserv.tests import benchmark
+from lsst.qserv.tests import downloadCache
 
 LOG = logging.getLogger(__name__)
 
+# default number of files downloaded simultaneously
+DOWNLOAD_JOBS = 4
+
+# default download cache directory, in target test datasets directory
+DOWNLOAD_CACHE_DIR = "download_cache"
+
+_BUFFER_SIZE = 1024 * 1024
+
+# ioctl cloning a file on copy-on-write filesystems (btrfs, xfs)
+_FICLONE = 0x40049409
+
+# errors meaning a link method is not supported between two files
+_UNSUPPORTED = (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY,
+                errno.EPERM, errno.EMLINK)
+
+# files of customized dataset which are always copied, as they may be modified
+_MATERIALIZED = [os.path.join("data", "description.yaml")]
+
 
 class DataCustomizer(object):
 
     def __init__(self, source_case_id, testdata_dir, target_testdata_dir,
-                 do_download=True, custom_case_id=None, username=None):
+                 do_download=True, custom_case_id=None, username=None,
+                 download_jobs=DOWNLOAD_JOBS, cache_dir=None, link=False):
         ''' Contain informations allowing to customize a dataset
         @param source_case_id: dataset to duplicate
         @param testdata_dir: directory containing test dataset to duplicate
         @param target_testdata_dir: destination directory
         @param download_action: use data configuration to eventually override data with
         remote big data files
+        @param download_jobs: maximum number of files downloaded simultaneously
+        @param cache_dir: download cache directory, default is
+                          DOWNLOAD_CACHE_DIR in target_testdata_dir
+        @param link: if True, files of source dataset are reflinked,
+                     hard-linked, or symlinked into destination instead of
+                     being copied, except description.yaml
         @return True if success, else False
         '''
 
         self._username = username
         self._doDownload = do_download
+        self._downloadJobs = download_jobs
+        self._cacheDir = cache_dir or os.path.join(target_testdata_dir,
+                                                   DOWNLOAD_CACHE_DIR)
+        self._link = link
         self._src_dataset_dir = benchmark.Benchmark.getDatasetDir(
             testdata_dir, source_case_id)
         self._custom_case_id = custom_case_id if custom_case_id else source_case_id
@@ -67,28 +101,94 @@ class DataCustomizer(object):
 
         LOG.info("Customizing integration tests datasets")
         DataCustomizer._duplicate_data_dir(self._src_dataset_dir,
-                                           self._dest_dataset_dir)
+                                           self._dest_dataset_dir,
+                                           self._link)
 
         self._data_dir = os.path.join(self._dest_dataset_dir, "data")
         self._dataConfig = dataConfig.DataConfig(self._data_dir)
 
         if self._doDownload:
-            urls = self._dataConfig.rsyncUrls
-            for url in urls:
-                dest_file = os.path.join(self._data_dir, os.path.basename(url))
-                DataCustomizer._rsync(url, dest_file, self._username)
+            self._download(self._dataConfig.rsyncUrls)
 
         LOG.info("Customization successful")
         return True
 
+    def _download(self, urls):
+        '''
+        Download big data files into dataset, concurrently, through download
+        cache. All downloads are completed before errors are reported.
+        @param urls: list of big data file urls
+        @raise ChecksumError: if a file does not match its checksum
+        '''
+        if not urls:
+            return
+        cache = downloadCache.DownloadCache(self._cacheDir)
+        checksums = self._dataConfig.remoteChecksums
+
+        def _fetch(url):
+            filename = os.path.basename(url)
+            if filename not in checksums:
+                LOG.warning("No checksum for %s, download is not verified", filename)
+            path = cache.fetch(url, self._fetchUrl, checksums.get(filename))
+            DataCustomizer._place(path, os.path.join(self._data_dir, filename))
+
+        errors = []
+        with futures.ThreadPoolExecutor(max_workers=min(len(urls), self._downloadJobs)) as pool:
+            running = [(url, pool.submit(_fetch, url)) for url in urls]
+            for url, future in running:
+                try:
+                    future.result()
+                except Exception as exc:
+                    LOG.error("Download of %s failed: %s", url, exc)
+                    errors.append(exc)
+        if errors:
+            raise errors[0]
+
+    def _fetchUrl(self, url, dest_file):
+        '''
+        Download a file, resuming partial download in dest_file
+        @param url: rsync url, local path or file:// url
+        @param dest_file: destination file
+        '''
+        if url.startswith("file://"):
+            DataCustomizer._resumeCopy(url[len("file://"):], dest_file)
+        elif os.path.isabs(url):
+            DataCustomizer._resumeCopy(url, dest_file)
+        else:
+            DataCustomizer._rsync(url, dest_file, self._username)
+
+    @staticmethod
+    def _resumeCopy(src, dest_file):
+        '''
+        Copy a local file, appending to the already copied part of it
+        '''
+        with open(src, 'rb') as fsrc, open(dest_file, 'ab') as fdst:
+            fsrc.seek(fdst.tell())
+            shutil.copyfileobj(fsrc, fdst, _BUFFER_SIZE)
+
     @staticmethod
-    def _duplicate_data_dir(src, dest):
+    def _place(path, dest_file):
+        '''
+        Put a cached file in dataset, with a hard link if possible
+        '''
+        if os.path.lexists(dest_file):
+            os.unlink(dest_file)
+        try:
+            os.link(path, dest_file)
+        except OSError:
+            shutil.copy(path, dest_file)
+
+    @staticmethod
+    def _duplicate_data_dir(src, dest, link=False):
         LOG.info("Customized dataset location: %s", dest)
         try:
             if not os.path.exists(dest):
                 if not os.path.exists(src):
                     raise IOError("Can't access source dataset location: %s",
                                   src)
+                elif link:
+                    LOG.info("Link source dataset %s to %s", src, dest)
+                    DataCustomizer._link_data_dir(src, dest)
                 else:
                     LOG.info("Copy source dataset %s to %s", src, dest)
                     shutil.copytree(src, dest)
@@ -97,12 +197,68 @@ class DataCustomizer(object):
                           src, dest)
             raise
 
+    @staticmethod
+    def _link_data_dir(src, dest):
+        '''
+        Create a dataset directory tree whose files are links to source
+        dataset files, except files which may be modified, which are copied.
+        Replaced files, like downloaded big data files, are unlinked first,
+        so source files are never modified.
+        '''
+        methods = {}
+        for dirpath, _, filenames in os.walk(src):
+            relDir = os.path.relpath(dirpath, src)
+            destDir = os.path.normpath(os.path.join(dest, relDir))
+            os.makedirs(destDir)
+            for filename in filenames:
+                srcFile = os.path.join(dirpath, filename)
+                destFile = os.path.join(destDir, filename)
+                relFile = os.path.normpath(os.path.join(relDir, filename))
+                if relFile in _MATERIALIZED:
+                    shutil.copy2(srcFile, destFile)
+                    method = "copy"
+                else:
+                    method = DataCustomizer._link_file(srcFile, destFile)
+                methods[method] = methods.get(method, 0) + 1
+        LOG.info("Dataset files created in %s: %s", dest,
+                 ", ".join("%s %s" % (n, method)
+                           for method, n in sorted(methods.items())))
+
+    @staticmethod
+    def _link_file(src, dest):
+        '''
+        Create dest as a reflink of src if filesystem supports it, otherwise
+        as a hard link, otherwise as a symbolic link
+        @return name of used method
+        '''
+        try:
+            with open(src, 'rb') as fsrc, open(dest, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dest)
+            return "reflink"
+        except (IOError, OSError) as exc:
+            if exc.errno not in _UNSUPPORTED:
+                raise
+            os.unlink(dest)
+        try:
+            os.link(src, dest)
+            return "hardlink"
+        except OSError as exc:
+            if exc.errno not in _UNSUPPORTED:
+                raise
+        os.symlink(os.path.abspath(src), dest)
+        return "symlink"
+
     @staticmethod
     def _rsync(url, dest_file, username=None):
         full_url = "{0}@{1}".format(username, url) if username else url
+        # --append-verify resumes partial transfers, whole file is then
+        # checked by rsync
         cmd = ["rsync",
                "-avzhe",
                "ssh",
+               "--partial",
+               "--append-verify",
                full_url,
                dest_file]
         commons.run_command(cmd, loglevel=logging.WARN)
@@ -0,0 +1,125 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining RowReader class, which splits rows of input data files into
+fields, using the CSV format of partitioner configuration.
+
+Files are read as latin-1 text, which maps each byte to a character, so that
+binary fields are kept as is.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import gzip
+import io
+import json
+import os
+import re
+
+# default number of rows read at once
+BLOCK_ROWS = 100000
+
+
+def openText(path, mode):
+    """Open an input data file, compressed or not, in text mode.
+
+    Parameters
+    ----------
+    path : str
+        File path, files ending with .gz are compressed.
+    mode : str
+        'r' or 'w'.
+    """
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b', compresslevel=1),
+                                encoding='latin-1', newline='\n')
+    return io.open(path, mode, encoding='latin-1', newline='\n')
+
+
+class RowReader(object):
+    """
+    Reader of input data rows
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory of dataset, CSV format is read from
+        partition/common.json.
+    """
+
+    def __init__(self, data_dir):
+        path = os.path.join(data_dir, "partition", "common.json")
+        csv = {}
+        if os.path.exists(path):
+            with io.open(path) as f:
+                csv = json.load(f).get('in', {}).get('csv', {})
+        self.delimiter = csv.get('delimiter', '\t')
+        self.null = csv.get('null', "\\N")
+        self.escape = csv.get('escape', '\\')
+        self.quote = csv.get('quote', '"')
+
+        # fields may be quoted or contain escaped delimiters
+        e, q, d = [re.escape(c) for c in (self.escape, self.quote, self.delimiter)]
+        self._field = re.compile('(?:%s(?:%s.|[^%s%s])*%s|(?:%s.|[^%s%s])*)%s'
+                                 % (q, e, e, q, q, e, e, d, d), re.S)
+
+    def split(self, line):
+        """Return fields of a line, without end of line, or None if its last
+        field is not terminated, i.e. ends with an escape character.
+        """
+        fields = self._field.findall(line + self.delimiter)
+        # an unterminated field is skipped by findall
+        if sum(len(field) for field in fields) != len(line) + 1:
+            return None
+        return [field[:-1] for field in fields]
+
+    def blocks(self, path, nFields, block_rows=BLOCK_ROWS):
+        """Yield blocks of rows of an input file, each row as a list of
+        fields.
+
+        Lines with less than nFields fields are joined with next lines, as
+        binary fields may contain ends of line.
+
+        Raises
+        ------
+        ValueError
+            If a row does not have nFields fields.
+        """
+        block = []
+        row = None
+        with openText(path, 'r') as f:
+            for lineno, line in enumerate(f, 1):
+                row = line if row is None else row + line
+                fields = self.split(row[:-1] if row.endswith('\n') else row)
+                if fields is None or len(fields) < nFields:
+                    continue
+                if len(fields) > nFields:
+                    raise ValueError("%s:%s: expected %s fields, found %s"
+                                     % (path, lineno, nFields, len(fields)))
+                block.append(fields)
+                row = None
+                if len(block) == block_rows:
+                    yield block
+                    block = []
+        if row is not None:
+            raise ValueError("%s: last row has less than %s fields" % (path, nFields))
+        if block:
+            yield block
@@ -0,0 +1,300 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining DataScaler class, which writes a scaled copy of a test
+dataset.
+
+Each row of a partitioned table is written `factor` times. The first copy is
+the original row, in other copies ids are shifted so that they stay unique,
+director keys of child tables are shifted like ids of their director, and all
+positions of a row are moved by a small offset, which only depends on the
+director key and on the copy number, so that child rows stay in the chunk of
+their director and the spatial distribution of the dataset is preserved.
+Other tables are copied unchanged.
+
+Input files are processed by blocks of rows, so that memory use does not
+depend on input size or on scale factor. numpy is only required by this
+module.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import json
+import logging
+import os
+import shutil
+
+import yaml
+
+from .dataConfig import DataConfig
+from .dataRows import BLOCK_ROWS, RowReader, openText
+
+_LOG = logging.getLogger(__name__)
+
+# default maximum offset of positions in copies, in degrees
+JITTER = 1.0 / 3600
+
+_MASK64 = (1 << 64) - 1
+
+
+class _TableLayout(object):
+    """Columns of a partitioned table modified by scaling.
+    """
+
+    def __init__(self, fields, idColumn, directorKey, positions):
+        self.nFields = len(fields)
+        index = dict((name, i) for i, name in enumerate(fields))
+        self.id = index[idColumn] if idColumn in index else None
+        self.directorKey = index[directorKey]
+        self.positions = [(index[ra], index[decl]) for ra, decl in positions]
+        self.columns = sorted(set([self.directorKey] +
+                                  ([self.id] if self.id is not None else []) +
+                                  [c for pos in self.positions for c in pos]))
+        # id shift of each id column, for each copy
+        self.strides = {}
+
+
+class DataScaler(object):
+    """
+    Writer of scaled copies of a test dataset
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory of dataset to scale, e.g. datasets/case01/data.
+    jitter : float, optional
+        Maximum offset of positions in copies, in degrees.
+    block_rows : int, optional
+        Number of rows processed at once.
+    seed : int, optional
+        Seed of position offsets.
+    """
+
+    def __init__(self, data_dir, jitter=JITTER, block_rows=BLOCK_ROWS, seed=0):
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("numpy is required to scale datasets")
+        self._np = numpy
+        self._dataDir = data_dir
+        self._dataConfig = DataConfig(data_dir)
+        self._jitter = jitter
+        self._blockRows = block_rows
+        self._seed = seed
+        self._reader = RowReader(data_dir)
+
+    def _jsonConfig(self, *path):
+        path = os.path.join(self._dataDir, *path)
+        if not os.path.exists(path):
+            return {}
+        with io.open(path) as f:
+            return json.load(f)
+
+    def scaledTables(self):
+        """Return names of tables whose rows are multiplied: partitioned
+        tables with input data.
+        """
+        tables = []
+        for table in self._dataConfig.orderedTables:
+            if table in self._dataConfig.partitionedTables:
+                path = self._dataConfig.getInputDataFile(table)
+                if path and os.path.exists(path):
+                    tables.append(table)
+        return tables
+
+    def _layout(self, table):
+        partCfg = self._jsonConfig("partition", table + ".json")
+        ingestCfg = self._jsonConfig("ingest", table + ".json")
+
+        fields = partCfg.get('in', {}).get('csv', {}).get('field')
+        if not fields:
+            fields = [column['name'] for column in ingestCfg.get('schema', [])]
+
+        directorKey = ingestCfg.get('director_key') or \
+            partCfg.get('part', {}).get('id') or partCfg.get('id')
+        if not directorKey:
+            raise ValueError("no director key for table " + table)
+
+        positions = []
+        pairs = list(partCfg.get('pos', []))
+        if partCfg.get('part', {}).get('pos'):
+            pairs.append(partCfg['part']['pos'])
+        for pair in pairs:
+            ra, decl = [name.strip() for name in pair.split(',')]
+            if (ra, decl) not in positions:
+                positions.append((ra, decl))
+        if ingestCfg.get('longitude_key'):
+            pos = (ingestCfg['longitude_key'], ingestCfg['latitude_key'])
+            if pos not in positions:
+                positions.append(pos)
+
+        idColumn = partCfg.get('id')
+        if not idColumn and table in self._dataConfig.directors:
+            idColumn = directorKey
+        return _TableLayout(fields, idColumn, directorKey, positions)
+
+    def _column(self, block, col, dtype):
+        """Return values of a column as an array, and mask of NULL values.
+        """
+        np = self._np
+        values = np.array([row[col] for row in block])
+        nulls = values == self._reader.null
+        values = np.where(nulls, '0', values).astype(dtype)
+        return values, nulls
+
+    def _maxId(self, path, layout, col):
+        maxId = None
+        for block in self._reader.blocks(path, layout.nFields, self._blockRows):
+            values, nulls = self._column(block, col, self._np.int64)
+            if not nulls.all():
+                blockMax = int(values[~nulls].max())
+                maxId = blockMax if maxId is None else max(maxId, blockMax)
+        return maxId
+
+    def _uniform(self, keys, copy, salt):
+        """Return pseudo-random values in [-1, 1), one per key, which only
+        depend on key, copy number, salt and seed (splitmix64 hash).
+        """
+        np = self._np
+        offset = (copy * 0x9E3779B97F4A7C15 + salt * 0xD1B54A32D192ED03 +
+                  self._seed) & _MASK64
+        with np.errstate(over='ignore'):
+            z = keys.astype(np.uint64) + np.uint64(offset)
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            z = z ^ (z >> np.uint64(31))
+        return (z >> np.uint64(11)).astype(np.float64) * 2.0 ** -52 - 1.0
+
+    def _format(self, values, nulls, fmt):
+        np = self._np
+        return np.where(nulls, self._reader.null, np.char.mod(fmt, values))
+
+    def _scaleBlock(self, block, layout, factor):
+        """Generate lines of each copy of a block of rows, one copy at a
+        time, so that memory use does not depend on scale factor.
+        """
+        np = self._np
+        d = self._reader.delimiter
+        cols = layout.columns
+
+        # unmodified fields between modified columns
+        segments = []
+        prev = 0
+        for i, col in enumerate(cols):
+            segments.append(np.array([(d if i else '') +
+                                      ''.join(f + d for f in row[prev:col])
+                                      for row in block]))
+            prev = col + 1
+        segments.append(np.array([''.join(d + f for f in row[prev:]) + '\n'
+                                  for row in block]))
+
+        keys, keyNulls = self._column(block, layout.directorKey, np.int64)
+        ints = {layout.directorKey: (keys, keyNulls)}
+        if layout.id is not None:
+            ints[layout.id] = self._column(block, layout.id, np.int64)
+        floats = dict((col, self._column(block, col, np.float64))
+                      for pos in layout.positions for col in pos)
+
+        yield ''.join(d.join(row) + '\n' for row in block)
+        for copy in range(1, factor):
+            values = {}
+            for col, (v, nulls) in ints.items():
+                values[col] = self._format(v + copy * layout.strides[col], nulls, '%d')
+            dRa = self._uniform(keys, copy, 1) * self._jitter
+            dDecl = self._uniform(keys, copy, 2) * self._jitter
+            for ra, decl in layout.positions:
+                v, nulls = floats[ra]
+                values[ra] = self._format(np.mod(v + dRa, 360.0), nulls, '%.15g')
+                v, nulls = floats[decl]
+                values[decl] = self._format(np.clip(v + dDecl, -90.0, 90.0),
+                                            nulls, '%.15g')
+            rows = segments[0]
+            for i, col in enumerate(cols):
+                rows = np.char.add(np.char.add(rows, values[col]), segments[i + 1])
+            yield ''.join(rows.tolist())
+
+    def scale(self, out_dir, factor):
+        """Write a scaled copy of dataset.
+
+        Parameters
+        ----------
+        out_dir : str
+            Directory of scaled dataset, must not exist.
+        factor : int
+            Number of copies of each row of partitioned tables.
+        """
+        if factor < 1:
+            raise ValueError("scale factor must be positive: %s" % factor)
+        tables = self.scaledTables()
+        layouts = dict((table, self._layout(table)) for table in tables)
+        dataFiles = dict((table, self._dataConfig.getInputDataFile(table))
+                         for table in tables)
+
+        # id shifts, director keys are shifted like ids of directors
+        strides = {}
+        directorStride = {}
+        for table in tables:
+            layout = layouts[table]
+            if layout.id is not None:
+                maxId = self._maxId(dataFiles[table], layout, layout.id)
+                strides[table] = (maxId or 0) + 1
+                if table in self._dataConfig.directors:
+                    directorStride[table] = strides[table]
+        for table in tables:
+            layout = layouts[table]
+            colStrides = {}
+            if layout.id is not None:
+                colStrides[layout.id] = strides[table]
+            if layout.directorKey != layout.id:
+                directors = self._dataConfig.getDirectorTables(table)
+                if not directors or directors[0] not in directorStride:
+                    raise ValueError("director of table %s is not scaled" % table)
+                colStrides[layout.directorKey] = directorStride[directors[0]]
+            if max(colStrides.values()) * factor >= 2 ** 63:
+                raise ValueError("ids of table %s overflow with scale factor %s"
+                                 % (table, factor))
+            layout.strides = colStrides
+
+        dataDir = os.path.abspath(self._dataDir)
+        ignored = set(os.path.basename(path) for path in dataFiles.values())
+        shutil.copytree(self._dataDir, out_dir,
+                        ignore=lambda d, names: [n for n in names if n in ignored and
+                                                 os.path.abspath(d) == dataDir])
+
+        for table in tables:
+            _LOG.info("Scale table %s by %s", table, factor)
+            outFile = os.path.join(out_dir, os.path.basename(dataFiles[table]))
+            with openText(outFile, 'w') as out:
+                for block in self._reader.blocks(dataFiles[table], layouts[table].nFields,
+                                                 self._blockRows):
+                    for lines in self._scaleBlock(block, layouts[table], factor):
+                        out.write(lines)
+
+        with io.open(os.path.join(self._dataDir, "description.yaml")) as f:
+            description = yaml.safe_load(f)
+        # remote data files are not scaled
+        description.pop('remote', None)
+        description['scale'] = {'factor': factor, 'jitter': self._jitter,
+                                'source': os.path.abspath(self._dataDir)}
+        with io.open(os.path.join(out_dir, "description.yaml"), 'w') as f:
+            f.write(u"# Scaled copy of %s\n" % os.path.abspath(self._dataDir))
+            f.write(yaml.safe_dump(description, default_flow_style=None))
@@ -0,0 +1,280 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module concatenating input data files for loader, in-process.
+
+Data is copied by the kernel when possible (copy_file_range(2) between
+files, sendfile(2) to a pipe), and with a plain read/write loop otherwise.
+Files can be concatenated into a regular file, or streamed into a named
+pipe read by the loader, so that concatenated data is never stored.
+Compressed files can also be decompressed while they are streamed, so that
+decompressed data is never stored either.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import errno
+import gzip
+import logging
+import os
+import threading
+
+_LOG = logging.getLogger(__name__)
+
+_BUFFER_SIZE = 1024 * 1024
+
+# errors meaning a copy method is not supported for a pair of files
+_UNSUPPORTED = (errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EBADF,
+                errno.EOPNOTSUPP, errno.ESPIPE)
+
+
+def _copyRange(src_fd, dst_fd, size):
+    """Copy size bytes using copy_file_range, return number of copied bytes.
+    """
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, size - copied)
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _sendFile(src_fd, dst_fd, size, offset):
+    """Copy size bytes from offset using sendfile, return number of copied
+    bytes.
+    """
+    copied = 0
+    while copied < size:
+        n = os.sendfile(dst_fd, src_fd, offset + copied, size - copied)
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _writeAll(dst_fd, data):
+    view = memoryview(data)
+    while view:
+        n = os.write(dst_fd, view)
+        view = view[n:]
+
+
+def _readWrite(src_fd, dst_fd, offset):
+    """Copy remaining data from offset with read/write, return number of
+    copied bytes.
+    """
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    copied = 0
+    while True:
+        data = os.read(src_fd, _BUFFER_SIZE)
+        if not data:
+            return copied
+        _writeAll(dst_fd, data)
+        copied += len(data)
+
+
+def copyFile(src_fd, dst_fd):
+    """Append content of a file to a file descriptor.
+
+    Parameters
+    ----------
+    src_fd : int
+        Descriptor of a regular file, open for reading and positioned at its
+        beginning.
+    dst_fd : int
+        Descriptor of a regular file or of a pipe, open for writing.
+
+    Returns
+    -------
+    Number of copied bytes.
+    """
+    size = os.fstat(src_fd).st_size
+    copied = 0
+    methods = []
+    if hasattr(os, 'copy_file_range'):
+        methods.append(lambda: _copyRange(src_fd, dst_fd, size - copied))
+    if hasattr(os, 'sendfile'):
+        methods.append(lambda: _sendFile(src_fd, dst_fd, size - copied, copied))
+    for method in methods:
+        try:
+            copied += method()
+        except OSError as exc:
+            if exc.errno not in _UNSUPPORTED:
+                raise
+        if copied >= size:
+            return copied
+    # file may also have grown since fstat()
+    return copied + _readWrite(src_fd, dst_fd, copied)
+
+
+def concatenate(sources, dst_fd):
+    """Append content of files to a file descriptor.
+
+    Parameters
+    ----------
+    sources : list
+        Paths of files to copy, in this order.
+    dst_fd : int
+        Descriptor of a regular file or of a pipe, open for writing.
+
+    Returns
+    -------
+    Number of copied bytes.
+    """
+    total = 0
+    for source in sources:
+        fd = os.open(source, os.O_RDONLY)
+        try:
+            total += copyFile(fd, dst_fd)
+        finally:
+            os.close(fd)
+    return total
+
+
+def decompress(sources, dst_fd):
+    """Append decompressed content of gzip files to a file descriptor.
+
+    Parameters
+    ----------
+    sources : list
+        Paths of gzip files, in this order.
+    dst_fd : int
+        Descriptor of a regular file or of a pipe, open for writing.
+
+    Returns
+    -------
+    Number of decompressed bytes.
+    """
+    total = 0
+    for source in sources:
+        with gzip.open(source, 'rb') as f:
+            while True:
+                data = f.read(_BUFFER_SIZE)
+                if not data:
+                    break
+                _writeAll(dst_fd, data)
+                total += len(data)
+    return total
+
+
+def concatenateFiles(sources, target):
+    """Concatenate files into a target file, replacing it.
+
+    Target is written to a temporary file which is then renamed, so that a
+    failed or repeated concatenation never leaves partial or duplicated
+    data.
+
+    Parameters
+    ----------
+    sources : list
+        Paths of files to concatenate, in this order.
+    target : str
+        Path of resulting file.
+
+    Returns
+    -------
+    Number of copied bytes.
+    """
+    tmpTarget = target + ".tmp"
+    fd = os.open(tmpTarget, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        total = concatenate(sources, fd)
+    except Exception:
+        os.close(fd)
+        os.unlink(tmpTarget)
+        raise
+    os.close(fd)
+    os.rename(tmpTarget, target)
+    _LOG.debug("Concatenated %s files (%s bytes) into %s",
+               len(sources), total, target)
+    return total
+
+
+class FileStream(object):
+    """Context manager streaming files into a named pipe.
+
+    On entry a named pipe is created at the given path, replacing any file,
+    and a thread writes the concatenation of files into it once a reader
+    opens it. On exit the thread is stopped, the pipe is removed, and writer
+    errors are raised, unless the reader stopped reading early.
+
+    Parameters
+    ----------
+    sources : list
+        Paths of files to stream, in this order.
+    fifo : str
+        Path of the named pipe.
+    gzipped : boolean, optional
+        If `True`, sources are gzip files, whose decompressed content is
+        streamed.
+    """
+
+    def __init__(self, sources, fifo, gzipped=False):
+        self._sources = sources
+        self._fifo = fifo
+        self._copy = decompress if gzipped else concatenate
+        self._thread = None
+        self._opened = threading.Event()
+        self._error = None
+
+    def _write(self):
+        try:
+            fd = os.open(self._fifo, os.O_WRONLY)
+            self._opened.set()
+            try:
+                total = self._copy(self._sources, fd)
+            finally:
+                os.close(fd)
+            _LOG.debug("Streamed %s files (%s bytes) into %s",
+                       len(self._sources), total, self._fifo)
+        except Exception as exc:
+            self._error = exc
+        finally:
+            self._opened.set()
+
+    def __enter__(self):
+        if os.path.lexists(self._fifo):
+            os.unlink(self._fifo)
+        os.mkfifo(self._fifo)
+        self._thread = threading.Thread(target=self._write,
+                                        name="stream-" + os.path.basename(self._fifo))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._thread.is_alive():
+            # reader never opened the pipe or stopped reading, open it until
+            # writer has opened it too, then close it, so that writer fails
+            # with EPIPE
+            fd = os.open(self._fifo, os.O_RDONLY | os.O_NONBLOCK)
+            self._opened.wait()
+            os.close(fd)
+        self._thread.join()
+        os.unlink(self._fifo)
+        if exc_type is None and self._error is not None:
+            if getattr(self._error, 'errno', None) == errno.EPIPE:
+                _LOG.warning("Reader of %s did not read all data",
+                             self._fifo)
+            else:
+                raise self._error
+        return False
@@ -29,27 +29,114 @@ Wrap Qserv user-friendly loader.
 
 from __future__ import absolute_import, division, print_function
 
+from concurrent import futures
 import glob
 import logging
 import os
+import sys
+import threading
+import time
 
 from lsst.qserv import css
 from lsst.qserv import qmeta
 from lsst.qserv.admin import nodeAdmin
 from lsst.qserv.admin import nodeMgmt
+from lsst.qserv.admin import commons
 from lsst.qserv.wmgr.client import WmgrClient
+from . import dataStream
+
+# version of the loading procedure, increment it when loaded tables change
+# for unchanged input data, so that incremental loading reloads all tables
+LOADER_VERSION = 1
+
+# maximum number of nodes on which an operation runs simultaneously
+NODE_JOBS = 32
+
+_LOG = logging.getLogger(__name__)
+
+
+class NodeError(Exception):
+    '''
+    Raised when an operation failed on one or more nodes
+    @param action: operation description
+    @param errors: dictionary mapping node name to exception
+    '''
+    def __init__(self, action, errors):
+        self.action = action
+        self.errors = errors
+        Exception.__init__(self, "%s failed on node(s): %s" % (
+            action, ", ".join("%s (%s)" % (node, exc)
+                              for node, exc in sorted(errors.items()))))
+
+
+def runOnNodes(action, tasks):
+    '''
+    Run an operation concurrently on several nodes, and log duration of
+    each operation. All operations are completed before errors are reported.
+    @param action: operation description
+    @param tasks: list of (node name, callable) pairs
+    @return dictionary mapping node name to duration in seconds
+    @raise NodeError: if operation failed on any node
+    '''
+    def _timed(func):
+        start = time.time()
+        func()
+        return time.time() - start
+
+    timings = {}
+    errors = {}
+    if not tasks:
+        return timings
+    with futures.ThreadPoolExecutor(max_workers=min(len(tasks), NODE_JOBS)) as pool:
+        running = [(node, pool.submit(_timed, func)) for node, func in tasks]
+        for node, future in running:
+            try:
+                timings[node] = future.result()
+                _LOG.debug("%s on %s took %.3f s", action, node, timings[node])
+            except Exception as exc:
+                _LOG.error("%s failed on %s: %s", action, node, exc)
+                errors[node] = exc
+    if errors:
+        raise NodeError(action, errors)
+    return timings
 
 
 class DbLoader(object):
     '''
     @param czar_list: A list of czar names (like czar1.localdomain) that 
                       should be updated with database schema information.
+    @param stream_chunks: if True, duplicated data chunks are streamed to
+                          the loader through a named pipe instead of being
+                          concatenated into a file
+    @param input_staging: InputStaging instance providing decompressed input
+                          data files, if None loader reads input data files
+    @param in_process: if True, user-friendly loader Python API is called
+                       in-process, with wmgr and CSS connections shared by
+                       all tables, instead of running one loader process
+                       per table, czars can not be updated in-process
+    @param stream_input: if True, compressed input data files of tables
+                         which are not partitioned by the loader are
+                         decompressed into a named pipe read by the loader,
+                         instead of being decompressed on disk, if loader
+                         reads them only once
     '''
-    def __init__(self, config, data_reader, db_name, multi_node, out_dirname, czar_list):
+
+    # False if loader does not partition partitioned tables
+    partitions = True
+
+    def __init__(self, config, data_reader, db_name, multi_node, out_dirname, czar_list,
+                 stream_chunks=False, input_staging=None, in_process=False,
+                 stream_input=False):
        
         self.config = config
         self.dataConfig = data_reader
         self._dbName = db_name
+        self._streamChunks = stream_chunks
+        self._inputStaging = input_staging
+        self._inProcess = in_process
+        self._streamInput = stream_input
+        self._inProcessLock = threading.Lock()
+        self._inProcessCss = None
 
         self._multi_node = multi_node
         self._out_dirname = out_dirname
@@ -64,6 +151,10 @@ class DbLoader(object):
             for node in self.nMgmt.select(nodeType='worker', state='ACTIVE'):
                 self.nWmgrs[node.name()] = node.wmgrClient()
 
+        if in_process and czar_list:
+            raise ValueError("In-process loader can not update czars %s, "
+                             "run without in-process loader" % (czar_list,))
+
         self.czarWmgrs = []
         self.logger.info("czar_list=%s", czar_list)
         if czar_list is not None:
@@ -79,12 +170,34 @@ class DbLoader(object):
                                     port=self.config['wmgr']['port'],
                                     secretFile=self.config['wmgr']['secret'])
 
-    def loaderCmdCommonOpts(self, table):
+    def loaderCommonOpts(self, table):
         """
-        Return user-friendly loader command-line options which are common
-        to both Qserv and MySQL
+        Return user-friendly loader options which are common to both Qserv
+        and MySQL, as a dictionary of DataLoader keyword arguments, plus
+        'configFiles', 'useCss', 'workers' and 'czars' keys
         """
         tmp_dir = self.config['qserv']['tmp_dir']
+        opts = dict(configFiles=[os.path.join(self.dataConfig.dataDir, "partition", "common.json")],
+                    useCss=True, chunksDir=None, skipPart=False, oneTable=False,
+                    cssClear=False, emptyChunks=None, deleteTables=True,
+                    workers=[], czars=[])
+
+        if self.dataConfig.duplicatedTables:
+            # Other parameters if using duplicated data
+            opts['configFiles'] += [os.path.join(self.dataConfig.dataDir, "partition",
+                                                 table+".json")]
+        else:
+            # WARN: required to unzip input data file, unless it is streamed
+            opts['chunksDir'] = os.path.join(tmp_dir, "qserv_data_loader", table)
+
+        return opts
+
+    def loaderCmd(self, opts, args):
+        """
+        Return user-friendly loader command line
+        @param opts: loader options, see loaderCommonOpts()
+        @param args: loader arguments, see loaderCmdCommonArgs()
+        """
         cmd = ['qserv-data-loader.py']
 
         logLevel = self.logger.getEffectiveLevel()
@@ -94,39 +207,46 @@ class DbLoader(object):
         elif logLevel is logging.INFO:
             cmd += ['-v']
 
-        cmd += ['--config=' + os.path.join(self.dataConfig.dataDir, "partition", "common.json"),
-                '--host=' + self.config['qserv']['master'],
+        cmd += ['--config=' + configFile for configFile in opts['configFiles']]
+        cmd += ['--host=' + self.config['qserv']['master'],
                 '--port=' + self.config['wmgr']['port'],
-                '--secret=' + self.config['wmgr']['secret'],
-                '--delete-tables']
+                '--secret=' + self.config['wmgr']['secret']]
 
-        if self.dataConfig.duplicatedTables:
-            # Other parameters if using duplicated data
-            cmd += ['--config={0}'.format(os.path.join(self.dataConfig.dataDir, "partition",
-                                                       table+".json"))]
-        else:
-            # WARN: required to unzip input data file
-            cmd += ['--chunks-dir={0}'.format(os.path.join(tmp_dir,
-                                                           "qserv_data_loader",
-                                                           table))]
+        flags = [('deleteTables', '--delete-tables'),
+                 ('skipPart', '--skip-partition'),
+                 ('oneTable', '--one-table'),
+                 ('cssClear', '--css-remove')]
+        cmd += [flag for key, flag in flags if opts[key]]
+        if not opts['useCss']:
+            cmd += ['--no-css']
+        if opts['chunksDir']:
+            cmd += ['--chunks-dir={0}'.format(opts['chunksDir'])]
+        if opts['emptyChunks']:
+            cmd += ['--empty-chunks={0}'.format(opts['emptyChunks'])]
+        for worker in opts['workers']:
+            cmd += ['--worker', worker]
+        for czar in opts['czars']:
+            cmd += ['-z', czar]
 
-        return cmd
+        return cmd + args
 
     def loaderCmdCommonArgs(self, table):
         """
         Return user-friendly loader command-line arguments which are common
         to both Qserv and MySQL
         """
-        tmp_dir = self.config['qserv']['tmp_dir']
         cmd = [self._dbName,
                table,
                self.dataConfig.getSchemaFile(table)]
 
         if self.dataConfig.duplicatedTables:
-            dataFile = os.path.join(tmp_dir, self._out_dirname, "chunks/", table, table + ".txt")
-            for filename in glob.glob(os.path.join(tmp_dir, self._out_dirname,
-                                                   "chunks/", table, 'chunk_[0-9][0-9][0-9][0-9].txt')):
-                os.system("cat " + filename + " >> " + dataFile)
+            dataFile = self._chunksDataFile(table)
+            if not self._streamChunks:
+                dataStream.concatenateFiles(self._chunkFiles(table), dataFile)
+        elif self.streamsInput(table):
+            dataFile = self._inputFifo(table)
+        elif self._inputStaging is not None:
+            dataFile = self._inputStaging.path(table)
         else:
             dataFile = self.dataConfig.getInputDataFile(table)
 
@@ -134,6 +254,129 @@ class DbLoader(object):
             cmd += [dataFile]
         return cmd
 
+    def streamsInput(self, table):
+        """
+        Return True if compressed input data file of a table is decompressed
+        into a named pipe read by the loader. Partitioner needs a regular
+        file, so input data of tables partitioned by the loader is not
+        streamed. Named pipe can only be read once, so input data is not
+        streamed either if loader reads it several times.
+
+        With the integration test datasets, this streams all tables loaded
+        in MySQL, which does not partition them, and non-partitioned tables
+        (e.g. Filter or Science_Ccd_Exposure in case01) loaded in
+        single-node Qserv. No table is streamed in multi-node Qserv, where
+        non-partitioned tables are loaded on every worker.
+        """
+        dataFile = self.dataConfig.getInputDataFile(table)
+        return bool(self._streamInput and not self.dataConfig.duplicatedTables and
+                    dataFile and dataFile.endswith(".gz") and
+                    not (self.partitions and table in self.dataConfig.partitionedTables) and
+                    self._readsInputOnce())
+
+    def _readsInputOnce(self):
+        """
+        Return True if loader reads input data files only once: it does not
+        partition them, or it loads non-partitioned tables on the master
+        only. Otherwise these tables are also loaded on each worker and czar.
+        """
+        return not (self.partitions and (self._multi_node or self.czarWmgrs))
+
+    def _inputFifo(self, table):
+        """
+        Return path of named pipe where input data file of a table is
+        decompressed
+        """
+        dataFile = os.path.basename(self.dataConfig.getInputDataFile(table))
+        return os.path.join(self.config['qserv']['tmp_dir'], self._out_dirname,
+                            "input", dataFile[:-len(".gz")])
+
+    def _chunksDir(self, table):
+        return os.path.join(self.config['qserv']['tmp_dir'], self._out_dirname,
+                            "chunks/", table)
+
+    def _chunksDataFile(self, table):
+        """
+        Return path of input data file of a duplicated table, which
+        contains all its chunks
+        """
+        return os.path.join(self._chunksDir(table), table + ".txt")
+
+    def _chunkFiles(self, table):
+        return sorted(glob.glob(os.path.join(self._chunksDir(table),
+                                             'chunk_[0-9][0-9][0-9][0-9].txt')))
+
+    def runLoader(self, table, opts, args):
+        """
+        Run user-friendly loader for a table, streaming duplicated data
+        chunks or decompressed input data to the loader if required
+        @param opts: loader options, see loaderCommonOpts()
+        @param args: loader arguments, see loaderCmdCommonArgs()
+        """
+        if self.dataConfig.duplicatedTables and self._streamChunks:
+            with dataStream.FileStream(self._chunkFiles(table),
+                                       self._chunksDataFile(table)):
+                self._load(opts, args)
+        elif self.streamsInput(table):
+            fifo = self._inputFifo(table)
+            if not os.path.isdir(os.path.dirname(fifo)):
+                try:
+                    os.makedirs(os.path.dirname(fifo))
+                except OSError:
+                    if not os.path.isdir(os.path.dirname(fifo)):
+                        raise
+            with dataStream.FileStream([self.dataConfig.getInputDataFile(table)],
+                                       fifo, gzipped=True):
+                self._load(opts, args)
+        else:
+            self._load(opts, args)
+
+    def _load(self, opts, args):
+        if self._inProcess:
+            self._loadInProcess(opts, args)
+            return
+        # Use same logging configuration for loader and integration test
+        # command line, this allow to redirect loader to sys.stdout, sys.stderr
+        loaderCmd = self.loaderCmd(opts, args)
+        self.logger.debug("loaderCmd=%s", loaderCmd)
+        commons.run_command(loaderCmd,
+                            stdout=sys.stdout,
+                            stderr=sys.stderr)
+
+    def _loadInProcess(self, opts, args):
+        '''
+        Load a table with user-friendly loader Python API, wmgr connections
+        replace --host, --port and --secret options and loader logs through
+        this class logger
+        @param opts: loader options, see loaderCommonOpts()
+        @param args: loader arguments, see loaderCmdCommonArgs()
+        '''
+        # loader API imports partitioner bindings, only needed here
+        from lsst.qserv.admin.dataLoader import DataLoader
+
+        # loader uses connections which are not thread-safe
+        with self._inProcessLock:
+            cssAccess = None
+            if opts['useCss']:
+                if self._inProcessCss is None:
+                    self._inProcessCss = css.CssAccess.createFromConfig(self.config['css'], '')
+                cssAccess = self._inProcessCss
+            workerWmgrs = dict((worker, self.nWmgrs[worker]) for worker in opts['workers'])
+            loader = DataLoader(opts['configFiles'],
+                                self.czar_wmgr,
+                                workerWmgrMap=workerWmgrs,
+                                css=cssAccess,
+                                chunksDir=opts['chunksDir'],
+                                skipPart=opts['skipPart'],
+                                oneTable=opts['oneTable'],
+                                cssClear=opts['cssClear'],
+                                emptyChunks=opts['emptyChunks'],
+                                deleteTables=opts['deleteTables'],
+                                loggerName=self.logger.name)
+            database, table, schema = args[:3]
+            self.logger.debug("Load table %s in-process", table)
+            loader.load(database, table, schema, args[3:])
+
     def resetChunksCache(self):
         """
         Clear czar chunk cache (a.k.a. empty chunk list cache)
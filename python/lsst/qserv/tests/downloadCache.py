@@ -0,0 +1,210 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining DownloadCache class, a content-addressed store of downloaded
+files.
+
+Files are stored as objects/<sha256> and are read-only, so that they can be
+hard-linked into datasets. Downloads are written to partial/<url hash>,
+which is kept when a download fails, so that the next download resumes from
+it. An index maps downloaded URLs to digests, so that a file is fetched only
+once even when its checksum is not known in advance. Cache can be shared by
+concurrent processes: a download and updates of the index are serialized by
+locks on files in locks/.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import stat
+import threading
+
+_LOG = logging.getLogger(__name__)
+
+_BUFFER_SIZE = 1024 * 1024
+
+_INDEX = "index.json"
+
+
+class ChecksumError(Exception):
+    """Raised when a downloaded file does not match its expected checksum.
+    """
+    pass
+
+
+def sha256(path):
+    """Return SHA-256 hex digest of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(_BUFFER_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def _fileLock(path):
+    """Hold an exclusive lock on a file, excluding other processes and other
+    threads holding it through another file descriptor.
+    """
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class DownloadCache(object):
+    """
+    Content-addressed store of downloaded files
+
+    Parameters
+    ----------
+    cache_dir : str
+        Cache directory, shared by all datasets.
+    """
+
+    def __init__(self, cache_dir):
+        self._dir = cache_dir
+        self._lock = threading.Lock()
+        self._index = None
+        for subdir in ("objects", "partial", "locks"):
+            path = os.path.join(cache_dir, subdir)
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+    def _object(self, digest):
+        return os.path.join(self._dir, "objects", digest)
+
+    def _partial(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self._dir, "partial", key)
+
+    def _lockFile(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self._dir, "locks", key)
+
+    def _loadedIndex(self):
+        """Return index, reading it if needed, must be called with lock held.
+        """
+        if self._index is None:
+            try:
+                with open(os.path.join(self._dir, _INDEX)) as f:
+                    self._index = json.load(f)
+            except (IOError, OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _indexed(self, url, reload=False):
+        with self._lock:
+            if reload:
+                self._index = None
+            return self._loadedIndex().get(url)
+
+    def _record(self, url, digest):
+        with self._lock, _fileLock(os.path.join(self._dir, "locks", _INDEX)):
+            # other processes may have updated index
+            self._index = None
+            self._loadedIndex()[url] = digest
+            tmpIndex = os.path.join(self._dir, _INDEX + ".tmp")
+            with open(tmpIndex, 'w') as f:
+                json.dump(self._index, f, indent=2, sort_keys=True)
+            os.rename(tmpIndex, os.path.join(self._dir, _INDEX))
+
+    def lookup(self, url, checksum=None, reload=False):
+        """Return path of cached file for an URL, or None if it is not cached.
+
+        Parameters
+        ----------
+        url : str
+            URL of file.
+        checksum : str, optional
+            Expected SHA-256 hex digest, if known file is looked up by
+            content, whatever its URL.
+        reload : bool, optional
+            If `True`, index is read again, to see files downloaded by
+            other processes.
+        """
+        digest = checksum or self._indexed(url, reload)
+        if digest and os.path.exists(self._object(digest)):
+            return self._object(digest)
+        return None
+
+    def fetch(self, url, download, checksum=None):
+        """Return path of cached file for an URL, downloading it if needed.
+
+        Parameters
+        ----------
+        url : str
+            URL of file.
+        download : callable
+            Called with URL and path of partial file, must download file to
+            this path, resuming from its current content if it exists.
+        checksum : str, optional
+            Expected SHA-256 hex digest.
+
+        Raises
+        ------
+        ChecksumError
+            If downloaded file does not match checksum, partial file is then
+            removed.
+        """
+        path = self.lookup(url, checksum)
+        if path is None:
+            # only one process or thread downloads an URL at a time
+            with _fileLock(self._lockFile(url)):
+                # file may have been downloaded while waiting for the lock
+                path = self.lookup(url, checksum, reload=True)
+                if path is None:
+                    return self._download(url, download, checksum)
+        _LOG.info("Use cached %s", url)
+        return path
+
+    def _download(self, url, download, checksum):
+        """Download an URL to the cache, must be called with its lock held.
+        """
+        partial = self._partial(url)
+        if os.path.exists(partial):
+            _LOG.info("Resume download of %s (%s bytes)", url,
+                      os.path.getsize(partial))
+        else:
+            _LOG.info("Download %s", url)
+        download(url, partial)
+
+        digest = sha256(partial)
+        if checksum and digest != checksum:
+            os.unlink(partial)
+            raise ChecksumError("checksum mismatch for %s: expected %s, found %s"
+                                % (url, checksum, digest))
+        path = self._object(digest)
+        os.chmod(partial, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.rename(partial, path)
+        self._record(url, digest)
+        return path
@@ -0,0 +1,124 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Sort lines of a file in bounded memory.
+
+Files which fit in memory are sorted in place. Larger files are split into
+sorted runs spilled to temporary files, which are then merged.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import heapq
+import logging
+import os
+import stat
+import tempfile
+
+_LOG = logging.getLogger(__name__)
+
+# default amount of line data held in memory, in bytes
+MAX_MEMORY = 64 * 1024 * 1024
+
+# maximum number of runs merged at once
+MAX_RUNS = 64
+
+
+def _writeRun(lines, dirname):
+    """Write sorted lines to a new temporary file, rewound for reading.
+    """
+    run = tempfile.TemporaryFile(dir=dirname)
+    run.writelines(lines)
+    run.seek(0)
+    return run
+
+
+def _mergeRuns(runs, out):
+    """Merge sorted runs into out and close them.
+    """
+    try:
+        out.writelines(heapq.merge(*runs))
+    finally:
+        for run in runs:
+            run.close()
+
+
+def sortFile(filename, max_memory=MAX_MEMORY):
+    """Sort lines of a file, in the same order as `sorted()` on its lines.
+
+    A newline is added to the last line if it does not end with one.
+
+    Parameters
+    ----------
+    filename : str
+        File which is replaced by its sorted version.
+    max_memory : int, optional
+        Amount of line data held in memory, in bytes, files bigger than this
+        are sorted using temporary files located in the same directory.
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    runs = []
+    try:
+        with open(filename, 'rb') as f:
+            lines = []
+            size = 0
+            for line in f:
+                # runs are merged line by line, last line needs a newline
+                if not line.endswith(b'\n'):
+                    line += b'\n'
+                lines.append(line)
+                size += len(line)
+                if size >= max_memory:
+                    runs.append(_writeRun(sorted(lines), dirname))
+                    lines = []
+                    size = 0
+
+        if not runs:
+            # fast path: whole file fits in memory
+            lines.sort()
+            with open(filename, 'wb') as f:
+                f.writelines(lines)
+            return
+
+        if lines:
+            runs.append(_writeRun(sorted(lines), dirname))
+        del lines
+        _LOG.debug("Merging %s sorted runs of %s", len(runs), filename)
+
+        while len(runs) > MAX_RUNS:
+            merged = tempfile.TemporaryFile(dir=dirname)
+            _mergeRuns(runs[:MAX_RUNS], merged)
+            merged.seek(0)
+            runs = runs[MAX_RUNS:] + [merged]
+
+        fd, tmpName = tempfile.mkstemp(dir=dirname, prefix=".sort-")
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                _mergeRuns(runs, out)
+            runs = []
+            os.chmod(tmpName, stat.S_IMODE(os.stat(filename).st_mode))
+            os.rename(tmpName, filename)
+        except Exception:
+            os.unlink(tmpName)
+            raise
+    finally:
+        for run in runs:
+            run.close()
@@ -0,0 +1,96 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining FileDigests class, which computes SHA-256 digests of files
+and memoizes them, so that big input files are not read again as long as
+their size and modification time do not change.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+_LOG = logging.getLogger(__name__)
+
+_BUFFER_SIZE = 1024 * 1024
+
+
+class FileDigests(object):
+    """
+    Memoized file digests
+
+    Parameters
+    ----------
+    memo_file : str
+        File where digests are stored between runs.
+    """
+
+    def __init__(self, memo_file):
+        self._memoFile = memo_file
+        self._lock = threading.Lock()
+        self._digests = None
+        self._modified = False
+
+    def digest(self, path):
+        """Return SHA-256 hex digest of a file.
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        signature = [st.st_size, st.st_mtime]
+        with self._lock:
+            if self._digests is None:
+                try:
+                    with open(self._memoFile) as f:
+                        self._digests = json.load(f)
+                except (IOError, OSError, ValueError):
+                    self._digests = {}
+            known = self._digests.get(path)
+        if known is not None and known[0] == signature:
+            return known[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(_BUFFER_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+        with self._lock:
+            self._digests[path] = [signature, digest.hexdigest()]
+            self._modified = True
+        return digest.hexdigest()
+
+    def save(self):
+        """Store memoized digests, if some were computed.
+        """
+        with self._lock:
+            if not self._modified:
+                return
+            dirname = os.path.dirname(self._memoFile)
+            if dirname and not os.path.exists(dirname):
+                os.makedirs(dirname)
+            with open(self._memoFile, 'w') as f:
+                json.dump(self._digests, f)
+            self._modified = False
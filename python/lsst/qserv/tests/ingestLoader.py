@@ -0,0 +1,401 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining Qserv loader class using the ingest HTTP API of the
+replication system, driven by the ingest/*.json configuration of datasets.
+
+Public functions are used in benchmark module, using duck-typing interface,
+like `QservLoader`.
+
+Each table is registered, partitioned with sph-partition if required, and
+its contributions (chunk files, or the whole file for regular tables) are
+uploaded to workers in parallel, in one super-transaction per table.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from concurrent import futures
+import glob
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import uuid
+
+try:
+    import http.client as httplib
+    from urllib.parse import urlparse
+except ImportError:
+    import httplib  # python2
+    from urlparse import urlparse
+
+from lsst.qserv.admin import commons
+from . import inputStaging
+
+_LOG = logging.getLogger(__name__)
+
+# default port of replication controller HTTP server
+DEFAULT_PORT = 25081
+
+# default number of contributions uploaded simultaneously for a table
+INGEST_JOBS = 8
+
+# timeout of HTTP requests, in seconds
+TIMEOUT = 3600
+
+_BUFFER_SIZE = 1024 * 1024
+
+# chunk files written by partitioner or duplicator
+_CHUNK_FILE = re.compile(r'^chunk_(\d+)(_overlap)?\.txt$')
+
+
+class IngestError(Exception):
+    """Raised when an ingest service request fails.
+    """
+    pass
+
+
+class IngestClient(object):
+    """
+    Client of the ingest HTTP API
+
+    Parameters
+    ----------
+    url : str
+        Base URL of replication controller, e.g. "http://master:25081".
+    auth_key : str, optional
+        Authorization key of the ingest service.
+    timeout : float, optional
+        Timeout of each request, in seconds.
+    """
+
+    def __init__(self, url, auth_key="", timeout=TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or DEFAULT_PORT
+        self._authKey = auth_key
+        self._timeout = timeout
+
+    def call(self, method, path, data=None):
+        """Send a JSON request to replication controller.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        path : str
+            Resource path, with query string if any.
+        data : dict, optional
+            Request parameters, the authorization key is added to them.
+
+        Returns
+        -------
+        Decoded JSON response, as a `dict`.
+
+        Raises
+        ------
+        IngestError
+            If request failed.
+        """
+        data = dict(data or {}, auth_key=self._authKey)
+        body = json.dumps(data).encode('utf-8')
+        conn = httplib.HTTPConnection(self.host, self.port,
+                                      timeout=self._timeout)
+        try:
+            conn.request(method, path, body,
+                         {'Content-Type': 'application/json'})
+            return self._result(method, path, conn.getresponse())
+        finally:
+            conn.close()
+
+    def upload(self, location, params, path):
+        """Upload a contribution file to a worker.
+
+        Parameters
+        ----------
+        location : dict
+            Worker location as returned by ingest service, with 'http_host'
+            and 'http_port' keys.
+        params : dict
+            Contribution parameters: transaction, table, chunk, CSV dialect.
+        path : str
+            Path of contribution file.
+
+        Returns
+        -------
+        Decoded JSON response, as a `dict`.
+        """
+        boundary = uuid.uuid4().hex
+        fields = dict(params, auth_key=self._authKey)
+        head = io.BytesIO()
+        for name in sorted(fields):
+            head.write(('--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n'
+                        '%s\r\n' % (boundary, name, fields[name])).encode('utf-8'))
+        head.write(('--%s\r\nContent-Disposition: form-data; name="rows"; '
+                    'filename="%s"\r\nContent-Type: text/csv\r\n\r\n'
+                    % (boundary, os.path.basename(path))).encode('utf-8'))
+        head = head.getvalue()
+        tail = ('\r\n--%s--\r\n' % boundary).encode('utf-8')
+
+        conn = httplib.HTTPConnection(location['http_host'],
+                                      int(location['http_port']),
+                                      timeout=self._timeout)
+        try:
+            conn.putrequest('POST', '/ingest/csv')
+            conn.putheader('Content-Type',
+                           'multipart/form-data; boundary=' + boundary)
+            conn.putheader('Content-Length', str(len(head) +
+                                                 os.path.getsize(path) +
+                                                 len(tail)))
+            conn.endheaders()
+            conn.send(head)
+            with open(path, 'rb') as f:
+                while True:
+                    data = f.read(_BUFFER_SIZE)
+                    if not data:
+                        break
+                    conn.send(data)
+            conn.send(tail)
+            return self._result('POST', '/ingest/csv', conn.getresponse())
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _result(method, path, response):
+        body = response.read()
+        try:
+            result = json.loads(body.decode('utf-8'))
+        except ValueError:
+            raise IngestError("%s %s: HTTP %s, invalid response: %r"
+                              % (method, path, response.status, body[:200]))
+        if response.status != 200 or not result.get('success'):
+            raise IngestError("%s %s: HTTP %s, %s"
+                              % (method, path, response.status,
+                                 result.get('error', 'unknown error')))
+        return result
+
+
+class IngestLoader(object):
+    """
+    Qserv loader using the ingest HTTP API
+
+    Parameters
+    ----------
+    config : dict
+        Qserv configuration, ingest service URL is read from option 'url' of
+        section 'ingest', and defaults to replication controller on master.
+    data_reader : `dataConfig.DataConfig`
+        Dataset description.
+    db_name : str
+        Database name.
+    out_dirname : str
+        Test output directory, where duplicated data chunks are stored.
+    input_staging : `inputStaging.InputStaging`, optional
+        Provider of decompressed input data files, if `None` loader
+        decompresses input data files itself.
+    ingest_jobs : int, optional
+        Maximum number of contributions of a table uploaded simultaneously.
+    """
+
+    def __init__(self, config, data_reader, db_name, out_dirname,
+                 input_staging=None, ingest_jobs=INGEST_JOBS):
+        self.config = config
+        self.dataConfig = data_reader
+        self._dbName = db_name
+        self._outDirname = out_dirname
+        self._jobs = ingest_jobs
+        self._tmpDir = os.path.join(config['qserv']['tmp_dir'], "qserv_ingest",
+                                    db_name)
+        # input data is uploaded uncompressed
+        self._ownStaging = input_staging is None
+        if self._ownStaging:
+            input_staging = inputStaging.InputStaging(
+                data_reader, os.path.join(self._tmpDir, "staging"))
+        self._inputStaging = input_staging
+
+        try:
+            url = config['ingest']['url']
+        except KeyError:
+            url = "http://%s:%s" % (config['qserv']['master'], DEFAULT_PORT)
+        self._databaseCfg = self._ingestConfig("database")
+        self._client = IngestClient(url, self._databaseCfg.pop('auth_key', ""))
+
+        commonCfg = os.path.join(self.dataConfig.dataDir, "partition",
+                                 "common.json")
+        with io.open(commonCfg, 'r') as f:
+            self._partitionCfg = json.load(f)
+
+    def _ingestConfig(self, name):
+        path = os.path.join(self.dataConfig.dataDir, "ingest", name + ".json")
+        with io.open(path, 'r') as f:
+            cfg = json.load(f)
+        cfg['database'] = self._dbName
+        return cfg
+
+    def prepareDatabase(self):
+        """
+        Delete database from ingest service and register it again
+        """
+        try:
+            self._client.call('DELETE', '/ingest/database/' + self._dbName)
+            _LOG.info("Deleted database %s", self._dbName)
+        except IngestError as exc:
+            _LOG.debug("Database %s not deleted: %s", self._dbName, exc)
+        self._client.call('POST', '/ingest/database', self._databaseCfg)
+        _LOG.info("Registered database %s", self._dbName)
+
+    def createLoadTable(self, table):
+        """
+        Register a table and ingest its data in a transaction
+        """
+        inputFile = self._inputFile(table)
+        if inputFile is None:
+            _LOG.warning("Table %s has no input data, not ingested", table)
+            return
+
+        tableCfg = self._ingestConfig(table)
+        if tableCfg.get('is_partitioned'):
+            part = self._partitionCfg.get('part', {})
+            tableCfg.setdefault('chunk_id_key', part.get('chunk', 'chunkId'))
+            tableCfg.setdefault('sub_chunk_id_key',
+                                part.get('sub-chunk', 'subChunkId'))
+        self._client.call('POST', '/ingest/table', tableCfg)
+        _LOG.info("Registered table %s", table)
+
+        transaction = self._client.call('POST', '/ingest/trans',
+                                        {'database': self._dbName})
+        transId = transaction['databases'][self._dbName]['transactions'][0]['id']
+        _LOG.debug("Started transaction %s for table %s", transId, table)
+        try:
+            if tableCfg.get('is_partitioned'):
+                contributions = self._chunkContributions(table, transId)
+            else:
+                contributions = self._regularContributions(table, transId,
+                                                           inputFile)
+            self._upload(table, contributions)
+        except Exception:
+            _LOG.error("Abort transaction %s for table %s", transId, table)
+            self._client.call('PUT', '/ingest/trans/%s?abort=1' % transId)
+            raise
+        self._client.call('PUT', '/ingest/trans/%s?abort=0' % transId)
+        _LOG.info("Ingested %s contribution(s) for table %s",
+                  len(contributions), table)
+
+    def finalize(self):
+        """Publish database
+        """
+        self._client.call('PUT', '/ingest/database/' + self._dbName)
+        _LOG.info("Published database %s", self._dbName)
+        if self._ownStaging:
+            self._inputStaging.evict()
+        if os.path.exists(self._tmpDir):
+            shutil.rmtree(self._tmpDir)
+
+    def streamsInput(self, table):
+        """Return False, input data files are uploaded from staging
+        """
+        return False
+
+    def _inputFile(self, table):
+        return self._inputStaging.path(table)
+
+    def _csvParams(self, section):
+        csv = self._partitionCfg.get(section, {}).get('csv', {})
+        return {'fields_terminated_by': csv.get('delimiter', '\t'),
+                'fields_escaped_by': csv.get('escape', '\\'),
+                'fields_enclosed_by': '' if csv.get('no-quote', True)
+                else csv.get('quote', '"'),
+                'lines_terminated_by': '\n'}
+
+    def _regularContributions(self, table, transId, inputFile):
+        """Return contributions of a regular table: its whole input file for
+        each worker.
+        """
+        locations = self._client.call(
+            'GET', '/ingest/regular?transaction_id=%s' % transId)['locations']
+        params = dict(self._csvParams('in'), transaction_id=transId,
+                      table=table, chunk=0, overlap=0)
+        return [(location, params, inputFile) for location in locations]
+
+    def _chunkContributions(self, table, transId):
+        """Return contributions of a partitioned table: its chunk files on
+        worker where each chunk is allocated.
+        """
+        chunkFiles = {}
+        for path in self._chunkFiles(table):
+            chunk, overlap = _CHUNK_FILE.match(os.path.basename(path)).groups()
+            chunkFiles.setdefault(int(chunk), []).append((path, overlap is not None))
+        if not chunkFiles:
+            return []
+
+        locations = self._client.call('POST', '/ingest/chunks',
+                                      {'transaction_id': transId,
+                                       'chunks': sorted(chunkFiles)})['locations']
+        contributions = []
+        for location in locations:
+            chunk = int(location['chunk'])
+            for path, overlap in chunkFiles[chunk]:
+                params = dict(self._csvParams('out'), transaction_id=transId,
+                              table=table, chunk=chunk, overlap=int(overlap))
+                contributions.append((location, params, path))
+        return contributions
+
+    def _chunkFiles(self, table):
+        """Return chunk files of a partitioned table, partitioning its input
+        data file if not duplicated.
+        """
+        if table in self.dataConfig.duplicatedTables:
+            chunksDir = os.path.join(self.config['qserv']['tmp_dir'],
+                                     self._outDirname, "chunks", table)
+        else:
+            chunksDir = os.path.join(self._tmpDir, table)
+            if os.path.exists(chunksDir):
+                shutil.rmtree(chunksDir)
+            os.makedirs(chunksDir)
+            dataDir = self.dataConfig.dataDir
+            cmd = ['sph-partition',
+                   '--config-file=' + os.path.join(dataDir, "partition",
+                                                   "common.json"),
+                   '--config-file=' + os.path.join(dataDir, "partition",
+                                                   table + ".json"),
+                   '--in.path=' + self._inputFile(table),
+                   '--out.dir=' + chunksDir,
+                   '--mr.num-workers=%s' % self._jobs]
+            _LOG.info("Partition table %s", table)
+            commons.run_command(cmd, stdout=sys.stdout, stderr=sys.stderr)
+        return sorted(path for path in glob.glob(os.path.join(chunksDir, '*'))
+                      if _CHUNK_FILE.match(os.path.basename(path)))
+
+    def _upload(self, table, contributions):
+        """Upload contributions concurrently, raise first error once all
+        uploads are completed.
+        """
+        if not contributions:
+            return
+        with futures.ThreadPoolExecutor(max_workers=self._jobs) as pool:
+            uploads = [pool.submit(self._client.upload, location, params, path)
+                       for location, params, path in contributions]
+            futures.wait(uploads)
+        for upload in uploads:
+            upload.result()
@@ -0,0 +1,136 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining InputStaging class, which decompresses input data files once
+per run, so that loaders of all modes read the same uncompressed file.
+
+Tables are decompressed in parallel, in the background, as soon as they are
+known to be loaded, and loaders wait for the staged file of the table they
+load.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from concurrent import futures
+import gzip
+import logging
+import os
+import shutil
+import threading
+
+_LOG = logging.getLogger(__name__)
+
+# default number of input files decompressed simultaneously
+STAGING_JOBS = 4
+
+_BUFFER_SIZE = 1024 * 1024
+
+_GZIP_EXT = ".gz"
+
+
+class InputStaging(object):
+    """
+    Decompressed input data files of a dataset
+
+    Parameters
+    ----------
+    data_config : `dataConfig.DataConfig`
+        Dataset description.
+    staging_dir : str
+        Directory where decompressed files are stored, it is removed by
+        `evict()`.
+    jobs : int, optional
+        Maximum number of files decompressed simultaneously.
+    """
+
+    def __init__(self, data_config, staging_dir, jobs=STAGING_JOBS):
+        self._dataConfig = data_config
+        self._dir = staging_dir
+        self._jobs = jobs
+        self._lock = threading.Lock()
+        self._pool = None
+        self._staged = {}
+
+    def prefetch(self, tables):
+        """Start decompression of input data files of tables in background.
+        """
+        for table in tables:
+            self._future(table)
+
+    def path(self, table):
+        """Return path of input data file of a table to be read by loaders.
+
+        If input data file is compressed, waits for it to be decompressed and
+        returns path of decompressed file, otherwise returns path returned by
+        `DataConfig.getInputDataFile()`.
+        """
+        future = self._future(table)
+        if future is None:
+            return self._dataConfig.getInputDataFile(table)
+        return future.result()
+
+    def evict(self):
+        """Wait for running decompressions and remove all staged files.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._staged = {}
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if os.path.exists(self._dir):
+            _LOG.debug("Evict staged input data files from %s", self._dir)
+            shutil.rmtree(self._dir)
+
+    def _future(self, table):
+        """Return future of staged file path, `None` if input data file is
+        not compressed.
+        """
+        source = self._dataConfig.getInputDataFile(table)
+        if not source or not source.endswith(_GZIP_EXT):
+            return None
+        with self._lock:
+            future = self._staged.get(table)
+            if future is None:
+                if self._pool is None:
+                    self._pool = futures.ThreadPoolExecutor(max_workers=self._jobs)
+                target = os.path.join(self._dir, os.path.basename(source)[:-len(_GZIP_EXT)])
+                future = self._pool.submit(self._decompress, source, target)
+                self._staged[table] = future
+        return future
+
+    def _decompress(self, source, target):
+        _LOG.info("Decompress %s", source)
+        if not os.path.exists(self._dir):
+            try:
+                os.makedirs(self._dir)
+            except OSError:
+                if not os.path.isdir(self._dir):
+                    raise
+        tmpTarget = target + ".tmp"
+        try:
+            with gzip.open(source, 'rb') as src, open(tmpTarget, 'wb') as dst:
+                shutil.copyfileobj(src, dst, _BUFFER_SIZE)
+        except Exception:
+            if os.path.exists(tmpTarget):
+                os.unlink(tmpTarget)
+            raise
+        os.rename(tmpTarget, target)
+        return target
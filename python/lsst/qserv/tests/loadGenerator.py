@@ -0,0 +1,248 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining LoadGenerator class, which replays a query corpus from a
+number of concurrent closed-loop clients and measures throughput and latency.
+
+Each client sends a query, waits for its whole result, and immediately sends
+the next one, queries are drawn at random from a weighted mix.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import bisect
+import csv
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from concurrent import futures
+import yaml
+
+from .queryReport import percentile
+
+_LOG = logging.getLogger(__name__)
+
+# fields of a load step record, in CSV column order
+FIELDS = ['concurrency', 'queries', 'failed', 'elapsed', 'throughput',
+          'p50', 'p95', 'p99', 'max']
+
+
+def concurrencySteps(max_concurrency):
+    """Return concurrency levels 1, 2, 4, ... up to max_concurrency, which is
+    always the last level.
+    """
+    if max_concurrency < 1:
+        raise ValueError("concurrency must be positive: " + str(max_concurrency))
+    steps = []
+    level = 1
+    while level < max_concurrency:
+        steps.append(level)
+        level *= 2
+    steps.append(max_concurrency)
+    return steps
+
+
+def loadMix(filename):
+    """Read query mix from a YAML file.
+
+    The file contains a 'queries' mapping of query file names to their
+    relative weights, e.g.::
+
+        queries:
+          0001.1_fetchObjectById.sql: 10
+          0004_lightCurve.sql: 1
+
+    Returns
+    -------
+    `dict` mapping query file name to weight.
+    """
+    with open(filename) as f:
+        config = yaml.safe_load(f) or {}
+    mix = config.get('queries')
+    if not isinstance(mix, dict) or not mix:
+        raise ValueError("no 'queries' mapping in mix file " + filename)
+    for qFN, weight in mix.items():
+        if not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError("invalid weight for {}: {}".format(qFN, weight))
+    return mix
+
+
+class WeightedChoice(object):
+    """
+    Draw items at random according to their weights
+
+    Parameters
+    ----------
+    weights : dict
+        Keys are items, values are non-negative weights.
+    """
+
+    def __init__(self, weights):
+        self.items = sorted(item for item, weight in weights.items() if weight > 0)
+        if not self.items:
+            raise ValueError("query mix has no query with positive weight")
+        self._cumulative = []
+        total = 0.
+        for item in self.items:
+            total += weights[item]
+            self._cumulative.append(total)
+
+    def pick(self, rng):
+        """Return an item, using random generator rng.
+        """
+        x = rng.random() * self._cumulative[-1]
+        idx = bisect.bisect_right(self._cumulative, x)
+        return self.items[min(idx, len(self.items) - 1)]
+
+
+class LoadGenerator(object):
+    """
+    Run a query mix from concurrent closed-loop clients
+
+    Parameters
+    ----------
+    sql_interface : callable
+        Called without arguments to create the SQL client of each client
+        thread, the returned object must provide `Cmd.execute()` method.
+    queries : dict
+        Keys are query file names, values are 2-tuples of query text and
+        pragmas.
+    weights : dict, optional
+        Keys are query file names, values are their relative frequency, by
+        default all queries have the same weight.
+    async_timeout : callable, optional
+        Takes query pragmas and returns timeout for a detached query, 0 to
+        run query synchronously, by default all queries are synchronous.
+    seed : int, optional
+        Seed of random query choice, the same seed replays the same query
+        sequence for each client.
+    """
+
+    def __init__(self, sql_interface, queries, weights=None,
+                 async_timeout=None, seed=None):
+        self._sqlInterface = sql_interface
+        self._queries = queries
+        if weights is None:
+            weights = dict((qFN, 1) for qFN in queries)
+        unknown = sorted(set(weights) - set(queries))
+        if unknown:
+            raise ValueError("queries in mix not found in corpus: " +
+                             ", ".join(unknown))
+        self._choice = WeightedChoice(weights)
+        self._asyncTimeout = async_timeout or (lambda pragmas: 0)
+        self._seed = seed
+
+    def runStep(self, concurrency, duration):
+        """Run the query mix at a given concurrency.
+
+        Parameters
+        ----------
+        concurrency : int
+            Number of clients.
+        duration : float
+            Time in seconds during which clients launch new queries, queries
+            running at the end of this period are waited for.
+
+        Returns
+        -------
+        `dict` with FIELDS keys, latencies are in seconds and throughput in
+        completed queries per second.
+        """
+        _LOG.info("Running %s clients during %ss", concurrency, duration)
+        latencies = []
+        failed = [0]
+        lock = threading.Lock()
+        start = time.time()
+        deadline = start + duration
+
+        def _client(clientId):
+            seed = None if self._seed is None else self._seed + clientId
+            rng = random.Random(seed)
+            sqlInterface = self._sqlInterface()
+            while time.time() < deadline:
+                qFN = self._choice.pick(rng)
+                qText, pragmas = self._queries[qFN]
+                column_names = 'noheader' not in pragmas
+                t0 = time.time()
+                stats = sqlInterface.execute(qText, os.devnull, column_names,
+                                             self._asyncTimeout(pragmas))
+                latency = time.time() - t0
+                with lock:
+                    if stats['status'] == 0:
+                        latencies.append(latency)
+                    else:
+                        _LOG.debug("Query %s failed with status %s", qFN,
+                                   stats['status'])
+                        failed[0] += 1
+
+        with futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+            clients = [pool.submit(_client, i) for i in range(concurrency)]
+            for client in clients:
+                client.result()
+        elapsed = time.time() - start
+
+        return dict(concurrency=concurrency, queries=len(latencies),
+                    failed=failed[0], elapsed=elapsed,
+                    throughput=len(latencies) / elapsed,
+                    p50=percentile(latencies, 50),
+                    p95=percentile(latencies, 95),
+                    p99=percentile(latencies, 99),
+                    max=max(latencies) if latencies else None)
+
+    def sweep(self, steps, duration):
+        """Run the query mix at increasing concurrency levels.
+
+        Parameters
+        ----------
+        steps : list
+            Concurrency levels.
+        duration : float
+            Duration of each step in seconds.
+
+        Returns
+        -------
+        List of step records, see `runStep()`.
+        """
+        results = []
+        for concurrency in steps:
+            result = self.runStep(concurrency, duration)
+            _LOG.info("concurrency=%s: %s queries (%s failed), %.2f queries/s, "
+                      "latency p50=%.3fs p95=%.3fs p99=%.3fs",
+                      concurrency, result['queries'], result['failed'],
+                      result['throughput'], result['p50'] or 0.,
+                      result['p95'] or 0., result['p99'] or 0.)
+            results.append(result)
+        return results
+
+
+def writeResults(results, filename_prefix):
+    """Write sweep results to <prefix>.json and <prefix>.csv files.
+    """
+    with open(filename_prefix + ".json", 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    with open(filename_prefix + ".csv", 'w') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,123 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module scheduling loading of test dataset tables.
+
+Only partitioned tables depend on their director, all other tables are
+independent. Tables are loaded by a bounded pool of threads, each table as
+soon as the tables it depends on are loaded. The first table is loaded
+alone, as loading it creates the database metadata (e.g. CSS database)
+shared by all tables.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from concurrent import futures
+import logging
+
+_LOG = logging.getLogger(__name__)
+
+# default number of tables loaded simultaneously
+LOAD_JOBS = 1
+
+
+def loadGraph(data_config, tables):
+    """Build dependency graph of tables to load.
+
+    Parameters
+    ----------
+    data_config : `dataConfig.DataConfig`
+        Dataset description.
+    tables : list
+        Names of tables to load.
+
+    Returns
+    -------
+    `dict` mapping each table name to the `set` of tables which must be loaded
+    before it. Dependencies which are not in `tables` are considered as
+    already loaded and are not included.
+    """
+    tables = set(tables)
+    return dict((table, set(data_config.getDirectorTables(table)) & tables)
+                for table in tables)
+
+
+def runLoads(tables, graph, loadTable, jobs=LOAD_JOBS):
+    """Load tables, running independent loads concurrently.
+
+    The first table is loaded alone, then independent tables are loaded
+    concurrently. When a load fails no new load is started, loads in
+    progress are completed and then the first exception is re-raised.
+
+    Parameters
+    ----------
+    tables : list
+        Names of tables to load, ready tables are started in this order.
+    graph : dict
+        Dependency graph, see `loadGraph()`.
+    loadTable : callable
+        Called with a table name, loads this table.
+    jobs : int, optional
+        Maximum number of tables loaded simultaneously.
+
+    Raises
+    ------
+    ValueError
+        If dependency graph has a cycle.
+    """
+    jobs = max(jobs, 1)
+    pending = list(tables)
+    missing = set(dep for table in pending for dep in graph[table]) - set(pending)
+    if missing:
+        raise ValueError("Dependencies not scheduled for loading: %s"
+                         % sorted(missing))
+
+    done = set()
+    running = {}
+    error = None
+    with futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            if error is None:
+                for table in [t for t in pending if graph[t] <= done]:
+                    if len(running) >= jobs or (running and not done):
+                        break
+                    _LOG.debug("Start loading table %s", table)
+                    pending.remove(table)
+                    running[pool.submit(loadTable, table)] = table
+            if not running:
+                if error is None:
+                    raise ValueError("Circular dependency between tables: %s"
+                                     % sorted(pending))
+                break
+            finished, _ = futures.wait(running,
+                                       return_when=futures.FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    done.add(table)
+                elif error is None:
+                    _LOG.error("Loading of table %s failed: %s", table, exc)
+                    error = future
+                else:
+                    _LOG.error("Loading of table %s also failed: %s", table, exc)
+    if error is not None:
+        error.result()
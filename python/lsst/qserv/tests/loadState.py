@@ -0,0 +1,161 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining LoadState class, which records what was loaded in each test
+database, so that unchanged tables are not loaded again.
+
+Each loaded table is recorded with a fingerprint of everything its loading
+depends on: input data, schema, partitioning and ingest configuration, and
+loader version. A table is recorded as soon as it is loaded, so that an
+interrupted load can be resumed.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+_LOG = logging.getLogger(__name__)
+
+
+class LoadState(object):
+    """
+    Persistent record of loaded tables
+
+    Parameters
+    ----------
+    state_file : str
+        File where state is stored.
+    file_digests : `fileDigest.FileDigests`
+        Digests of input files.
+    """
+
+    def __init__(self, state_file, file_digests):
+        self._stateFile = state_file
+        self._fileDigests = file_digests
+        self._lock = threading.Lock()
+        try:
+            with open(state_file) as f:
+                self._state = json.load(f)
+        except (IOError, OSError, ValueError):
+            self._state = {}
+
+    def _save(self):
+        with open(self._stateFile, 'w') as f:
+            json.dump(self._state, f, indent=2, sort_keys=True)
+
+    def tableFingerprint(self, data_config, table, loader_version):
+        """Compute fingerprint of a table loading.
+
+        Parameters
+        ----------
+        data_config : `dataConfig.DataConfig`
+            Dataset description.
+        table : str
+            Table name.
+        loader_version : object
+            JSON-serializable identifier of loader and of its version.
+
+        Returns
+        -------
+        Fingerprint as a hex string.
+        """
+        dataDir = data_config.dataDir
+        inputs = [data_config.getSchemaFile(table),
+                  data_config.getInputDataFile(table),
+                  os.path.join(dataDir, table + ".json"),
+                  os.path.join(dataDir, "partition", "common.json"),
+                  os.path.join(dataDir, "partition", table + ".json"),
+                  os.path.join(dataDir, "ingest", "database.json"),
+                  os.path.join(dataDir, "ingest", table + ".json")]
+        digests = {}
+        for path in inputs:
+            if path and os.path.exists(path):
+                digests[os.path.relpath(path, dataDir)] = \
+                    self._fileDigests.digest(path)
+        self._fileDigests.save()
+
+        description = dict(inputs=digests, loader=loader_version)
+        if table in data_config.duplicatedTables:
+            description['duplicate'] = data_config.get('duplicate')
+        return hashlib.sha256(json.dumps(description, sort_keys=True)
+                              .encode('utf-8')).hexdigest()
+
+    def knows(self, db_name):
+        """Return `True` if a load of database was recorded.
+        """
+        with self._lock:
+            return db_name in self._state
+
+    def loadedTables(self, db_name):
+        """Return `dict` mapping loaded table names to their fingerprint.
+        """
+        with self._lock:
+            return dict(self._state.get(db_name, {}))
+
+    def tablesToLoad(self, data_config, db_name, fingerprints):
+        """Return tables which need to be loaded.
+
+        Parameters
+        ----------
+        data_config : `dataConfig.DataConfig`
+            Dataset description.
+        db_name : str
+            Database name.
+        fingerprints : dict
+            Current fingerprint of each table.
+
+        Returns
+        -------
+        `set` of table names: tables not loaded yet or whose fingerprint
+        changed, and tables whose director is one of them.
+        """
+        loaded = self.loadedTables(db_name)
+        changed = set(table for table, fingerprint in fingerprints.items()
+                      if loaded.get(table) != fingerprint)
+        for table in fingerprints:
+            if set(data_config.getDirectorTables(table)) & changed:
+                changed.add(table)
+        return changed
+
+    def reset(self, db_name):
+        """Forget all tables of a database, before a full reload.
+        """
+        with self._lock:
+            self._state[db_name] = {}
+            self._save()
+
+    def forget(self, db_name, table):
+        """Forget a table, before its reload.
+        """
+        with self._lock:
+            self._state.setdefault(db_name, {}).pop(table, None)
+            self._save()
+
+    def record(self, db_name, table, fingerprint):
+        """Record a successfully loaded table.
+        """
+        with self._lock:
+            self._state.setdefault(db_name, {})[table] = fingerprint
+            self._save()
@@ -31,26 +31,35 @@ from __future__ import absolute_import, division, print_function
 
 import logging
 import os
-import sys
 
-from lsst.qserv.admin import commons
 from .dbLoader import DbLoader
 
 
 class MysqlLoader(DbLoader):
 
+    # tables are loaded with --skip-partition
+    partitions = False
+
     def __init__(self, config,
                  data_reader,
                  db_name,
                  multi_node,
-                 out_dirname):
+                 out_dirname,
+                 stream_chunks=False,
+                 input_staging=None,
+                 in_process=False,
+                 stream_input=False):
 
         super(self.__class__, self).__init__(config,
                                              data_reader,
                                              db_name,
                                              multi_node,
                                              out_dirname,
-                                             czar_list=[])
+                                             czar_list=[],
+                                             stream_chunks=stream_chunks,
+                                             input_staging=input_staging,
+                                             in_process=in_process,
+                                             stream_input=stream_input)
         self.logger = logging.getLogger(__name__)
 
         self.dataConfig = data_reader
@@ -65,22 +74,16 @@ class MysqlLoader(DbLoader):
 
         self.logger.info("Create, load table %s", table)
 
-        loaderCmd = self.loaderCmdCommonOpts(table)
+        loaderOpts = self.loaderCommonOpts(table)
 
-        loaderCmd += ['--no-css',
-                      '--skip-partition',
-                      '--one-table']
+        loaderOpts.update(useCss=False, skipPart=True, oneTable=True)
 
         # include table-specific config if it exists
         tableCfg = os.path.join(self.dataConfig.dataDir, table + ".json")
         if os.path.exists(tableCfg):
-            loaderCmd += ['--config={0}'.format(tableCfg)]
-
-        loaderCmd += self.loaderCmdCommonArgs(table)
+            loaderOpts['configFiles'] += [tableCfg]
 
-        commons.run_command(loaderCmd,
-                            stdout=sys.stdout,
-                            stderr=sys.stderr)
+        self.runLoader(table, loaderOpts, self.loaderCmdCommonArgs(table))
         self.logger.info("Partitioned data loaded for table %s", table)
 
     def prepareDatabase(self):
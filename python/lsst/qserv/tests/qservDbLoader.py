@@ -31,11 +31,9 @@ from __future__ import absolute_import, division, print_function
 
 import logging
 import os
-import sys
 
 from lsst.qserv import css
-from lsst.qserv.admin import commons
-from .dbLoader import DbLoader
+from .dbLoader import DbLoader, runOnNodes
 
 
 class QservLoader(DbLoader):
@@ -45,14 +43,22 @@ class QservLoader(DbLoader):
                  db_name,
                  multi_node,
                  out_dirname,
-                 czar_list=[]):
+                 czar_list=[],
+                 stream_chunks=False,
+                 input_staging=None,
+                 in_process=False,
+                 stream_input=False):
 
         super(self.__class__, self).__init__(config,
                                              data_reader,
                                              db_name,
                                              multi_node,
                                              out_dirname,
-                                             czar_list)
+                                             czar_list,
+                                             stream_chunks=stream_chunks,
+                                             input_staging=input_staging,
+                                             in_process=in_process,
+                                             stream_input=stream_input)
         self.logger = logging.getLogger(__name__)
 
         data_dir = self.config['qserv']['qserv_data_dir']
@@ -78,48 +84,40 @@ class QservLoader(DbLoader):
         """
         self.logger.info("Partition data, create and load table %s", table)
 
-        loaderCmd = self.loaderCmdCommonOpts(table)
+        loaderOpts = self.loaderCommonOpts(table)
 
-        loaderCmd += ['--css-remove']
+        loaderOpts['cssClear'] = True
 
         if self.multi_node:
-            for node in self.nWmgrs:
-                loaderCmd += ['--worker', node]
-            for cWmgr in self.czarWmgrs:
-                loaderCmd += ['-z', cWmgr.host]
+            loaderOpts['workers'] = list(self.nWmgrs)
+            loaderOpts['czars'] = [cWmgr.host for cWmgr in self.czarWmgrs]
 
         if self.dataConfig.duplicatedTables:
-            loaderCmd += ['--skip-partition']
-            loaderCmd += ['--chunks-dir={0}'.format(os.path.join(self.tmpDir,
-                                                                 self._out_dirname,
-                                                                 "chunks/", table))]
+            loaderOpts['skipPart'] = True
+            loaderOpts['chunksDir'] = os.path.join(self.tmpDir, self._out_dirname,
+                                                   "chunks/", table)
         # include table-specific config if it exists
         tableCfg = os.path.join(self.dataConfig.dataDir, "partition", table + ".json")
         if os.path.exists(tableCfg):
-            loaderCmd += ['--config={0}'.format(tableCfg)]
+            loaderOpts['configFiles'] += [tableCfg]
 
         # WARN emptyChunks.txt might also be intersection of
         # all empltyChunkk file: seel with D. Wang and A. Salnikov
         if table in self.dataConfig.directors:
-            loaderCmd += ['--empty-chunks={0}'.format(self._emptyChunksFile)]
-
-        loaderCmd += self.loaderCmdCommonArgs(table)
+            loaderOpts['emptyChunks'] = self._emptyChunksFile
 
-        # Use same logging configuration for loader and integration test
-        # command line, this allow to redirect loader to sys.stdout, sys.stderr
-        self.logger.debug("loaderCmd=%s", loaderCmd)
-        commons.run_command(loaderCmd,
-                            stdout=sys.stdout,
-                            stderr=sys.stderr)
+        self.runLoader(table, loaderOpts, self.loaderCmdCommonArgs(table))
         self.logger.info("Partitioned data loaded for table %s", table)
 
     def prepareDatabase(self):
         """
-        Drop and create MySQL database
         Drop CSS database
+        Drop and create MySQL database, once on each host
         Assume that other meta-data will be removed by the user-friendly
         loader (qservMeta, emptyChunks file)
         """
+        self.logger.info("Drop CSS database for Qserv")
+        self.dropCssDatabase()
 
         if self.multi_node:
             for node in self.nWmgrs:
@@ -128,21 +126,30 @@ class QservLoader(DbLoader):
         self.logger.info("Drop and create MySQL database for Qserv: %s",
                          self._dbName)
 
-        self.czar_wmgr.dropDb(self._dbName, mustExist=False)
-        self.czar_wmgr.createDb(self._dbName)
-
-        if self.multi_node:
-            for wmgr in self.nWmgrs.values():
+        def _recreateDb(wmgr):
+            def _run():
                 wmgr.dropDb(self._dbName, mustExist=False)
                 wmgr.createDb(self._dbName)
+            return _run
+
+        # master may also be a worker or a czar, database must be
+        # re-created only once on each host
+        nodes = [("master", self.czar_wmgr)]
+        if self.multi_node:
+            nodes += list(self.nWmgrs.items())
 
         # TODO This should be changed to notify the czars that master tables have been updated.
-        for cWmgr in self.czarWmgrs:
-            cWmgr.dropDb(self._dbName, mustExist=False)
-            cWmgr.createDb(self._dbName)
+        nodes += [("czar " + cWmgr.host, cWmgr) for cWmgr in self.czarWmgrs]
 
-        self.logger.info("Drop CSS database for Qserv")
-        self.dropCssDatabase()
+        hostTasks = {}
+        for node, wmgr in nodes:
+            if wmgr.host not in hostTasks:
+                hostTasks[wmgr.host] = (node, _recreateDb(wmgr))
+        tasks = sorted(hostTasks.values(), key=lambda task: task[0])
+
+        timings = runOnNodes("Database preparation", tasks)
+        self.logger.info("Database prepared on %s node(s), slowest in %.3f s",
+                         len(timings), max(timings.values()))
 
     def dropCssDatabase(self):
         cssAccess = css.CssAccess.createFromConfig(self.config['css'], '')
@@ -151,11 +158,14 @@ class QservLoader(DbLoader):
         self.logger.info("Drop CSS database: %s", self._dbName)
 
     def workerInsertXrootdExportPath(self):
+        def _register(wmgr):
+            return lambda: wmgr.xrootdRegisterDb(self._dbName, allowDuplicate=True)
+
         if self.multi_node:
-            for wmgr in self.nWmgrs.values():
-                wmgr.xrootdRegisterDb(self._dbName, allowDuplicate=True)
+            tasks = [(node, _register(wmgr)) for node, wmgr in self.nWmgrs.items()]
         else:
-            self.czar_wmgr.xrootdRegisterDb(self._dbName, allowDuplicate=True)
+            tasks = [("master", _register(self.czar_wmgr))]
+        runOnNodes("Xrootd export registration", tasks)
 
     def finalize(self):
         """Finalize data loading process
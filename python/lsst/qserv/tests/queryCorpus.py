@@ -0,0 +1,234 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining QueryCorpus class, a compiled description of the query files
+of a test case.
+
+Query files are parsed once, for both mysql and qserv, and the result is kept
+in a manifest file. Files are only parsed again when their size or
+modification time changes.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import logging
+import os
+import re
+import threading
+
+_LOG = logging.getLogger(__name__)
+
+# increment when manifest content changes
+VERSION = 1
+
+# extension of query files which are run, other files are disabled
+QUERY_EXT = ".sql"
+
+# extension appended to query files disabled until a bug is fixed
+FIXME_EXT = ".FIXME"
+
+_IDENTIFIER = re.compile(r'[A-Za-z_]\w*')
+
+
+def parseQuery(lines, withQserv):
+    """Filter query file lines based on qserv/mysql mode and find pragmas.
+
+    Parameters
+    ----------
+    lines : iterable
+        Lines of query file.
+    withQserv : bool
+        if `True` then prepare query for QServ, otherwise for mysql.
+
+    Returns
+    -------
+    2-tuple of query text and set of pragmas as a dictionary.
+    """
+
+    qText = []
+    pragmas = {}
+    for line in lines:
+
+        # squeeze/strip spaces
+        line = line.strip()
+        line = re.sub(' +', ' ', line)
+
+        if not line:
+            # empty
+            pass
+        elif withQserv and line.startswith("-- withQserv"):
+            # strip the "-- withQserv" text
+            qText.append(line[13:])
+        elif line.endswith("-- noQserv"):
+            if withQserv:
+                # skip this line
+                pass
+            else:
+                # strip the "-- noQserv" text
+                qText.append(line[:-10])
+        elif line.startswith("--"):
+            # check for pragma, format is:
+            #    '-- pragma keyval [keyval...]'
+            #    where keyval is 'key=value' or 'key'
+            words = line.split()
+            if len(words) > 1 and words[1] == 'pragma':
+                for keyval in words[2:]:
+                    kv = keyval.split('=', 1) + [None]
+                    pragmas[kv[0]] = kv[1]
+        else:
+            # append all non-annotated lines
+            qText.append(line)
+
+    return ' '.join(qText), pragmas
+
+
+def _queryId(qFN):
+    """Return query number of a query file, `None` if it has none.
+    """
+    try:
+        return int(qFN[:4])
+    except ValueError:
+        return None
+
+
+class QueryCorpus(object):
+    """
+    Compiled query files of a test case
+
+    Parameters
+    ----------
+    queries_dir : str
+        Directory containing query files.
+    manifest_file : str
+        File where compiled corpus is stored between runs.
+    tables : list, optional
+        Table names of the dataset, used to find tables referenced by each
+        query.
+    """
+
+    def __init__(self, queries_dir, manifest_file, tables=None):
+        self._dir = queries_dir
+        self._manifestFile = manifest_file
+        self._tables = sorted(set(tables or []))
+        self._entries = None
+        self._byFile = {}
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self):
+        """Entries for all files of queries directory, sorted by file name.
+
+        Each entry is a `dict` with keys 'file', 'enabled', 'id' (query
+        number), 'mysql' and 'qserv' (query texts), 'pragmas' and 'tables'
+        (referenced tables), the last five are only present for enabled
+        queries. Disabled files have a 'reason' key.
+        """
+        self._ensureCompiled()
+        return self._entries
+
+    def entry(self, qFN):
+        """Return entry of a query file, see `entries`.
+        """
+        self._ensureCompiled()
+        return self._byFile[qFN]
+
+    def select(self, stopAt):
+        """Return file names of enabled queries with number up to stopAt.
+        """
+        return [entry['file'] for entry in self.entries
+                if entry['enabled'] and entry['id'] <= stopAt]
+
+    def disabled(self):
+        """Return `dict` mapping disabled file names to the reason why they
+        are not run.
+        """
+        return dict((entry['file'], entry['reason']) for entry in self.entries
+                    if not entry['enabled'])
+
+    def query(self, qFN, withQserv):
+        """Return query text and a copy of pragmas of a query file.
+        """
+        entry = self.entry(qFN)
+        text = entry['qserv'] if withQserv else entry['mysql']
+        return text, dict(entry['pragmas'])
+
+    def _ensureCompiled(self):
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._compile()
+                self._byFile = dict((entry['file'], entry)
+                                    for entry in self._entries)
+
+    def _loadManifest(self):
+        try:
+            with open(self._manifestFile) as f:
+                manifest = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if manifest.get('version') != VERSION or \
+                manifest.get('tables') != self._tables:
+            return {}
+        return dict((entry['file'], entry) for entry in manifest['entries'])
+
+    def _compile(self):
+        """Parse query files which changed since manifest was written.
+        """
+        known = self._loadManifest()
+        entries = []
+        parsed = 0
+        for qFN in sorted(os.listdir(self._dir)):
+            st = os.stat(os.path.join(self._dir, qFN))
+            signature = [st.st_size, st.st_mtime]
+            entry = known.get(qFN)
+            if entry is None or entry['signature'] != signature:
+                entry = self._compileFile(qFN)
+                entry['signature'] = signature
+                parsed += 1
+            entries.append(entry)
+
+        if parsed or len(known) != len(entries):
+            _LOG.debug("Compiled %s query files of %s", parsed, self._dir)
+            manifest = dict(version=VERSION, tables=self._tables,
+                            entries=entries)
+            try:
+                with open(self._manifestFile, 'w') as f:
+                    json.dump(manifest, f, indent=2, sort_keys=True)
+            except (IOError, OSError) as exc:
+                _LOG.warning("Cannot write query manifest: %s", exc)
+        return entries
+
+    def _compileFile(self, qFN):
+        if qFN.endswith(QUERY_EXT + FIXME_EXT):
+            return dict(file=qFN, enabled=False, reason="marked as FIXME")
+        if not qFN.endswith(QUERY_EXT):
+            return dict(file=qFN, enabled=False, reason="not a query file")
+        qid = _queryId(qFN)
+        if qid is None:
+            return dict(file=qFN, enabled=False, reason="no query number")
+        with open(os.path.join(self._dir, qFN), 'r') as qF:
+            lines = qF.readlines()
+        mysqlText, pragmas = parseQuery(lines, False)
+        qservText, _ = parseQuery(lines, True)
+        words = set(_IDENTIFIER.findall(mysqlText + ' ' + qservText))
+        tables = [table for table in self._tables if table in words]
+        return dict(file=qFN, enabled=True, id=qid, mysql=mysqlText,
+                    qserv=qservText, pragmas=pragmas, tables=tables)
@@ -0,0 +1,179 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining QueryReport class, which collects per-query measurements of
+an integration test run and writes them to JSON and CSV files.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import csv
+import json
+import logging
+import math
+import os
+import threading
+
+_LOG = logging.getLogger(__name__)
+
+# fields of a query record, in CSV column order
+FIELDS = ['mode', 'query', 'status', 'wall_time', 'time_to_first_byte',
+          'rows', 'bytes', 'pragmas']
+
+
+def percentile(values, pct):
+    """Return percentile of values, using linear interpolation between
+    closest ranks.
+
+    Parameters
+    ----------
+    values : list
+        Numbers, need not be sorted.
+    pct : float
+        Percentile, between 0 and 100.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * pct / 100.
+    low = int(math.floor(rank))
+    high = int(math.ceil(rank))
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(values):
+    """Return distribution summary of values.
+
+    Returns
+    -------
+    `dict` with keys 'count', 'p50', 'p95' and 'max'.
+    """
+    return dict(count=len(values),
+                p50=percentile(values, 50),
+                p95=percentile(values, 95),
+                max=max(values) if values else None)
+
+
+def describe(values):
+    """Return descriptive statistics of repeated measurements.
+
+    Returns
+    -------
+    `dict` with keys 'count', 'mean', 'median', 'stddev', 'min', 'max',
+    'p90', 'p95' and 'p99'.
+    """
+    count = len(values)
+    mean = sum(values) / count if count else None
+    stddev = None
+    if count > 1:
+        stddev = math.sqrt(sum((v - mean) ** 2 for v in values) / (count - 1))
+    elif count == 1:
+        stddev = 0.
+    return dict(count=count, mean=mean, median=percentile(values, 50),
+                stddev=stddev,
+                min=min(values) if values else None,
+                max=max(values) if values else None,
+                p90=percentile(values, 90),
+                p95=percentile(values, 95),
+                p99=percentile(values, 99))
+
+
+class QueryReport(object):
+    """
+    Thread-safe collection of query measurements
+    """
+
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+
+    def add(self, mode, query, pragmas, start, end, stats):
+        """Record a query execution.
+
+        Parameters
+        ----------
+        mode : str
+            Test mode, e.g. 'mysql', 'qserv'.
+        query : str
+            Query file name.
+        pragmas : dict
+            Query pragmas.
+        start : float
+            Timestamp of query launch.
+        end : float
+            Timestamp of query end, including result retrieval.
+        stats : dict
+            Query statistics returned by `Cmd.execute()`.
+        """
+        first_byte_time = stats.get('first_byte_time')
+        ttfb = first_byte_time - start if first_byte_time else None
+        record = dict(mode=mode, query=query, status=stats['status'],
+                      wall_time=end - start, time_to_first_byte=ttfb,
+                      rows=stats['rows'], bytes=stats['bytes'],
+                      pragmas=" ".join(
+                          k if v is None else "{}={}".format(k, v)
+                          for k, v in sorted(pragmas.items())))
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    @property
+    def records(self):
+        with self._lock:
+            return sorted(self._records,
+                          key=lambda r: (r['mode'], r['query']))
+
+    def summary(self):
+        """Return per-mode summary of wall times and times to first byte.
+        """
+        summary = {}
+        records = self.records
+        for mode in sorted(set(r['mode'] for r in records)):
+            modeRecords = [r for r in records if r['mode'] == mode]
+            summary[mode] = dict(
+                queries=len(modeRecords),
+                failed=len([r for r in modeRecords if r['status'] != 0]),
+                rows=sum(r['rows'] for r in modeRecords),
+                bytes=sum(r['bytes'] for r in modeRecords),
+                wall_time=summarize([r['wall_time'] for r in modeRecords]),
+                time_to_first_byte=summarize(
+                    [r['time_to_first_byte'] for r in modeRecords
+                     if r['time_to_first_byte'] is not None]))
+        return summary
+
+    def write(self, dirname):
+        """Write report.json and report.csv in a directory.
+        """
+        records = self.records
+        with open(os.path.join(dirname, "report.json"), 'w') as f:
+            json.dump(dict(queries=records, summary=self.summary()), f,
+                      indent=2, sort_keys=True)
+        with open(os.path.join(dirname, "report.csv"), 'w') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+
+    def logSummary(self):
+        for mode, s in sorted(self.summary().items()):
+            _LOG.info("%s: %s queries (%s failed), wall time p50=%.3fs "
+                      "p95=%.3fs max=%.3fs", mode, s['queries'], s['failed'],
+                      s['wall_time']['p50'] or 0., s['wall_time']['p95'] or 0.,
+                      s['wall_time']['max'] or 0.)
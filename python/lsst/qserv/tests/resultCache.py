@@ -0,0 +1,143 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining ResultCache class, a content-addressed store of query results.
+
+Results are stored under a key computed from the content of all input data
+files (including schema files) and from the text of the queries, so they can
+be reused as long as none of them changes.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from .fileDigest import FileDigests
+
+_LOG = logging.getLogger(__name__)
+
+
+class ResultCache(object):
+    """
+    Store and restore query results keyed by their inputs
+
+    Parameters
+    ----------
+    cache_dir : str
+        Cache directory, created if needed.
+    file_digests : `FileDigests`, optional
+        Memoized digests of input files, shared with other users of these
+        files, by default digests are stored in cache directory.
+    """
+
+    def __init__(self, cache_dir, file_digests=None):
+        self._dir = cache_dir
+        if file_digests is None:
+            file_digests = FileDigests(os.path.join(cache_dir, "file_digests.json"))
+        self._fileDigests = file_digests
+
+    def key(self, data_dir, queries, extra=None):
+        """Compute cache key.
+
+        Parameters
+        ----------
+        data_dir : str
+            Directory with input data, all files below it are hashed.
+        queries : list
+            3-tuples of query file name, query text and pragmas dict.
+        extra : object, optional
+            Any JSON-serializable value which is also part of the key.
+
+        Returns
+        -------
+        Key as a hex string.
+        """
+        key = hashlib.sha256()
+        for dirpath, dirnames, filenames in os.walk(data_dir):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                key.update(os.path.relpath(path, data_dir).encode('utf-8'))
+                key.update(self._fileDigests.digest(path).encode('ascii'))
+        key.update(json.dumps([queries, extra], sort_keys=True).encode('utf-8'))
+        self._fileDigests.save()
+        return key.hexdigest()
+
+    def _entryDir(self, key):
+        return os.path.join(self._dir, key)
+
+    def restore(self, key, files_dir, files):
+        """Copy cached results.
+
+        Parameters
+        ----------
+        key : str
+            Cache key.
+        files_dir : str
+            Directory where cached result files are copied.
+        files : dict
+            Additional single files to restore, keys are names in cache entry,
+            values are destination file names.
+
+        Returns
+        -------
+        `True` if results were found in cache.
+        """
+        entry = self._entryDir(key)
+        if not os.path.isdir(entry):
+            return False
+        _LOG.debug("Restoring cached results from %s", entry)
+        if not os.path.exists(files_dir):
+            os.makedirs(files_dir)
+        outputs = os.path.join(entry, "outputs")
+        for name in os.listdir(outputs):
+            shutil.copy2(os.path.join(outputs, name), files_dir)
+        for name, dest in files.items():
+            shutil.copy2(os.path.join(entry, name), dest)
+        return True
+
+    def store(self, key, files_dir, files):
+        """Store results in cache, see `restore()` for parameters.
+        """
+        entry = self._entryDir(key)
+        if os.path.isdir(entry):
+            return
+        if not os.path.exists(self._dir):
+            os.makedirs(self._dir)
+        tmpEntry = tempfile.mkdtemp(dir=self._dir, prefix=".tmp-")
+        try:
+            shutil.copytree(files_dir, os.path.join(tmpEntry, "outputs"))
+            for name, src in files.items():
+                shutil.copy2(src, os.path.join(tmpEntry, name))
+            # entry becomes visible only once complete
+            os.rename(tmpEntry, entry)
+        except Exception:
+            shutil.rmtree(tmpEntry, ignore_errors=True)
+            if os.path.isdir(entry):
+                # stored meanwhile by another run
+                return
+            raise
+        _LOG.info("Results stored in cache %s", entry)
@@ -0,0 +1,145 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Streaming comparison of query result files.
+
+Files are read line by line, in bounded memory, and comparison stops at the
+first differing row, which is reported together with the first differing
+column. Files of a directory are compared in parallel.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import os
+
+from concurrent import futures
+
+try:
+    from itertools import zip_longest
+except ImportError:
+    from itertools import izip_longest as zip_longest  # python2
+
+_LOG = logging.getLogger(__name__)
+
+# default number of files compared simultaneously
+PARALLEL = 4
+
+# reasons of a mismatch
+DIFFERS = 'differs'
+MISSING_LEFT = 'missing in baseline'
+MISSING_RIGHT = 'missing'
+DIGEST_DIFFERS = 'digest differs'
+QUERY_FAILED = 'query failed'
+
+
+def _firstColumn(left, right):
+    """Return 1-based index of first differing tab-separated column of two
+    lines.
+    """
+    leftCols = left.rstrip(b'\n').split(b'\t')
+    rightCols = right.rstrip(b'\n').split(b'\t')
+    for i, (l, r) in enumerate(zip(leftCols, rightCols)):
+        if l != r:
+            return i + 1
+    return min(len(leftCols), len(rightCols)) + 1
+
+
+def compareFiles(left, right):
+    """Compare two result files.
+
+    Parameters
+    ----------
+    left : str
+        Baseline file name.
+    right : str
+        Candidate file name.
+
+    Returns
+    -------
+    `None` if files are identical, otherwise `dict` with keys 'reason'
+    (DIFFERS), 'row' and 'column' (1-based numbers of first differing line
+    and of its first differing column), 'left' and 'right' (differing lines,
+    `None` after end of file).
+    """
+    with open(left, 'rb') as leftFile, open(right, 'rb') as rightFile:
+        for row, (l, r) in enumerate(zip_longest(leftFile, rightFile)):
+            if l == r:
+                continue
+            column = None
+            if l is not None and r is not None:
+                column = _firstColumn(l, r)
+            return dict(reason=DIFFERS, row=row + 1, column=column,
+                        left=l.rstrip(b'\n') if l is not None else None,
+                        right=r.rstrip(b'\n') if r is not None else None)
+    return None
+
+
+def compareDirs(left_dir, right_dir, parallel=PARALLEL):
+    """Compare result files of two directories.
+
+    Parameters
+    ----------
+    left_dir : str
+        Baseline directory.
+    right_dir : str
+        Candidate directory.
+    parallel : int, optional
+        Number of files compared simultaneously.
+
+    Returns
+    -------
+    `dict` mapping name of each differing file to its mismatch, see
+    `compareFiles()`, files present in only one directory have 'reason' set
+    to MISSING_LEFT or MISSING_RIGHT.
+    """
+    leftNames = set(os.listdir(left_dir))
+    rightNames = set(os.listdir(right_dir))
+
+    mismatches = {}
+    for name in leftNames - rightNames:
+        mismatches[name] = dict(reason=MISSING_RIGHT)
+    for name in rightNames - leftNames:
+        mismatches[name] = dict(reason=MISSING_LEFT)
+
+    common = sorted(name for name in leftNames & rightNames
+                    if os.path.isfile(os.path.join(left_dir, name)))
+    with futures.ThreadPoolExecutor(max_workers=max(parallel, 1)) as pool:
+        results = pool.map(lambda name: compareFiles(os.path.join(left_dir, name),
+                                                     os.path.join(right_dir, name)),
+                           common)
+        for name, mismatch in zip(common, results):
+            if mismatch is not None:
+                mismatches[name] = mismatch
+    return mismatches
+
+
+def describe(mismatch):
+    """Return human-readable description of a mismatch.
+    """
+    if mismatch['reason'] != DIFFERS:
+        return mismatch['reason']
+    if mismatch['left'] is None:
+        return "extra row {}: {!r}".format(mismatch['row'], mismatch['right'])
+    if mismatch['right'] is None:
+        return "missing row {}: {!r}".format(mismatch['row'], mismatch['left'])
+    return "row {} column {}: {!r} != {!r}".format(
+        mismatch['row'], mismatch['column'], mismatch['left'], mismatch['right'])
@@ -0,0 +1,102 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining ResultManifest class, which stores digests of all query
+results of a mode, so that results can be compared without reading them.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import threading
+
+
+class ResultManifest(object):
+    """
+    Thread-safe collection of query result digests
+
+    Parameters
+    ----------
+    entries : dict, optional
+        Initial entries, keyed by query file name.
+    """
+
+    def __init__(self, entries=None):
+        self._entries = dict(entries or {})
+        self._lock = threading.Lock()
+
+    def add(self, query, pragmas, stats):
+        """Record digests of a query result.
+
+        Parameters
+        ----------
+        query : str
+            Query file name.
+        pragmas : dict
+            Query pragmas, results of 'sortresult' queries are compared
+            regardless of row order.
+        stats : dict
+            Query statistics returned by `Cmd.execute()`.
+        """
+        entry = dict(status=stats['status'], rows=stats['rows'],
+                     bytes=stats['bytes'], digest=stats.get('digest'),
+                     multiset_digest=stats.get('multiset_digest'),
+                     sortresult='sortresult' in pragmas)
+        with self._lock:
+            self._entries[query] = entry
+
+    @property
+    def entries(self):
+        with self._lock:
+            return dict(self._entries)
+
+    def write(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def read(filename):
+        with open(filename) as f:
+            return ResultManifest(json.load(f))
+
+    def diff(self, other):
+        """Compare digests with another manifest.
+
+        Returns
+        -------
+        Sorted list of query file names whose results differ, which failed
+        in one of the manifests, or which are missing in one of them.
+        """
+        mine = self.entries
+        others = other.entries
+        differs = []
+        for query in sorted(set(mine) | set(others)):
+            a = mine.get(query)
+            b = others.get(query)
+            if a is None or b is None or a['status'] or b['status']:
+                differs.append(query)
+                continue
+            key = 'digest'
+            if a['sortresult'] or b['sortresult']:
+                key = 'multiset_digest'
+            if a[key] != b[key]:
+                differs.append(query)
+        return differs
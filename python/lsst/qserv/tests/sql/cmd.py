@@ -2,11 +2,16 @@
 from __future__ import absolute_import, division, print_function
 
 import logging
+import os
 import subprocess
-import time
+import tempfile
+import threading
 
-from lsst.qserv.admin import commons
 from . import const
+from . import poller as asyncPoller
+from .resultWriter import QueryError, ResultWriter, failedStats
+
+_BUFFER_SIZE = 64 * 1024
 
 
 # TODO: replace all SQL by SQLConnection
@@ -22,14 +27,21 @@ class Cmd(object):
         One of const.MYSQL_PROXY, const.MYSQL_SOCK, const.MYSQL_NET.
     database: `str`
         Default database name.
+    keep_going: `bool`, optional
+        If `True`, a failing query is reported through its statistics,
+        otherwise `QueryError` is raised.
     """
 
-    def __init__(self, config, mode, database):
+    def __init__(self, config, mode, database, keep_going=False):
         self.config = config
+        self._keepGoing = keep_going
 
         self.logger = logging.getLogger(__name__)
         self.logger.debug("SQL cmd creation")
 
+        self._poller = None
+        self._pollerLock = threading.Lock()
+
         self._mysql_cmd = ["mysql"]
 
         if mode == const.MYSQL_PROXY:
@@ -82,56 +94,167 @@ class Cmd(object):
         async_timeout : int, optional
             If >0 then query will run disconnected, its value gives a timeout
             in seconds to wait for query completion.
+
+        Returns
+        -------
+        `dict` with query statistics, see `ResultWriter.stats()`.
         """
         self.logger.debug("SQLCmd.execute:  %s", query)
         if async_timeout > 0:
 
-            # run SUBMIT command and wait until it finishes
-            commandLine = self._mysql_cmd[:]
-            commandLine.append('--skip-column-names')
-            commandLine += ['-e', "SUBMIT " + query]
-            self.logger.debug("SQLCmd.execute running SUBMIT query")
-            try:
-                data = subprocess.check_output(commandLine)
-            except subprocess.CalledProcessError as exc:
-                self.logger.error("SUBMIT failed: %s", exc)
-                return
-
-            # read query ID
-            try:
-                qid = int(data.split()[0])
-                self.logger.debug("SQLCmd.execute query ID = %s", qid)
-            except Exception:
-                raise RuntimeError("Failed to read query ID from SUBMIT: %s",
-                                   data)
+            qid = self.submit(query, async_timeout)
+            if qid is None:
+                return failedStats()
 
             # wait until query completes
-            query = "SELECT STATE FROM INFORMATION_SCHEMA.PROCESSLIST "\
-                    "WHERE ID = {}".format(qid)
-            commandLine = self._mysql_cmd[:]
-            commandLine.append('--skip-column-names')
-            commandLine += ['-e', query]
             self.logger.debug("SQLCmd.execute waiting for query to complete")
-            end_time = time.time() + async_timeout
-            while time.time() < end_time:
-                try:
-                    data = subprocess.check_output(commandLine)
-                except subprocess.CalledProcessError as exc:
-                    self.logger.error("Async status query failed: %s", exc)
-                    return
-                status = data.strip()
-                self.logger.debug("SQLCmd.execute query status = %s", status)
-                if status == b"COMPLETED":
-                    break
-            else:
-                raise RuntimeError("Timeout while waiting for detached query")
-
-            # OK, we are here, means query completed, to retrieve its result
-            # we need different query
-            query = "SELECT * from qserv_result({})".format(qid)
+            status = self._asyncPoller().wait(qid)
+            if self.checkStatus(qid, status):
+                return self.fetchResult(qid, output, column_names)
+            return failedStats()
+
+        return self._run(query, output, column_names)
+
+    def submit(self, query, async_timeout):
+        """Run query in detached mode and start tracking its state.
+
+        Parameters
+        ----------
+        query : `str`
+            Query string.
+        async_timeout : int
+            Timeout in seconds to wait for query completion.
+
+        Returns
+        -------
+        Query ID, `None` if SUBMIT failed.
+        """
+        self.logger.debug("SQLCmd.execute running SUBMIT query")
+        try:
+            rows = self._queryRows("SUBMIT " + query)
+        except Exception as exc:
+            self.logger.error("SUBMIT failed: %s", exc)
+            return None
+        try:
+            qid = int(rows[0][0])
+            self.logger.debug("SQLCmd.execute query ID = %s", qid)
+        except Exception:
+            raise RuntimeError("Failed to read query ID from SUBMIT: %s",
+                               rows)
+        self._asyncPoller().register(qid, async_timeout)
+        return qid
+
+    def waitAny(self):
+        """Wait until any submitted query finishes.
+
+        Returns
+        -------
+        2-tuple of query ID and its final state, `None` if no submitted
+        query is outstanding.
+        """
+        return self._asyncPoller().waitAny()
+
+    def checkStatus(self, qid, status):
+        """Check final state of a detached query.
+
+        Returns
+        -------
+        `True` if query result can be retrieved.
+
+        Raises
+        ------
+        RuntimeError
+            If query did not finish before its timeout.
+        """
+        self.logger.debug("SQLCmd.execute query status = %s", status)
+        if status == asyncPoller.TIMEOUT:
+            raise RuntimeError("Timeout while waiting for detached query")
+        elif status != 'COMPLETED':
+            self.logger.error("Detached query %s finished with status %s",
+                              qid, status)
+            return False
+        return True
 
+    def fetchResult(self, qid, output=None, column_names=True):
+        """Retrieve result of a completed detached query.
+
+        Parameters
+        ----------
+        qid : int
+            Query ID returned by submit().
+        output : object, optional
+            Either file object or file name, by default output goes to stdout.
+        column_names : boolean, optional
+            If `False` then column names are not printed.
+
+        Returns
+        -------
+        `dict` with query statistics, see `ResultWriter.stats()`.
+        """
+        query = "SELECT * from qserv_result({})".format(qid)
+        return self._run(query, output, column_names)
+
+    def _run(self, query, output, column_names):
+        """Run query and write its result to output.
+
+        Returns
+        -------
+        `dict` with query statistics, see `ResultWriter.stats()`.
+        """
         commandLine = self._mysql_cmd[:]
         if not column_names:
             commandLine.append('--skip-column-names')
         commandLine += ['-e', query]
-        commons.run_command(commandLine, stdout=output)
+        self.logger.debug("cmd : %s", commandLine)
+        with ResultWriter(output, column_names) as writer, \
+                tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(commandLine, stdout=subprocess.PIPE,
+                                       stderr=errors)
+            # stream result, this allows to measure time to first byte
+            fd = process.stdout.fileno()
+            for data in iter(lambda: os.read(fd, _BUFFER_SIZE), b''):
+                writer.write(data)
+            process.stdout.close()
+            status = process.wait()
+            if status != 0:
+                errors.seek(0)
+                message = errors.read().decode(errors='replace')
+                if not self._keepGoing:
+                    raise QueryError(status, message)
+                self.logger.error("Query failed with exit code %s: %s",
+                                  status, message)
+        return writer.stats(status)
+
+    def _queryRows(self, query):
+        """Run query and return its result.
+
+        Returns
+        -------
+        List of rows, each row is a list of `bytes` values.
+        """
+        commandLine = self._mysql_cmd[:]
+        commandLine.append('--skip-column-names')
+        commandLine += ['-e', query]
+        data = subprocess.check_output(commandLine)
+        return [line.split(b'\t') for line in data.splitlines()]
+
+    def _fetchQueryStates(self, qids):
+        """Return state of detached queries, keyed by query ID.
+        """
+        query = "SELECT ID, STATE FROM INFORMATION_SCHEMA.PROCESSLIST "\
+                "WHERE ID IN ({})".format(", ".join(str(qid) for qid in qids))
+        states = {}
+        for row in self._queryRows(query):
+            state = row[1]
+            if isinstance(state, bytes):
+                state = state.decode()
+            states[int(row[0])] = state
+        return states
+
+    def _asyncPoller(self):
+        """Return poller shared by all detached queries of this client.
+        """
+        with self._pollerLock:
+            if self._poller is None:
+                self._poller = asyncPoller.AsyncPoller(self._fetchQueryStates)
+            return self._poller
@@ -0,0 +1,167 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining AsyncPoller class which waits for Qserv detached queries.
+
+A single background thread checks state of all outstanding queries with one
+status query, and sleeps with exponential backoff while nothing changes.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import threading
+import time
+
+_LOG = logging.getLogger(__name__)
+
+# states of a detached query which will not change anymore
+TERMINAL_STATES = ('COMPLETED', 'FAILED', 'ABORTED')
+
+# pseudo-states reported by the poller itself
+TIMEOUT = 'TIMEOUT'
+ERROR = 'ERROR'
+
+
+class AsyncPoller(object):
+    """
+    Wait for completion of detached queries
+
+    Parameters
+    ----------
+    fetch_states : callable
+        Takes a list of query IDs and returns a dict mapping query ID to
+        its state string, IDs unknown to the server can be omitted.
+    initial_delay : float, optional
+        Delay in seconds between status checks right after a state change.
+    max_delay : float, optional
+        Upper limit for delay between status checks.
+    factor : float, optional
+        Delay is multiplied by this factor after each check which did not
+        see any query finishing.
+    """
+
+    def __init__(self, fetch_states, initial_delay=0.05, max_delay=2.0,
+                 factor=2.0):
+        self._fetchStates = fetch_states
+        self._initialDelay = initial_delay
+        self._maxDelay = max_delay
+        self._factor = factor
+
+        self._cond = threading.Condition()
+        # query ID -> deadline
+        self._pending = {}
+        # query ID -> final state
+        self._done = {}
+        self._thread = None
+        self._delay = initial_delay
+
+    def register(self, qid, timeout):
+        """Start tracking a detached query.
+
+        Parameters
+        ----------
+        qid : int
+            Query ID returned by SUBMIT.
+        timeout : float
+            Time in seconds after which query is reported as TIMEOUT.
+        """
+        with self._cond:
+            self._pending[qid] = time.time() + timeout
+            # new query: check soon
+            self._delay = self._initialDelay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="AsyncPoller")
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify_all()
+
+    def wait(self, qid):
+        """Block until a registered query finishes.
+
+        Returns
+        -------
+        Final query state, one of TERMINAL_STATES, TIMEOUT or ERROR.
+        """
+        with self._cond:
+            while qid not in self._done:
+                self._cond.wait()
+            return self._done.pop(qid)
+
+    def waitAny(self):
+        """Block until any registered query finishes.
+
+        Returns
+        -------
+        2-tuple of query ID and its final state, `None` if no query is
+        tracked.
+        """
+        with self._cond:
+            while not self._done and self._pending:
+                self._cond.wait()
+            if not self._done:
+                return None
+            return self._done.popitem()
+
+    def pending(self):
+        """Return number of queries which are not finished yet.
+        """
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._thread = None
+                    return
+                qids = sorted(self._pending)
+
+            try:
+                states = self._fetchStates(qids)
+            except Exception as exc:
+                _LOG.error("Async status query failed: %s", exc)
+                states = dict((qid, ERROR) for qid in qids)
+            _LOG.debug("Async query states: %s", states)
+
+            now = time.time()
+            with self._cond:
+                finished = False
+                for qid in qids:
+                    state = states.get(qid)
+                    if state in TERMINAL_STATES or state == ERROR:
+                        self._done[qid] = state
+                    elif now > self._pending[qid]:
+                        self._done[qid] = TIMEOUT
+                    else:
+                        continue
+                    del self._pending[qid]
+                    finished = True
+
+                if finished:
+                    self._delay = self._initialDelay
+                    self._cond.notify_all()
+                delay = self._delay
+                self._delay = min(self._delay * self._factor, self._maxDelay)
+                if self._pending:
+                    # register() wakes us up early
+                    self._cond.wait(delay)
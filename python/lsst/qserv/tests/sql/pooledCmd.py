@@ -0,0 +1,251 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining PooledCmd class, an in-process alternative to Cmd.
+
+PooledCmd keeps persistent DB-API connections in a pool shared by all
+instances using the same server and database, and writes query results
+in the same format as `mysql --batch`, so both executors can be used
+interchangeably.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python2
+
+from . import const
+from .cmd import Cmd
+from .resultWriter import QueryError, ResultWriter
+
+_LOG = logging.getLogger(__name__)
+
+# default number of idle connections kept in each pool
+POOL_SIZE = 8
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _escape(value):
+    """Format a single value the way `mysql --batch` does.
+    """
+    if value is None:
+        return b'NULL'
+    if not isinstance(value, bytes):
+        value = str(value).encode('utf-8')
+    return value.replace(b'\\', b'\\\\').replace(b'\0', b'\\0') \
+                .replace(b'\t', b'\\t').replace(b'\n', b'\\n')
+
+
+def formatRow(row):
+    """Return a row formatted as one line of `mysql --batch` output.
+
+    Parameters
+    ----------
+    row : sequence
+        Column values, `None` stands for SQL NULL.
+
+    Returns
+    -------
+    `bytes` with trailing newline.
+    """
+    return b'\t'.join(_escape(value) for value in row) + b'\n'
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of DB-API connections
+
+    Parameters
+    ----------
+    connect : callable
+        Called without arguments to open a new connection.
+    size : int
+        Maximum number of idle connections kept in the pool.
+    """
+
+    def __init__(self, connect, size=POOL_SIZE):
+        self._connect = connect
+        self._idle = queue.Queue(maxsize=size)
+
+    def acquire(self):
+        """Return an idle connection, open a new one if none is available.
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            _LOG.debug("Opening new database connection")
+            return self._connect()
+
+    def release(self, conn, broken=False):
+        """Give connection back to the pool, close it if the pool is full or
+        if the connection is not usable anymore.
+        """
+        if not broken:
+            try:
+                self._idle.put_nowait(conn)
+                return
+            except queue.Full:
+                pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close all idle connections.
+        """
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.release(conn, broken=True)
+
+
+def closePools():
+    """Close idle connections of all pools.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+class PooledCmd(Cmd):
+    """
+    Run queries using pooled in-process database connections
+
+    Parameters
+    ----------
+    config: `dict`
+        Keys are configuration section names, values are dicts.
+    mode: `int`
+        One of const.MYSQL_PROXY, const.MYSQL_SOCK, const.MYSQL_NET.
+    database: `str`
+        Default database name.
+    pool_size: `int`, optional
+        Maximum number of idle connections kept for this server and database.
+    keep_going: `bool`, optional
+        If `True`, a failing query is reported through its statistics,
+        otherwise `QueryError` is raised.
+    """
+
+    def __init__(self, config, mode, database, pool_size=POOL_SIZE,
+                 keep_going=False):
+        super(PooledCmd, self).__init__(config, mode, database, keep_going)
+
+        self._connect_args = self._connectArgs(mode, database)
+        key = tuple(sorted(self._connect_args.items()))
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(self._connect, pool_size)
+                _pools[key] = pool
+        self._pool = pool
+
+    def _connectArgs(self, mode, database):
+        args = {}
+        if mode == const.MYSQL_PROXY:
+            args['host'] = self.config['qserv']['master']
+            args['port'] = int(self.config['mysql_proxy']['port'])
+            args['user'] = self.config['qserv']['user']
+        elif mode == const.MYSQL_SOCK:
+            args['unix_socket'] = self.config['mysqld']['socket']
+            args['user'] = self.config['mysqld']['user']
+            args['passwd'] = self.config['mysqld']['pass']
+        elif mode == const.MYSQL_NET:
+            args['host'] = self.config['qserv']['master']
+            args['port'] = int(self.config['mysqld']['port'])
+            args['user'] = self.config['mysqld']['user']
+            args['passwd'] = self.config['mysqld']['pass']
+        if database is not None:
+            args['db'] = database
+        return args
+
+    def _connect(self):
+        # MySQLdb is only required by this executor
+        import MySQLdb
+        # no type conversion: values are returned as sent by the server,
+        # this is what mysql client prints
+        return MySQLdb.connect(conv={}, use_unicode=False,
+                               **self._connect_args)
+
+    def _query(self, query):
+        """Run query on a pooled connection.
+
+        Returns
+        -------
+        2-tuple of column names (`None` if query returns no result set) and
+        list of rows.
+        """
+        conn = self._pool.acquire()
+        broken = True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                names = None
+                rows = []
+                if cursor.description is not None:
+                    names = [d[0] for d in cursor.description]
+                    rows = cursor.fetchall()
+            finally:
+                cursor.close()
+            broken = False
+        finally:
+            self._pool.release(conn, broken)
+        return names, rows
+
+    def _queryRows(self, query):
+        _, rows = self._query(query)
+        return rows
+
+    def _run(self, query, output, column_names):
+        with ResultWriter(output, column_names) as writer:
+            try:
+                names, rows = self._query(query)
+            except Exception as exc:
+                # MySQL error number when available
+                code = exc.args[0] if exc.args and isinstance(exc.args[0], int) else 1
+                if not self._keepGoing:
+                    raise QueryError(code, exc)
+                self.logger.error("Query failed: %s", exc)
+                return writer.stats(status=code)
+            self._write(names, rows, writer, column_names)
+        return writer.stats()
+
+    @staticmethod
+    def _write(names, rows, out, column_names):
+        """Write result set in `mysql --batch` format.
+        """
+        # mysql prints nothing at all for empty result sets
+        if names is not None and rows:
+            if column_names:
+                out.write(formatRow(names))
+            for row in rows:
+                out.write(formatRow(row))
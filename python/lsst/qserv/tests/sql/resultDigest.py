@@ -0,0 +1,78 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining ResultDigest class, which fingerprints a query result while
+it is streamed.
+
+Two digests are computed: a SHA-256 of the whole stream, which depends on row
+order, and a multiset digest, the sum modulo 2^256 of SHA-256 of each line,
+which does not.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+
+_MASK = (1 << 256) - 1
+
+
+def _lineHash(line):
+    return int(hashlib.sha256(line).hexdigest(), 16)
+
+
+class ResultDigest(object):
+    """
+    Compute ordered and order-insensitive digests of a stream of lines
+    """
+
+    def __init__(self):
+        self._ordered = hashlib.sha256()
+        self._multiset = 0
+        # incomplete last line of data seen so far
+        self._partial = b''
+
+    def update(self, data):
+        """Add a chunk of data, chunks do not need to end on a line boundary.
+        """
+        self._ordered.update(data)
+        if self._partial:
+            data = self._partial + data
+        lines = data.split(b'\n')
+        self._partial = lines.pop()
+        multiset = self._multiset
+        for line in lines:
+            multiset += _lineHash(line)
+        self._multiset = multiset & _MASK
+
+    @property
+    def ordered(self):
+        """Hex digest of data, depends on line order.
+        """
+        return self._ordered.hexdigest()
+
+    @property
+    def multiset(self):
+        """Hex digest of the multiset of lines, independent of their order.
+        """
+        multiset = self._multiset
+        if self._partial:
+            multiset = (multiset + _lineHash(self._partial)) & _MASK
+        return "%064x" % multiset
@@ -0,0 +1,132 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Module defining ResultWriter class, which writes query results to their
+output and measures them on the fly.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import time
+
+from .resultDigest import ResultDigest
+
+
+class QueryError(Exception):
+    """Raised by executors when a query fails and they do not keep going.
+    """
+
+    def __init__(self, status, message):
+        Exception.__init__(self, "query failed with status %s: %s" % (status, message))
+        self.status = status
+
+
+def failedStats(status=1):
+    """Return statistics for a query which did not produce any result.
+    """
+    return dict(status=status, rows=0, bytes=0, first_byte_time=None,
+                digest=None, multiset_digest=None)
+
+
+class ResultWriter(object):
+    """
+    Write query result and collect statistics about it
+
+    Parameters
+    ----------
+    output : object, optional
+        Either file object or file name, by default output goes to stdout.
+    column_names : boolean, optional
+        `True` if first line of result contains column names.
+    """
+
+    def __init__(self, output=None, column_names=True):
+        self._close = False
+        if output is None:
+            self._out = getattr(sys.stdout, 'buffer', sys.stdout)
+        elif isinstance(output, str):
+            self._out = open(output, 'wb')
+            self._close = True
+        else:
+            self._out = getattr(output, 'buffer', output)
+        self._columnNames = column_names
+
+        self.firstByteTime = None
+        self.bytes = 0
+        self.lines = 0
+        self.digest = ResultDigest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, data):
+        """Write a chunk of result, chunks do not need to end on a line
+        boundary.
+
+        Parameters
+        ----------
+        data : `bytes`
+            Result chunk in `mysql --batch` format.
+        """
+        if not data:
+            return
+        if self.firstByteTime is None:
+            self.firstByteTime = time.time()
+        self.bytes += len(data)
+        self.lines += data.count(b'\n')
+        self.digest.update(data)
+        self._out.write(data)
+
+    def close(self):
+        self._out.flush()
+        if self._close:
+            self._out.close()
+
+    @property
+    def rows(self):
+        """Number of result rows, column names excluded.
+        """
+        if self._columnNames and self.lines:
+            return self.lines - 1
+        return self.lines
+
+    def stats(self, status=0):
+        """Return statistics about written result.
+
+        Parameters
+        ----------
+        status : int, optional
+            Exit status of query, 0 means success.
+
+        Returns
+        -------
+        `dict` with keys 'status', 'rows', 'bytes', 'first_byte_time' (a
+        timestamp, `None` if result is empty), 'digest' and 'multiset_digest'
+        (see `ResultDigest`).
+        """
+        return dict(status=status, rows=self.rows, bytes=self.bytes,
+                    first_byte_time=self.firstByteTime,
+                    digest=self.digest.ordered,
+                    multiset_digest=self.digest.multiset)
@@ -0,0 +1,121 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Timing statistics of repeated query runs, and their comparison against a
+baseline stored by a previous run.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import logging
+
+from .queryReport import describe
+
+_LOG = logging.getLogger(__name__)
+
+# default relative slowdown reported as a regression
+DEFAULT_THRESHOLD = 0.1
+
+# name used for whole test case in regression list
+CASE = '*'
+
+
+def buildTimings(case_id, iterations, warmup, samples):
+    """Compute timing statistics per query and per test case.
+
+    Parameters
+    ----------
+    case_id : str
+        Test case identifier.
+    iterations : int
+        Number of timed iterations.
+    warmup : int
+        Number of untimed iterations run first.
+    samples : dict
+        Keys are modes, values are dicts mapping query file name to list of
+        measured wall times (one per timed iteration).
+
+    Returns
+    -------
+    `dict` which can be stored as baseline.
+    """
+    modes = {}
+    for mode, queries in samples.items():
+        # wall time of the whole query sweep for each iteration
+        totals = [sum(times[i] for times in queries.values())
+                  for i in range(iterations)]
+        modes[mode] = dict(queries=dict((qFN, describe(times))
+                                        for qFN, times in queries.items()),
+                           case=describe(totals))
+    return dict(case=case_id, iterations=iterations, warmup=warmup,
+                modes=modes)
+
+
+def save(timings, filename):
+    with open(filename, 'w') as f:
+        json.dump(timings, f, indent=2, sort_keys=True)
+
+
+def load(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def findRegressions(timings, baseline, threshold=DEFAULT_THRESHOLD,
+                    statistic='median'):
+    """Compare timings against a baseline.
+
+    Parameters
+    ----------
+    timings : dict
+        Current timings, as returned by `buildTimings()`.
+    baseline : dict
+        Reference timings.
+    threshold : float, optional
+        Relative slowdown above which a query is reported, e.g. 0.1 for 10%.
+    statistic : str, optional
+        Statistic which is compared.
+
+    Returns
+    -------
+    List of dicts with keys 'mode', 'query' (CASE for whole test case),
+    'baseline', 'current' and 'change', sorted by mode and query.
+    """
+    regressions = []
+    for mode, current in sorted(timings['modes'].items()):
+        reference = baseline.get('modes', {}).get(mode)
+        if reference is None:
+            _LOG.warning("No baseline timings for mode %s", mode)
+            continue
+        pairs = [(CASE, current['case'], reference['case'])]
+        for qFN, stats in sorted(current['queries'].items()):
+            if qFN in reference['queries']:
+                pairs.append((qFN, stats, reference['queries'][qFN]))
+        for qFN, stats, ref in pairs:
+            cur, base = stats[statistic], ref[statistic]
+            if not base:
+                continue
+            change = cur / base - 1.
+            if change > threshold:
+                regressions.append(dict(mode=mode, query=qFN, baseline=base,
+                                        current=cur, change=change))
+    return regressions
@@ -0,0 +1,292 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for query scheduling of integration test benchmark.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # python2
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import benchmark
+from lsst.qserv.tests.sql import poller
+from lsst.qserv.tests.sql.resultWriter import QueryError
+
+_DESCRIPTION = """
+tables:
+    load-order: ['Object']
+extensions:
+    data: '.tsv'
+    schema: '.schema'
+"""
+
+
+def _benchmark(tmpdir, queries):
+    """Return benchmark of a test case with one table and given queries.
+    """
+    testdataDir = os.path.join(tmpdir, "datasets")
+    caseDir = os.path.join(testdataDir, "case99")
+    os.makedirs(os.path.join(caseDir, "data", "schema"))
+    os.makedirs(os.path.join(caseDir, "queries"))
+    with open(os.path.join(caseDir, "data", "description.yaml"), 'w') as f:
+        f.write(_DESCRIPTION)
+    with open(os.path.join(caseDir, "data", "schema", "Object.schema"), 'w') as f:
+        f.write("CREATE TABLE Object (id INT);")
+    for qFN, text in queries.items():
+        with open(os.path.join(caseDir, "queries", qFN), 'w') as f:
+            f.write(text)
+
+    config = {'qserv': {'tmp_dir': tmpdir}}
+    with mock.patch.object(benchmark.commons, 'read_user_config',
+                           return_value=config):
+        return benchmark.Benchmark("99", False, testdataDir, keep_outputs=False)
+
+
+def _stats():
+    return dict(status=0, rows=1, bytes=2, first_byte_time=None, digest=None,
+                multiset_digest=None)
+
+
+class _AsyncServer(object):
+    """Fake SQL client running detached queries, query "SELECT N ..." runs
+    during N status checks, or fails if N is in failures.
+    """
+
+    def __init__(self, submitFailures=(), failures=(), fetchFailures=()):
+        self._lock = threading.Lock()
+        self._submitFailures = submitFailures
+        self._failures = failures
+        self._fetchFailures = fetchFailures
+        self._poller = poller.AsyncPoller(self._fetchStates, initial_delay=0.001,
+                                          max_delay=0.01)
+        self._queries = {}
+        self._checks = {}
+        self.running = 0
+        self.maxRunning = 0
+        self.fetched = []
+        self.executed = []
+
+    @staticmethod
+    def _number(query):
+        return int(query.split()[1])
+
+    def _fetchStates(self, qids):
+        states = {}
+        with self._lock:
+            for qid in qids:
+                self._checks[qid] += 1
+                number = self._number(self._queries[qid])
+                if self._checks[qid] >= number:
+                    states[qid] = 'FAILED' if number in self._failures else 'COMPLETED'
+                else:
+                    states[qid] = 'EXECUTING'
+        return states
+
+    def execute(self, query, output, column_names, async_timeout):
+        self.executed.append(self._number(query))
+        return _stats()
+
+    def submit(self, query, async_timeout):
+        if self._number(query) in self._submitFailures:
+            return None
+        with self._lock:
+            qid = len(self._queries) + 1
+            self._queries[qid] = query
+            self._checks[qid] = 0
+            self.running += 1
+            self.maxRunning = max(self.maxRunning, self.running)
+        self._poller.register(qid, async_timeout)
+        return qid
+
+    def waitAny(self):
+        res = self._poller.waitAny()
+        with self._lock:
+            self.running -= 1
+        return res
+
+    def checkStatus(self, qid, status):
+        return status == 'COMPLETED'
+
+    def fetchResult(self, qid, output=None, column_names=True):
+        if self._number(self._queries[qid]) in self._fetchFailures:
+            raise QueryError(1, "fetch failed")
+        self.fetched.append(self._number(self._queries[qid]))
+        return _stats()
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.queries = ["0001_a.sql", "0002_b.sql", "0003_c.sql"]
+        self.benchmark = _benchmark(self.tmpdir, dict(
+            (qFN, "SELECT id FROM {DBTAG_A}Object") for qFN in self.queries))
+        patcher = mock.patch.object(self.benchmark, '_sqlInterface')
+        self.sqlInterface = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _stubQueries(self, wallTimes, barrier=None):
+        """Replace query execution, return list of started queries.
+        """
+        started = []
+        lock = threading.Lock()
+
+        def runQuery(sqlInterface, mode, qFN, withQserv, dbNameDot, outDir):
+            with lock:
+                started.append(qFN)
+            if barrier is not None and qFN in barrier:
+                barrier[qFN].wait()
+            return {'wall_time': wallTimes[qFN]}
+
+        patcher = mock.patch.object(self.benchmark, '_runQuery', side_effect=runQuery)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return started
+
+    def test_longestFirst(self):
+        self.benchmark._saveDurations('mysql', {"0001_a.sql": 1., "0002_b.sql": 5.})
+        # first two queries run simultaneously, before the third one
+        barrier = threading.Barrier(2, timeout=10)
+        started = self._stubQueries(dict((qFN, 1.) for qFN in self.queries),
+                                    {"0002_b.sql": barrier, "0003_c.sql": barrier})
+        self.benchmark.runQueries('mysql', 'db', parallel=2)
+        # unknown query and longest one first
+        self.assertEqual(sorted(started[:2]), ["0002_b.sql", "0003_c.sql"])
+        self.assertEqual(started[2], "0001_a.sql")
+
+    def test_durations(self):
+        self.assertEqual(self.benchmark._loadDurations('mysql'), {})
+        self.benchmark._saveDurations('qserv', {"0001_a.sql": 3.})
+        wallTimes = {"0001_a.sql": 0.5, "0002_b.sql": 2., "0003_c.sql": 1.}
+        self._stubQueries(wallTimes)
+        self.benchmark.runQueries('mysql', 'db')
+        # durations of each mode are kept for next run
+        self.assertEqual(self.benchmark._loadDurations('mysql'), wallTimes)
+        self.assertEqual(self.benchmark._loadDurations('qserv'), {"0001_a.sql": 3.})
+
+        with open(self.benchmark._stateFile("durations.json"), 'w') as f:
+            f.write("{")
+        self.assertEqual(self.benchmark._loadDurations('mysql'), {})
+
+    def test_abort(self):
+        started = []
+
+        def runQuery(sqlInterface, mode, qFN, withQserv, dbNameDot, outDir):
+            started.append(qFN)
+            if qFN == "0001_a.sql":
+                raise QueryError(1, "syntax error")
+            time.sleep(0.1)
+            return self.benchmark._record(mode, qFN, {}, 0., 0.1, _stats())
+
+        with mock.patch.object(self.benchmark, '_runQuery', side_effect=runQuery):
+            with self.assertRaises(QueryError):
+                self.benchmark.runQueries('mysql', 'db')
+        self.assertEqual(started, ["0001_a.sql"])
+
+        # queries not started yet are cancelled, report of others is written
+        self.benchmark = _benchmark(os.path.join(self.tmpdir, "parallel"), dict(
+            ("%04d_a.sql" % n, "SELECT id FROM {DBTAG_A}Object") for n in range(1, 7)))
+        started = []
+        with mock.patch.object(self.benchmark, '_sqlInterface'), \
+                mock.patch.object(self.benchmark, '_runQuery', side_effect=runQuery):
+            with self.assertRaises(QueryError):
+                self.benchmark.runQueries('mysql', 'db', parallel=2)
+        self.assertLessEqual(len(started), 3)
+        self.assertEqual(sorted(self.benchmark._loadDurations('mysql')),
+                         sorted(started)[1:])
+        self.assertTrue(os.path.exists(self.benchmark._manifestFile('mysql')))
+
+
+class TestPipelined(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # first query runs longer than the second one
+        queries = dict(("%04d_q.sql" % (i + 1), "SELECT %d FROM {DBTAG_A}Object" % n)
+                       for i, n in enumerate((3, 1, 2, 4, 5)))
+        queries["0006_q.sql"] = "-- pragma no_async\nSELECT 6 FROM {DBTAG_A}Object"
+        self.queries = sorted(queries)
+        self.benchmark = _benchmark(self.tmpdir, queries)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _run(self, server, inflight):
+        with mock.patch.object(self.benchmark, '_sqlInterface', return_value=server):
+            self.benchmark.runQueries('qserv_async', 'db', async_inflight=inflight)
+        entries = self.benchmark._manifests['qserv_async'].entries
+        return dict((qFN, entry['status']) for qFN, entry in entries.items())
+
+    def test_inflight(self):
+        server = _AsyncServer()
+        statuses = self._run(server, 2)
+        self.assertEqual(server.maxRunning, 2)
+        self.assertEqual(statuses, dict((qFN, 0) for qFN in self.queries))
+        # results are fetched as soon as queries finish, not in submission order
+        self.assertEqual(server.fetched[0], 1)
+        self.assertEqual(sorted(server.fetched), [1, 2, 3, 4, 5])
+        # query which must not be detached is run synchronously
+        self.assertEqual(server.executed, [6])
+        self.assertEqual(sorted(self.benchmark._loadDurations('qserv_async')),
+                         self.queries)
+
+    def test_failures(self):
+        server = _AsyncServer(submitFailures=(2,), failures=(4,))
+        statuses = self._run(server, 3)
+        self.assertEqual(statuses, {"0001_q.sql": 0, "0002_q.sql": 0, "0003_q.sql": 1,
+                                    "0004_q.sql": 1, "0005_q.sql": 0, "0006_q.sql": 0})
+        # following queries run after a failed SUBMIT
+        self.assertEqual(sorted(server.fetched), [1, 3, 5])
+        self.assertEqual(server.running, 0)
+
+    def test_abort(self):
+        server = _AsyncServer(fetchFailures=(2,))
+        with self.assertRaises(QueryError):
+            self._run(server, 2)
+        # no query is submitted after the failure, completed ones are reported
+        self.assertIn(1, server.fetched)
+        self.assertLessEqual(set(server.fetched), set([1, 3]))
+        self.assertEqual(server.executed, [])
+        self.assertIn("0002_q.sql", self.benchmark._manifests['qserv_async'].entries)
+        self.assertTrue(os.path.exists(self.benchmark._manifestFile('qserv_async')))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    for testCase in (TestBenchmark, TestPipelined):
+        suite.addTests(unittest.TestLoader().loadTestsFromTestCase(testCase))
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
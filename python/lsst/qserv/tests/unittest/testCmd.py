@@ -0,0 +1,67 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for mysql client executor.
+"""
+import io
+import sys
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests.sql import const
+from lsst.qserv.tests.sql.cmd import Cmd
+from lsst.qserv.tests.sql.resultWriter import QueryError
+
+_CONFIG = {'mysqld': {'socket': '/tmp/mysql.sock', 'user': 'root', 'pass': 'x'}}
+
+
+class TestCmd(unittest.TestCase):
+
+    def _cmd(self, code, keep_going):
+        sqlCmd = Cmd(_CONFIG, const.MYSQL_SOCK, 'db', keep_going=keep_going)
+        # fake mysql client, query is passed as argument
+        sqlCmd._mysql_cmd = [sys.executable, "-c", code]
+        return sqlCmd
+
+    def test_result(self):
+        out = io.BytesIO()
+        stats = self._cmd("print('a\\tb'); print('1\\t2')", False)._run("SELECT 1", out, True)
+        self.assertEqual(out.getvalue(), b"a\tb\n1\t2\n")
+        self.assertEqual((stats['status'], stats['rows']), (0, 1))
+
+    def test_failure(self):
+        code = "import sys; sys.stderr.write('ERROR 1064'); sys.exit(3)"
+        with self.assertRaises(QueryError) as cm:
+            self._cmd(code, False)._run("SELECT", io.BytesIO(), True)
+        self.assertEqual(cm.exception.status, 3)
+        self.assertIn("ERROR 1064", str(cm.exception))
+        stats = self._cmd(code, True)._run("SELECT", io.BytesIO(), True)
+        self.assertEqual(stats['status'], 3)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestCmd)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,181 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for memory-mapped columns of input data.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # python2
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import columnCache
+from lsst.qserv.tests.dataConfig import DataConfig
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_DESCRIPTION = """
+tables:
+    directors:          ['Object']
+    partitioned-tables: ['Object']
+extensions:
+    data: '.csv'
+    schema: '.schema'
+    zip: '.gz'
+"""
+
+_SCHEMA = """CREATE TABLE `Object` (
+  `objectId` bigint(20) NOT NULL,
+  `ra` double NOT NULL,
+  `flux` float DEFAULT NULL,
+  `nObs` smallint(5) unsigned DEFAULT NULL,
+  `name` varchar(16) DEFAULT NULL,
+  `flag` bit(1) NOT NULL,
+  PRIMARY KEY (`objectId`)
+) ENGINE=MyISAM DEFAULT CHARSET=latin1;
+"""
+
+
+class TestColumnType(unittest.TestCase):
+
+    def test_columnType(self):
+        self.assertEqual(columnCache.columnType(" bigint(20) NOT NULL"), '<i8')
+        self.assertEqual(columnCache.columnType("INT UNSIGNED"), '<u4')
+        self.assertEqual(columnCache.columnType("FLOAT DEFAULT NULL"), '<f4')
+        self.assertEqual(columnCache.columnType("decimal(10, 3)"), '<f8')
+        self.assertEqual(columnCache.columnType("bit(8)"), '<u8')
+        self.assertEqual(columnCache.columnType("char(3) NOT NULL"), 'S')
+        self.assertEqual(columnCache.columnType("TIMESTAMP"), 'S')
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestColumnCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dataDir = os.path.join(self.tmpdir, "data")
+        for subdir in ("schema", "partition"):
+            os.makedirs(os.path.join(self.dataDir, subdir))
+
+        def write(name, data):
+            with open(os.path.join(self.dataDir, name), 'w') as f:
+                f.write(data)
+
+        write("description.yaml", _DESCRIPTION)
+        write("schema/Object.schema", _SCHEMA)
+        write("partition/common.json", json.dumps(
+            {'in': {'csv': {'delimiter': ',', 'null': '\\N'}}}))
+        self.dataFile = os.path.join(self.dataDir, "Object.csv.gz")
+        with gzip.open(self.dataFile, 'wb') as f:
+            f.write(b'1,10.5,\\N,3,"a,b",\x01\n'
+                    b'2,-5,1.5,\\N,c\\\nd\\,e,\x00\n'
+                    b'3,0.25,2,65535,\\N,\x01\n')
+        self.dataConfig = DataConfig(self.dataDir)
+        self.cacheRoot = os.path.join(self.tmpdir, "cacheRoot")
+        patcher = mock.patch.object(columnCache, 'COLUMN_CACHE_DIR', self.cacheRoot)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_column(self):
+        self.assertEqual(self.dataConfig.getColumnCache().columns('Object'),
+                         ['objectId', 'ra', 'flux', 'nObs', 'name', 'flag'])
+        objectId = self.dataConfig.getColumn('Object', 'objectId')
+        self.assertIsInstance(objectId, numpy.memmap)
+        self.assertFalse(objectId.flags.writeable)
+        self.assertEqual(objectId.dtype, numpy.dtype('<i8'))
+        self.assertEqual(objectId.tolist(), [1, 2, 3])
+        self.assertEqual(self.dataConfig.getColumn('Object', 'ra').tolist(),
+                         [10.5, -5, 0.25])
+
+        flux = self.dataConfig.getColumn('Object', 'flux')
+        self.assertEqual(flux.dtype, numpy.dtype('<f4'))
+        self.assertTrue(numpy.isnan(flux[0]))
+        self.assertEqual(self.dataConfig.getNullMask('Object', 'flux').tolist(),
+                         [True, False, False])
+        self.assertIsNone(self.dataConfig.getNullMask('Object', 'ra'))
+
+        nObs = self.dataConfig.getColumn('Object', 'nObs')
+        self.assertEqual(nObs.dtype, numpy.dtype('<u2'))
+        self.assertEqual(nObs.tolist(), [3, 0, 65535])
+
+        self.assertEqual(self.dataConfig.getColumn('Object', 'name').tolist(),
+                         [b'a,b', b'c\nd,e', b''])
+        self.assertEqual(self.dataConfig.getNullMask('Object', 'name').tolist(),
+                         [False, False, True])
+        self.assertEqual(self.dataConfig.getColumn('Object', 'flag').tolist(),
+                         [1, 0, 1])
+        with self.assertRaises(KeyError):
+            self.dataConfig.getColumn('Object', 'decl')
+
+        # cache is not written in dataset directory
+        self.assertEqual(sorted(os.listdir(self.dataDir)),
+                         ['Object.csv.gz', 'description.yaml', 'partition', 'schema'])
+        self.assertEqual(os.listdir(self.cacheRoot),
+                         [os.path.basename(columnCache.defaultCacheDir(self.dataDir))])
+
+    def test_cached(self):
+        cacheDir = os.path.join(self.tmpdir, "cache")
+        cache = self.dataConfig.getColumnCache(cacheDir)
+        self.assertFalse(cache.isCached('Object'))
+        self.assertTrue(cache.build('Object'))
+        self.assertFalse(cache.build('Object'))
+
+        # another cache instance reuses converted columns
+        cache = self.dataConfig.getColumnCache(cacheDir)
+        self.assertTrue(cache.isCached('Object'))
+        self.assertEqual(cache.rows('Object'), 3)
+
+        # input data changed
+        with gzip.open(self.dataFile, 'wb') as f:
+            f.write(b'4,1,1,1,x,\x01\n')
+        self.assertFalse(cache.isCached('Object'))
+        self.assertEqual(cache.column('Object', 'objectId').tolist(), [4])
+
+    def test_invalid(self):
+        with gzip.open(self.dataFile, 'wb') as f:
+            f.write(b'1,ten,1,1,x,\x01\n')
+        with self.assertRaises(ValueError):
+            self.dataConfig.getColumn('Object', 'ra')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    for testCase in (TestColumnType, TestColumnCache):
+        suite.addTests(unittest.TestLoader().loadTestsFromTestCase(testCase))
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -67,6 +67,18 @@ class TestDataConfig(unittest.TestCase):
             self.assertEqual(dataReader.directors, ['Object'],
                              "incorrect director table for case%s" % case_id)
 
+    def test_directorTables(self):
+        base_dir = os.getenv("QSERV_TESTDATA_DIR")
+        if base_dir is None:
+            TestDataConfig._logger.fatal("QSERV_TESTDATA_DIR environment missing.")
+            sys.exit(1)
+
+        input_dirname = os.path.join(base_dir, 'datasets', 'case01', 'data')
+        dataReader = DataConfig(input_dirname)
+        self.assertEqual(dataReader.getDirectorTables('Source'), ['Object'])
+        self.assertEqual(dataReader.getDirectorTables('Object'), [])
+        self.assertEqual(dataReader.getDirectorTables('Filter'), [])
+
 
 def suite():
     suite = unittest.TestLoader().loadTestsFromTestCase(TestDataConfig)
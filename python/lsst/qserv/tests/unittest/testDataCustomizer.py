@@ -26,15 +26,41 @@ Coverage needs to be extended.
 
 @author  Fabrice Jammes, IN2P3/SLAC
 """
+import errno
+import hashlib
 import logging
 import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # python2
 
 from lsst.qserv.admin import commons
 from lsst.qserv.admin import logger
+from lsst.qserv.tests import downloadCache
 from lsst.qserv.tests.dataCustomizer import DataCustomizer
 
+_DESCRIPTION = """
+tables:
+    directors:          ['Object']
+    partitioned-tables: ['Object', 'Source']
+extensions:
+    data: '.tsv'
+    schema: '.schema'
+    zip: '.gz'
+remote:
+    url-rsync: 'file://%s'
+    big-tables: ['Object', 'Source']
+    sha256:
+        Object.tsv.gz: '%s'
+"""
+
 
 class TestDataCustomizer(unittest.TestCase):
 
@@ -67,8 +93,135 @@ class TestDataCustomizer(unittest.TestCase):
         assert(os.path.exists(self._dest_file))
 
 
+class TestDownload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.remoteDir = os.path.join(self.tmpdir, "remote")
+        os.makedirs(self.remoteDir)
+        self.data = {}
+        for table in ("Object", "Source"):
+            self.data[table] = ("%s\n" % table).encode() * 100000
+            with open(os.path.join(self.remoteDir, table + ".tsv.gz"), 'wb') as f:
+                f.write(self.data[table])
+
+        self.testdataDir = os.path.join(self.tmpdir, "testdata")
+        dataDir = os.path.join(self.testdataDir, "case99", "data")
+        os.makedirs(os.path.join(dataDir, "schema"))
+        for table in ("Object", "Source"):
+            with open(os.path.join(dataDir, "schema", table + ".schema"), 'w') as f:
+                f.write("CREATE TABLE %s (id INT);" % table)
+        self.writeDescription(hashlib.sha256(self.data["Object"]).hexdigest())
+        self.workDir = os.path.join(self.tmpdir, "work")
+        os.makedirs(self.workDir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def writeDescription(self, checksum):
+        path = os.path.join(self.testdataDir, "case99", "data", "description.yaml")
+        with open(path, 'w') as f:
+            f.write(_DESCRIPTION % (self.remoteDir, checksum))
+
+    def customize(self, custom_case_id, link=False):
+        customizer = DataCustomizer("99", self.testdataDir, self.workDir,
+                                    custom_case_id=custom_case_id, download_jobs=2,
+                                    link=link)
+        resumeCopy = DataCustomizer._resumeCopy
+        self.resumedFrom = []
+
+        def _resumeCopy(src, dest_file):
+            self.resumedFrom.append(os.path.getsize(dest_file)
+                                    if os.path.exists(dest_file) else 0)
+            resumeCopy(src, dest_file)
+
+        with mock.patch.object(DataCustomizer, '_resumeCopy',
+                               side_effect=_resumeCopy) as copy:
+            customizer.run()
+        dataDir = os.path.join(self.workDir, "case" + custom_case_id, "data")
+        for table in ("Object", "Source"):
+            with open(os.path.join(dataDir, table + ".tsv.gz"), 'rb') as f:
+                self.assertEqual(f.read(), self.data[table])
+        return copy.call_count
+
+    def test_cached(self):
+        self.assertEqual(self.customize("a"), 2)
+        # files are not downloaded again for another custom case
+        self.assertEqual(self.customize("b"), 0)
+
+    def test_resume(self):
+        cache = downloadCache.DownloadCache(os.path.join(self.workDir, "download_cache"))
+        partial = cache._partial("file://" + os.path.join(self.remoteDir, "Source.tsv.gz"))
+        with open(partial, 'wb') as f:
+            f.write(self.data["Source"][:1000])
+        self.assertEqual(self.customize("a"), 2)
+        # download of Source resumed after its already downloaded part
+        self.assertEqual(sorted(self.resumedFrom), [0, 1000])
+
+    def test_checksum(self):
+        self.writeDescription("0" * 64)
+        with self.assertRaises(downloadCache.ChecksumError):
+            self.customize("a")
+        # partial file with wrong content is not resumed
+        self.assertEqual(os.listdir(os.path.join(self.workDir, "download_cache", "partial")),
+                         [])
+
+    def test_concurrentFetch(self):
+        cacheDir = os.path.join(self.workDir, "download_cache")
+        url = "file://" + os.path.join(self.remoteDir, "Object.tsv.gz")
+        downloads = []
+
+        def download(url, partial):
+            downloads.append(url)
+            # other fetch waits meanwhile
+            time.sleep(0.2)
+            with open(partial, 'ab') as f:
+                f.write(self.data["Object"])
+
+        # separate caches stand for separate processes, each one with its
+        # own copy of index
+        caches = [downloadCache.DownloadCache(cacheDir) for _ in range(2)]
+        paths = []
+        threads = [threading.Thread(target=lambda cache=cache: paths.append(
+            cache.fetch(url, download))) for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(downloads), 1)
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(paths[0], paths[1])
+        with open(paths[0], 'rb') as f:
+            self.assertEqual(f.read(), self.data["Object"])
+
+    def test_link(self):
+        self.customize("a", link=True)
+        srcDir = os.path.join(self.testdataDir, "case99", "data")
+        dataDir = os.path.join(self.workDir, "casea", "data")
+        with mock.patch("os.link", side_effect=OSError(errno.EXDEV, "cross-device")), \
+                mock.patch("fcntl.ioctl", side_effect=IOError(errno.ENOTTY, "ioctl")):
+            DataCustomizer._duplicate_data_dir(os.path.dirname(srcDir),
+                                               os.path.join(self.tmpdir, "symlinked"),
+                                               link=True)
+        symlinkedDir = os.path.join(self.tmpdir, "symlinked", "data")
+        for destDir in (dataDir, symlinkedDir):
+            schema = os.path.join(destDir, "schema", "Object.schema")
+            with open(schema) as f:
+                self.assertEqual(f.read(), "CREATE TABLE Object (id INT);")
+            # description is a private copy, which can be modified
+            description = os.path.join(destDir, "description.yaml")
+            self.assertFalse(os.path.islink(description))
+            self.assertFalse(os.path.samefile(description,
+                                              os.path.join(srcDir, "description.yaml")))
+        self.assertTrue(os.path.islink(os.path.join(symlinkedDir, "schema", "Object.schema")))
+        # downloaded files replace links, source dataset is not modified
+        self.assertEqual(sorted(os.listdir(srcDir)), ["description.yaml", "schema"])
+
+
 def suite():
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestDataCustomizer)
+    suite = unittest.TestSuite()
+    for testCase in (TestDataCustomizer, TestDownload):
+        suite.addTests(unittest.TestLoader().loadTestsFromTestCase(testCase))
     return suite
 
 
@@ -0,0 +1,81 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for reader of input data rows.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import dataRows
+
+
+class TestDataRows(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tmpdir, "partition"))
+        with open(os.path.join(self.tmpdir, "partition", "common.json"), 'w') as f:
+            json.dump({'in': {'csv': {'delimiter': ',', 'null': '\\N'}}}, f)
+        self.reader = dataRows.RowReader(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_split(self):
+        split = self.reader.split
+        self.assertEqual(split('1,,\\N'), ['1', '', '\\N'])
+        self.assertEqual(split('a\\,b,"c,d",e'), ['a\\,b', '"c,d"', 'e'])
+        # escaped end of line
+        self.assertIsNone(split('1,a\\'))
+
+    def test_blocks(self):
+        path = os.path.join(self.tmpdir, "T.csv.gz")
+        with gzip.open(path, 'wb') as f:
+            f.write(b"1,a\\\nb\n2,c\rd\xff\n3,e\r\n4,f")
+        blocks = list(self.reader.blocks(path, 2, block_rows=3))
+        self.assertEqual([len(block) for block in blocks], [3, 1])
+        self.assertEqual(blocks[0], [['1', 'a\\\nb'], ['2', 'c\rd\xff'], ['3', 'e\r']])
+        self.assertEqual(blocks[1], [['4', 'f']])
+
+        with self.assertRaises(ValueError):
+            list(self.reader.blocks(path, 1))
+        with self.assertRaises(ValueError):
+            list(self.reader.blocks(path, 6))
+
+    def test_default(self):
+        reader = dataRows.RowReader(os.path.join(self.tmpdir, "none"))
+        self.assertEqual(reader.delimiter, '\t')
+        self.assertEqual(reader.null, '\\N')
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestDataRows)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,176 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for writer of scaled copies of test datasets.
+"""
+import gzip
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import dataScaler
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_DESCRIPTION = """
+tables:
+    directors:          ['Object']
+    partitioned-tables: ['Object', 'Source']
+    load-order:         ['Filter', 'Object', 'Source']
+extensions:
+    data: '.tsv.gz'
+    schema: '.schema'
+"""
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestDataScaler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dataDir = os.path.join(self.tmpdir, "data")
+        for subdir in ("schema", "partition", "ingest"):
+            os.makedirs(os.path.join(self.dataDir, subdir))
+
+        def write(name, data):
+            with open(os.path.join(self.dataDir, name), 'w') as f:
+                f.write(data)
+
+        write("description.yaml", _DESCRIPTION)
+        write("partition/common.json", json.dumps({'in': {'csv': {'delimiter': '\t'}}}))
+        write("partition/Object.json", json.dumps(
+            {'id': 'objectId', 'pos': ['ra, decl'],
+             'in': {'csv': {'field': ['objectId', 'ra', 'decl', 'flux']}}}))
+        write("partition/Source.json", json.dumps(
+            {'id': 'sourceId', 'pos': ['raObject, declObject'],
+             'part': {'pos': 'raObject, declObject', 'id': 'objectId'},
+             'in': {'csv': {'field': ['sourceId', 'objectId', 'raObject',
+                                      'declObject', 'comment']}}}))
+        write("ingest/Source.json", json.dumps(
+            {'director_table': 'Object', 'director_key': 'objectId'}))
+        for table in ("Filter", "Object", "Source"):
+            write("schema/%s.schema" % table, "CREATE TABLE %s (id INT);" % table)
+        with gzip.open(os.path.join(self.dataDir, "Filter.tsv.gz"), 'wb') as f:
+            f.write(b"1\tu\n")
+        self.objects = [b"1\t10.5\t-5\t\\N\n",
+                        b"7\t359.99999\t89.99999\t1.5\n"]
+        self.sources = [b"3\t1\t10.5\t-5\tescaped\\\ttab\n",
+                        b"4\t7\t359.99999\t89.99999\t\\N\n",
+                        b"5\t\\N\t\\N\t\\N\t\xff\n"]
+        for table, rows in (("Object", self.objects), ("Source", self.sources)):
+            with gzip.open(os.path.join(self.dataDir, table + ".tsv.gz"), 'wb') as f:
+                f.writelines(rows)
+        self.outDir = os.path.join(self.tmpdir, "out")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _rows(self, table):
+        with gzip.open(os.path.join(self.outDir, table + ".tsv.gz"), 'rb') as f:
+            return [line.rstrip(b'\n').split(b'\t') for line in f.read().split(b'\n')
+                    if line]
+
+    def test_scale(self):
+        scaler = dataScaler.DataScaler(self.dataDir, block_rows=2)
+        self.assertEqual(scaler.scaledTables(), ['Object', 'Source'])
+        scaler.scale(self.outDir, 3)
+
+        objects = self._rows("Object")
+        self.assertEqual(len(objects), 6)
+        self.assertEqual(sorted(int(row[0]) for row in objects),
+                         [1, 7, 9, 15, 17, 23])
+        positions = dict((row[0], (float(row[1]), float(row[2]))) for row in objects)
+        for ra, decl in positions.values():
+            self.assertTrue(0 <= ra < 360 and -90 <= decl <= 90)
+        # original rows are kept in first copy
+        self.assertEqual(positions[b'1'], (10.5, -5.0))
+        self.assertNotEqual(positions[b'9'], (10.5, -5.0))
+        self.assertAlmostEqual(positions[b'9'][0], 10.5, delta=dataScaler.JITTER)
+        self.assertEqual(sorted(row[3] for row in objects),
+                         [b'1.5', b'1.5', b'1.5', b'\\N', b'\\N', b'\\N'])
+
+        sources = self._rows("Source")
+        self.assertEqual(len(sources), 9)
+        self.assertEqual(sorted(int(row[0]) for row in sources),
+                         [3, 4, 5, 9, 10, 11, 15, 16, 17])
+        for row in sources:
+            if row[1] == b'\\N':
+                self.assertEqual(row[2:], [b'\\N', b'\\N', b'\xff'])
+            else:
+                # children keep position of their director
+                self.assertEqual((float(row[2]), float(row[3])), positions[row[1]])
+        # escaped delimiter is not a field separator
+        self.assertEqual(sum(row[4:] == [b'escaped\\', b'tab'] for row in sources), 3)
+
+        with open(os.path.join(self.outDir, "Filter.tsv.gz"), 'rb') as f:
+            with open(os.path.join(self.dataDir, "Filter.tsv.gz"), 'rb') as g:
+                self.assertEqual(f.read(), g.read())
+        with open(os.path.join(self.outDir, "description.yaml")) as f:
+            description = yaml.safe_load(f)
+        self.assertEqual(description['scale']['factor'], 3)
+        self.assertEqual(description['tables']['directors'], ['Object'])
+
+    def test_unscaled(self):
+        dataScaler.DataScaler(self.dataDir).scale(self.outDir, 1)
+        self.assertEqual(self._rows("Object"),
+                         [row.rstrip(b'\n').split(b'\t') for row in self.objects])
+
+    def test_copiesByBlock(self):
+        scaler = dataScaler.DataScaler(self.dataDir)
+        layout = scaler._layout("Object")
+        layout.strides = {0: 8}
+        block = [row.decode().rstrip('\n').split('\t') for row in self.objects]
+        # copies are generated one at a time, even for a huge scale factor
+        copies = scaler._scaleBlock(block, layout, 10 ** 9)
+        first, second, third = itertools.islice(copies, 3)
+        self.assertEqual(first, b"".join(self.objects).decode())
+        self.assertEqual([line.split('\t')[0] for line in second.splitlines()],
+                         ['9', '15'])
+        self.assertEqual([line.split('\t')[0] for line in third.splitlines()],
+                         ['17', '23'])
+
+    def test_invalid(self):
+        scaler = dataScaler.DataScaler(self.dataDir)
+        with self.assertRaises(ValueError):
+            scaler.scale(self.outDir, 0)
+        with gzip.open(os.path.join(self.dataDir, "Object.tsv.gz"), 'wb') as f:
+            f.write(b"1\t10.5\n")
+        with self.assertRaises(ValueError):
+            scaler.scale(self.outDir, 2)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestDataScaler)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
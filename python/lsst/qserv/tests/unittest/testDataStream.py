@@ -0,0 +1,97 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for in-process concatenation of input data files.
+"""
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import dataStream
+
+
+class TestDataStream(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.sources = []
+        self.expected = b""
+        for i in range(3):
+            data = ("%d\tchunk %d\n" % (i, i)).encode() * (1000 * (i + 1))
+            path = os.path.join(self.tmpdir, "chunk_%04d.txt" % i)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.sources.append(path)
+            self.expected += data
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_concatenateFiles(self):
+        target = os.path.join(self.tmpdir, "table.txt")
+        for _ in range(2):
+            # target is replaced, not appended to
+            size = dataStream.concatenateFiles(self.sources, target)
+            self.assertEqual(size, len(self.expected))
+            with open(target, 'rb') as f:
+                self.assertEqual(f.read(), self.expected)
+        self.assertFalse(os.path.exists(target + ".tmp"))
+
+    def test_fileStream(self):
+        fifo = os.path.join(self.tmpdir, "table.txt")
+        with open(fifo, 'w') as f:
+            f.write("stale")
+        with dataStream.FileStream(self.sources, fifo):
+            with open(fifo, 'rb') as f:
+                data = f.read()
+        self.assertEqual(data, self.expected)
+        self.assertFalse(os.path.exists(fifo))
+
+    def test_gzipStream(self):
+        sources = []
+        for source in self.sources:
+            with open(source, 'rb') as f, gzip.open(source + ".gz", 'wb') as g:
+                g.write(f.read())
+            sources.append(source + ".gz")
+        fifo = os.path.join(self.tmpdir, "table.txt")
+        with dataStream.FileStream(sources, fifo, gzipped=True):
+            with open(fifo, 'rb') as f:
+                data = f.read()
+        self.assertEqual(data, self.expected)
+
+    def test_unreadStream(self):
+        fifo = os.path.join(self.tmpdir, "table.txt")
+        with dataStream.FileStream(self.sources, fifo):
+            pass
+        self.assertFalse(os.path.exists(fifo))
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestDataStream)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
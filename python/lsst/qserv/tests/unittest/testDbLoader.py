@@ -0,0 +1,280 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for database loader helpers.
+"""
+import gzip
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import types
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # python2
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import dataConfig
+from lsst.qserv.tests import dbLoader
+from lsst.qserv.tests import mysqlDbLoader
+from lsst.qserv.tests import qservDbLoader
+
+_TESTDATA_DIR = os.getenv("QSERV_TESTDATA_DIR",
+                          os.path.join(os.path.dirname(__file__), *[os.pardir] * 5))
+
+
+class TestDbLoader(unittest.TestCase):
+
+    def test_runOnNodes(self):
+        barrier = threading.Barrier(3, timeout=10)
+        timings = dbLoader.runOnNodes("test", [(node, barrier.wait)
+                                               for node in ("master", "w1", "w2")])
+        # barrier is only passed if all operations run simultaneously
+        self.assertEqual(sorted(timings), ["master", "w1", "w2"])
+
+    def test_errors(self):
+        done = []
+
+        def fail():
+            raise RuntimeError("unreachable")
+
+        tasks = [("w1", fail), ("w2", lambda: done.append("w2")), ("w3", fail)]
+        with self.assertRaises(dbLoader.NodeError) as cm:
+            dbLoader.runOnNodes("test", tasks)
+        self.assertEqual(sorted(cm.exception.errors), ["w1", "w3"])
+        self.assertEqual(done, ["w2"])
+
+    def test_noNode(self):
+        self.assertEqual(dbLoader.runOnNodes("test", []), {})
+
+    def test_loaderCmd(self):
+        class DataConfig(object):
+            dataDir = '/data'
+            duplicatedTables = []
+
+        config = {'qserv': {'master': 'master', 'tmp_dir': '/tmp'},
+                  'wmgr': {'port': '5012', 'secret': 's'}}
+        with mock.patch.object(dbLoader, 'WmgrClient'):
+            loader = dbLoader.DbLoader(config, DataConfig(), 'db', False, 'out', [])
+        loader.logger = mock.Mock()
+        loader.logger.getEffectiveLevel.return_value = logging.WARNING
+        opts = loader.loaderCommonOpts('Object')
+        opts['configFiles'] += ['Object.json']
+        opts.update(cssClear=True, workers=['w1', 'w2'], czars=['czar1'],
+                    emptyChunks='/tmp/empty.txt')
+        self.assertEqual(
+            loader.loaderCmd(opts, ['db', 'Object', 'Object.schema', 'Object.tsv']),
+            ['qserv-data-loader.py', '--config=/data/partition/common.json',
+             '--config=Object.json', '--host=master', '--port=5012',
+             '--secret=s', '--delete-tables', '--css-remove',
+             '--chunks-dir=/tmp/qserv_data_loader/Object',
+             '--empty-chunks=/tmp/empty.txt', '--worker', 'w1', '--worker', 'w2',
+             '-z', 'czar1', 'db', 'Object', 'Object.schema', 'Object.tsv'])
+
+        opts = loader.loaderCommonOpts('Filter')
+        opts.update(useCss=False, skipPart=True, oneTable=True, chunksDir=None)
+        self.assertEqual(
+            loader.loaderCmd(opts, ['db', 'Filter', 'Filter.schema']),
+            ['qserv-data-loader.py', '--config=/data/partition/common.json',
+             '--host=master', '--port=5012', '--secret=s', '--delete-tables',
+             '--skip-partition', '--one-table', '--no-css',
+             'db', 'Filter', 'Filter.schema'])
+
+    def test_inProcess(self):
+        loads = []
+
+        class DataLoader(object):
+            def __init__(self, configFiles, czarWmgr, **kwargs):
+                self.kwargs = kwargs
+
+            def load(self, database, table, schema, data):
+                loads.append((database, table, schema, data,
+                              self.kwargs['css'], self.kwargs['skipPart']))
+
+        module = types.ModuleType('lsst.qserv.admin.dataLoader')
+        module.DataLoader = DataLoader
+        config = {'qserv': {'master': 'master', 'tmp_dir': '/tmp'},
+                  'wmgr': {'port': '5012', 'secret': 's'}}
+        with mock.patch.dict(sys.modules, {'lsst.qserv.admin.dataLoader': module}), \
+                mock.patch.object(dbLoader, 'WmgrClient'), \
+                mock.patch.object(dbLoader.commons, 'run_command') as runCommand:
+            loader = dbLoader.DbLoader(config, None, 'db', False, 'out', [],
+                                       in_process=True)
+            for table in ('Filter', 'Science_Ccd_Exposure'):
+                opts = dict(configFiles=['common.json'], useCss=False,
+                            chunksDir=None, skipPart=True, oneTable=True,
+                            cssClear=False, emptyChunks=None, deleteTables=True,
+                            workers=[], czars=[])
+                loader._load(opts, ['db', table, table + '.schema', table + '.tsv'])
+            self.assertFalse(runCommand.called)
+        self.assertEqual(loads, [
+            ('db', 'Filter', 'Filter.schema', ['Filter.tsv'], None, True),
+            ('db', 'Science_Ccd_Exposure', 'Science_Ccd_Exposure.schema',
+             ['Science_Ccd_Exposure.tsv'], None, True)])
+
+    def test_inProcessCzars(self):
+        config = {'qserv': {'master': 'master', 'tmp_dir': '/tmp'},
+                  'wmgr': {'port': '5012', 'secret': 's'}}
+        with mock.patch.object(dbLoader, 'WmgrClient'):
+            with self.assertRaises(ValueError):
+                dbLoader.DbLoader(config, None, 'db', False, 'out', ['czar1'],
+                                  in_process=True)
+
+    def test_streamInput(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        for table in ('Object', 'Filter'):
+            with gzip.open(os.path.join(tmpdir, table + '.tsv.gz'), 'wb') as f:
+                f.write(("1\t%s\n" % table).encode() * 1000)
+
+        class DataConfig(object):
+            dataDir = tmpdir
+            duplicatedTables = []
+            partitionedTables = ['Object']
+
+            def getSchemaFile(self, table):
+                return table + '.schema'
+
+            def getInputDataFile(self, table):
+                return os.path.join(tmpdir, table + '.tsv.gz')
+
+        staging = mock.Mock()
+        staging.path.side_effect = lambda table: table + '.tsv'
+        config = {'qserv': {'master': 'master', 'tmp_dir': tmpdir},
+                  'wmgr': {'port': '5012', 'secret': 's'}}
+        with mock.patch.object(dbLoader, 'WmgrClient'):
+            loader = dbLoader.DbLoader(config, DataConfig(), 'db', False, 'out', [],
+                                       input_staging=staging, stream_input=True)
+
+        # partitioner reads staged input data file
+        self.assertFalse(loader.streamsInput('Object'))
+        self.assertEqual(loader.loaderCmdCommonArgs('Object')[-1], 'Object.tsv')
+
+        self.assertTrue(loader.streamsInput('Filter'))
+        loaderArgs = loader.loaderCmdCommonArgs('Filter')
+        fifo = os.path.join(tmpdir, 'out', 'input', 'Filter.tsv')
+        self.assertEqual(loaderArgs[-1], fifo)
+        data = []
+
+        def load(opts, args):
+            with open(args[-1], 'rb') as f:
+                data.append(f.read())
+
+        with mock.patch.object(loader, '_load', side_effect=load):
+            loader.runLoader('Filter', {}, loaderArgs)
+        self.assertEqual(data, [b"1\tFilter\n" * 1000])
+        self.assertFalse(os.path.exists(fifo))
+
+        # all tables are streamed if loader does not partition them
+        loader.partitions = False
+        self.assertTrue(loader.streamsInput('Object'))
+
+    def test_streamInputReplicated(self):
+        class DataConfig(object):
+            duplicatedTables = []
+            partitionedTables = ['Object']
+
+            def getInputDataFile(self, table):
+                return table + '.tsv.gz'
+
+        config = {'qserv': {'master': 'master', 'tmp_dir': '/tmp'},
+                  'wmgr': {'port': '5012', 'secret': 's'}}
+        with mock.patch.object(dbLoader, 'WmgrClient'):
+            loader = dbLoader.DbLoader(config, DataConfig(), 'db', False, 'out',
+                                       ['czar1'], stream_input=True)
+        # regular table is loaded on master and on czar, named pipe would be
+        # read twice
+        self.assertFalse(loader.streamsInput('Filter'))
+        loader.partitions = False
+        self.assertTrue(loader.streamsInput('Filter'))
+
+    def test_streamInputDataset(self):
+        dataReader = dataConfig.DataConfig(os.path.join(_TESTDATA_DIR, 'datasets',
+                                                        'case01', 'data'))
+        tables = set(dataReader.orderedTables)
+        regularTables = tables - set(dataReader.partitionedTables)
+        self.assertIn('Filter', regularTables)
+        config = {'qserv': {'master': 'master', 'tmp_dir': '/tmp',
+                            'qserv_data_dir': '/qserv/data'},
+                  'wmgr': {'port': '5012', 'secret': 's'}, 'css': {}}
+
+        def streamed(loaderClass, multiNode):
+            with mock.patch.object(dbLoader, 'WmgrClient'), \
+                    mock.patch.object(dbLoader, 'css'), \
+                    mock.patch.object(dbLoader, 'nodeMgmt'):
+                loader = loaderClass(config, dataReader, 'db', multiNode, 'out',
+                                     stream_input=True)
+            return set(table for table in tables if loader.streamsInput(table))
+
+        # all tables are streamed to MySQL, which does not partition them
+        self.assertEqual(streamed(mysqlDbLoader.MysqlLoader, False), tables)
+        self.assertEqual(streamed(mysqlDbLoader.MysqlLoader, True), tables)
+        # partitioner reads a regular file
+        self.assertEqual(streamed(qservDbLoader.QservLoader, False), regularTables)
+        # regular tables are loaded on each worker
+        self.assertEqual(streamed(qservDbLoader.QservLoader, True), set())
+
+    def test_prepareDatabase(self):
+        calls = []
+
+        def wmgrClient(host, **kwargs):
+            wmgr = mock.Mock()
+            wmgr.host = host
+            wmgr.dropDb.side_effect = lambda db, mustExist: calls.append(('drop', host))
+            wmgr.createDb.side_effect = lambda db: calls.append(('create', host))
+            return wmgr
+
+        node = mock.Mock()
+        node.name.return_value = 'w1'
+        node.wmgrClient.return_value = wmgrClient('w1')
+        config = {'qserv': {'master': 'master', 'tmp_dir': '/tmp',
+                            'qserv_data_dir': '/qserv/data'},
+                  'wmgr': {'port': '5012', 'secret': 's'}, 'css': {}}
+        with mock.patch.object(dbLoader, 'WmgrClient', side_effect=wmgrClient), \
+                mock.patch.object(dbLoader, 'css'), \
+                mock.patch.object(dbLoader, 'nodeMgmt') as nodeMgmt:
+            nodeMgmt.NodeMgmt.return_value.select.return_value = [node]
+            # master host is also a czar
+            loader = qservDbLoader.QservLoader(config, None, 'db', True, 'out',
+                                               ['master', 'czar2'])
+        with mock.patch.object(loader, 'dropCssDatabase',
+                               side_effect=lambda: calls.append(('css', None))):
+            loader.prepareDatabase()
+        # CSS database is dropped first, MySQL database is re-created once per host
+        self.assertEqual(calls[0], ('css', None))
+        self.assertEqual(sorted(calls[1:]),
+                         [('create', 'czar2'), ('create', 'master'), ('create', 'w1'),
+                          ('drop', 'czar2'), ('drop', 'master'), ('drop', 'w1')])
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestDbLoader)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,86 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for bounded-memory file sort.
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import externalSort
+
+
+class TestExternalSort(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "result.txt")
+        rng = random.Random(1)
+        self.lines = [b"objectId\tra\n"]
+        self.lines += [("{}\t{}\n".format(rng.randint(0, 1000), rng.random())).encode()
+                       for _ in range(500)]
+        with open(self.filename, 'wb') as f:
+            f.writelines(self.lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _sorted(self):
+        with open(self.filename, 'rb') as f:
+            return f.readlines()
+
+    def test_in_memory(self):
+        externalSort.sortFile(self.filename)
+        self.assertEqual(self._sorted(), sorted(self.lines))
+
+    def test_runs(self):
+        externalSort.sortFile(self.filename, max_memory=200)
+        self.assertEqual(self._sorted(), sorted(self.lines))
+        # temporary files are removed
+        self.assertEqual(os.listdir(self.tmpdir), ["result.txt"])
+
+    def test_multipass(self):
+        maxRuns = externalSort.MAX_RUNS
+        externalSort.MAX_RUNS = 3
+        try:
+            externalSort.sortFile(self.filename, max_memory=100)
+        finally:
+            externalSort.MAX_RUNS = maxRuns
+        self.assertEqual(self._sorted(), sorted(self.lines))
+
+    def test_no_final_newline(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b"b\nc\na")
+        externalSort.sortFile(self.filename, max_memory=2)
+        self.assertEqual(self._sorted(), [b"a\n", b"b\n", b"c\n"])
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestExternalSort)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,230 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for loader using the ingest HTTP API, run against a local
+stand-in of the ingest service.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer  # python2
+    from SocketServer import ThreadingMixIn
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import ingestLoader
+from lsst.qserv.tests.dataConfig import DataConfig
+
+_DESCRIPTION = """
+tables:
+    directors:          ['Object']
+    partitioned-tables: ['Object']
+extensions:
+    data: '.tsv'
+    schema: '.schema'
+duplicate:
+    tables: ['Object']
+"""
+
+
+class _IngestService(ThreadingMixIn, HTTPServer):
+    """Stand-in of replication controller and worker ingest services.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _IngestHandler)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.contributions = []
+        self.failTable = None
+        self.transactions = 0
+
+    def location(self, **kwargs):
+        return dict(kwargs, http_host='127.0.0.1', http_port=self.server_port)
+
+
+class _IngestHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, result):
+        body = json.dumps(dict(result, success=1 if result.get('error') is None else 0)
+                          ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers['Content-Length']))
+
+    def _handle(self):
+        service = self.server
+        body = self._body()
+        path = self.path.split('?')[0]
+        if path == '/ingest/csv':
+            return self._reply(self._contribution(body))
+        data = json.loads(body.decode('utf-8')) if body else {}
+        with service.lock:
+            service.calls.append((self.command, self.path, data))
+            if self.command == 'DELETE':
+                return self._reply(dict(error="no such database"))
+            if path == '/ingest/trans' and self.command == 'POST':
+                service.transactions += 1
+                return self._reply({'databases': {data['database']: {
+                    'transactions': [{'id': service.transactions}]}}})
+            if path == '/ingest/regular':
+                return self._reply({'locations': [service.location(worker='w1'),
+                                                  service.location(worker='w2')]})
+            if path == '/ingest/chunks':
+                return self._reply({'locations': [service.location(chunk=chunk)
+                                                  for chunk in data['chunks']]})
+        return self._reply({})
+
+    def _contribution(self, body):
+        boundary = self.headers['Content-Type'].split('boundary=')[1]
+        fields = {}
+        for part in body.split(('--' + boundary).encode())[1:-1]:
+            headers, value = part[2:-2].split(b'\r\n\r\n', 1)
+            name = headers.decode().split('name="')[1].split('"')[0]
+            fields[name] = value if name == 'rows' else value.decode()
+        service = self.server
+        with service.lock:
+            if fields['table'] == service.failTable:
+                return dict(error="cannot load contribution")
+            service.contributions.append((fields['transaction_id'], fields['table'],
+                                          int(fields['chunk']), int(fields['overlap']),
+                                          fields['fields_terminated_by'],
+                                          fields['rows']))
+        return {}
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+class TestIngestLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        dataDir = os.path.join(self.tmpdir, "data")
+        for subdir in ("schema", "partition", "ingest"):
+            os.makedirs(os.path.join(dataDir, subdir))
+
+        def write(name, data):
+            with open(os.path.join(dataDir, name), 'w') as f:
+                f.write(data)
+
+        write("description.yaml", _DESCRIPTION)
+        write("partition/common.json", json.dumps(
+            {'part': {'chunk': 'chunkId', 'sub-chunk': 'subChunkId'},
+             'in': {'csv': {'delimiter': '\t'}},
+             'out': {'csv': {'delimiter': ',', 'no-quote': True}}}))
+        write("ingest/database.json", json.dumps(
+            {'auth_key': 'secret', 'database': 'db', 'num_stripes': 85}))
+        for table, partitioned in (('Object', 1), ('Filter', 0)):
+            write("schema/%s.schema" % table, "CREATE TABLE %s (id INT);" % table)
+            write(table + ".tsv", "1\t%s\n" % table)
+            write("ingest/%s.json" % table, json.dumps(
+                {'auth_key': 'secret', 'database': 'db', 'table': table,
+                 'is_partitioned': partitioned, 'schema': []}))
+
+        # chunks written by duplicator
+        chunksDir = os.path.join(self.tmpdir, "out", "chunks", "Object")
+        os.makedirs(chunksDir)
+        for name in ("chunk_0012.txt", "chunk_0012_overlap.txt",
+                     "chunk_0034.txt", "Object.txt"):
+            with open(os.path.join(chunksDir, name), 'w') as f:
+                f.write(name + "\n")
+
+        self.service = _IngestService()
+        thread = threading.Thread(target=self.service.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        config = {'qserv': {'tmp_dir': self.tmpdir, 'master': '127.0.0.1'},
+                  'ingest': {'url': 'http://127.0.0.1:%s' % self.service.server_port}}
+        self.loader = ingestLoader.IngestLoader(config, DataConfig(dataDir),
+                                                "qservTest_db", "out")
+
+    def tearDown(self):
+        self.service.shutdown()
+        self.service.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def _calls(self):
+        return [(method, path) for method, path, _ in self.service.calls]
+
+    def test_load(self):
+        self.loader.prepareDatabase()
+        self.loader.createLoadTable('Object')
+        self.loader.createLoadTable('Filter')
+        self.loader.finalize()
+
+        self.assertEqual(self._calls(), [
+            ('DELETE', '/ingest/database/qservTest_db'),
+            ('POST', '/ingest/database'),
+            ('POST', '/ingest/table'),
+            ('POST', '/ingest/trans'),
+            ('POST', '/ingest/chunks'),
+            ('PUT', '/ingest/trans/1?abort=0'),
+            ('POST', '/ingest/table'),
+            ('POST', '/ingest/trans'),
+            ('GET', '/ingest/regular?transaction_id=2'),
+            ('PUT', '/ingest/trans/2?abort=0'),
+            ('PUT', '/ingest/database/qservTest_db')])
+        for _, _, data in self.service.calls:
+            self.assertEqual(data['auth_key'], 'secret')
+        table = self.service.calls[2][2]
+        self.assertEqual(table['database'], 'qservTest_db')
+        self.assertEqual(table['chunk_id_key'], 'chunkId')
+
+        self.assertEqual(sorted(self.service.contributions), [
+            ('1', 'Object', 12, 0, ',', b"chunk_0012.txt\n"),
+            ('1', 'Object', 12, 1, ',', b"chunk_0012_overlap.txt\n"),
+            ('1', 'Object', 34, 0, ',', b"chunk_0034.txt\n"),
+            ('2', 'Filter', 0, 0, '\t', b"1\tFilter\n"),
+            ('2', 'Filter', 0, 0, '\t', b"1\tFilter\n")])
+
+    def test_abort(self):
+        self.service.failTable = 'Filter'
+        self.loader.prepareDatabase()
+        with self.assertRaises(ingestLoader.IngestError):
+            self.loader.createLoadTable('Filter')
+        self.assertEqual(self._calls()[-1], ('PUT', '/ingest/trans/1?abort=1'))
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestIngestLoader)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
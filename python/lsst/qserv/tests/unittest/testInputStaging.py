@@ -0,0 +1,102 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for staging of decompressed input data files.
+"""
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import inputStaging
+
+
+class _DataConfig(object):
+    """Dataset with compressed, uncompressed and view tables.
+    """
+
+    def __init__(self, data_dir):
+        self.dataDir = data_dir
+
+    def getInputDataFile(self, table):
+        files = {'Object': 'Object.tsv.gz', 'Source': 'Source.tsv.gz',
+                 'Filter': 'Filter.tsv'}
+        if table in files:
+            return os.path.join(self.dataDir, files[table])
+        return None
+
+
+class TestInputStaging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = {}
+        for table in ('Object', 'Source'):
+            self.data[table] = ("%s\t1\n" % table).encode() * 1000
+            with gzip.open(os.path.join(self.tmpdir, table + '.tsv.gz'), 'wb') as f:
+                f.write(self.data[table])
+        with open(os.path.join(self.tmpdir, 'Filter.tsv'), 'w') as f:
+            f.write("1\n")
+        self.stagingDir = os.path.join(self.tmpdir, "staging")
+        self.staging = inputStaging.InputStaging(_DataConfig(self.tmpdir),
+                                                 self.stagingDir)
+
+    def tearDown(self):
+        self.staging.evict()
+        shutil.rmtree(self.tmpdir)
+
+    def test_path(self):
+        self.staging.prefetch(['Object', 'Source', 'Filter', 'View'])
+        for table in ('Object', 'Source'):
+            path = self.staging.path(table)
+            self.assertEqual(path, os.path.join(self.stagingDir, table + '.tsv'))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), self.data[table])
+        self.assertEqual(self.staging.path('Filter'),
+                         os.path.join(self.tmpdir, 'Filter.tsv'))
+        self.assertIsNone(self.staging.path('View'))
+
+    def test_decompressOnce(self):
+        path = self.staging.path('Object')
+        mtime = os.stat(path).st_mtime
+        os.utime(path, (mtime - 100, mtime - 100))
+        self.assertEqual(self.staging.path('Object'), path)
+        self.assertEqual(os.stat(path).st_mtime, mtime - 100)
+
+    def test_evict(self):
+        path = self.staging.path('Source')
+        self.staging.evict()
+        self.assertFalse(os.path.exists(self.stagingDir))
+        # staged again after eviction
+        self.assertEqual(self.staging.path('Source'), path)
+        self.assertTrue(os.path.exists(path))
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestInputStaging)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,123 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for closed-loop load generator.
+"""
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import loadGenerator
+
+
+class _FakeCmd(object):
+    """Record executed queries, fail queries containing 'FAIL'.
+    """
+
+    def __init__(self, executed, lock):
+        self._executed = executed
+        self._lock = lock
+
+    def execute(self, query, output, column_names, async_timeout):
+        time.sleep(0.001)
+        with self._lock:
+            self._executed.append((query, column_names, async_timeout))
+        status = 1 if 'FAIL' in query else 0
+        return dict(status=status, rows=0, bytes=0, first_byte_time=None)
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_steps(self):
+        self.assertEqual(loadGenerator.concurrencySteps(1), [1])
+        self.assertEqual(loadGenerator.concurrencySteps(8), [1, 2, 4, 8])
+        self.assertEqual(loadGenerator.concurrencySteps(6), [1, 2, 4, 6])
+        self.assertRaises(ValueError, loadGenerator.concurrencySteps, 0)
+
+    def test_mix(self):
+        filename = os.path.join(self.tmpdir, "mix.yaml")
+        with open(filename, 'w') as f:
+            f.write("queries:\n  0001_a.sql: 3\n  0002_b.sql: 1\n")
+        self.assertEqual(loadGenerator.loadMix(filename),
+                         {'0001_a.sql': 3, '0002_b.sql': 1})
+        with open(filename, 'w') as f:
+            f.write("queries:\n  0001_a.sql: -1\n")
+        self.assertRaises(ValueError, loadGenerator.loadMix, filename)
+
+    def test_choice(self):
+        choice = loadGenerator.WeightedChoice({'a': 3, 'b': 1, 'c': 0})
+        self.assertEqual(choice.items, ['a', 'b'])
+        rng = random.Random(1)
+        picks = [choice.pick(rng) for _ in range(4000)]
+        self.assertNotIn('c', picks)
+        self.assertAlmostEqual(picks.count('a') / len(picks), 0.75, delta=0.05)
+        self.assertRaises(ValueError, loadGenerator.WeightedChoice, {'a': 0})
+
+    def test_sweep(self):
+        executed = []
+        lock = threading.Lock()
+        queries = {'0001_a.sql': ("SELECT 1", {}),
+                   '0002_b.sql': ("SELECT FAIL", {'noheader': None})}
+        generator = loadGenerator.LoadGenerator(
+            lambda: _FakeCmd(executed, lock), queries,
+            async_timeout=lambda pragmas: 600, seed=1)
+        results = generator.sweep([1, 2], 0.05)
+
+        self.assertEqual([r['concurrency'] for r in results], [1, 2])
+        for r in results:
+            self.assertGreater(r['queries'], 0)
+            self.assertGreater(r['failed'], 0)
+            self.assertGreater(r['throughput'], 0)
+            self.assertLessEqual(r['p50'], r['p99'])
+        self.assertIn(("SELECT FAIL", False, 600), executed)
+        self.assertIn(("SELECT 1", True, 600), executed)
+
+        prefix = os.path.join(self.tmpdir, "load_qserv")
+        loadGenerator.writeResults(results, prefix)
+        self.assertTrue(os.path.exists(prefix + ".json"))
+        with open(prefix + ".csv") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_unknown_query(self):
+        self.assertRaises(ValueError, loadGenerator.LoadGenerator,
+                          lambda: None, {'0001_a.sql': ("SELECT 1", {})},
+                          {'0003_c.sql': 1})
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLoadGenerator)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,111 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for table loading scheduler.
+"""
+import threading
+import time
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import loadScheduler
+
+
+class _DataConfig(object):
+    """Dataset description with one director and one child table.
+    """
+
+    def getDirectorTables(self, table):
+        return ['Object'] if table == 'Source' else []
+
+
+class TestLoadScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.active = 0
+        self.maxActive = 0
+
+    def _loadTable(self, table):
+        with self.lock:
+            self.active += 1
+            self.maxActive = max(self.maxActive, self.active)
+            self.events.append(('start', table))
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+            self.events.append(('end', table))
+
+    def test_graph(self):
+        tables = ['Source', 'Object', 'Filter']
+        self.assertEqual(loadScheduler.loadGraph(_DataConfig(), tables),
+                         {'Source': set(['Object']), 'Object': set(),
+                          'Filter': set()})
+        # director already loaded
+        self.assertEqual(loadScheduler.loadGraph(_DataConfig(), ['Source']),
+                         {'Source': set()})
+
+    def test_runLoads(self):
+        tables = ['Source', 'Object', 'Filter', 'LeapSeconds']
+        graph = loadScheduler.loadGraph(_DataConfig(), tables)
+        loadScheduler.runLoads(tables, graph, self._loadTable, jobs=2)
+        self.assertEqual(self.maxActive, 2)
+        # first table is loaded alone
+        self.assertEqual(self.events[:2], [('start', 'Object'), ('end', 'Object')])
+        self.assertLess(self.events.index(('end', 'Object')),
+                        self.events.index(('start', 'Source')))
+        self.assertEqual(sorted(t for e, t in self.events if e == 'end'),
+                         sorted(tables))
+
+    def test_serial(self):
+        tables = ['Object', 'Filter', 'LeapSeconds']
+        graph = loadScheduler.loadGraph(_DataConfig(), tables)
+        loadScheduler.runLoads(tables, graph, self._loadTable)
+        self.assertEqual(self.maxActive, 1)
+        self.assertEqual([t for e, t in self.events if e == 'start'], tables)
+
+    def test_failure(self):
+        def loadTable(table):
+            if table == 'Object':
+                raise RuntimeError("load failed")
+            self._loadTable(table)
+
+        tables = ['Object', 'Source', 'Filter']
+        graph = loadScheduler.loadGraph(_DataConfig(), tables)
+        with self.assertRaises(RuntimeError):
+            loadScheduler.runLoads(tables, graph, loadTable, jobs=1)
+        self.assertEqual(self.events, [])
+
+    def test_cycle(self):
+        graph = {'A': set(['B']), 'B': set(['A'])}
+        with self.assertRaises(ValueError):
+            loadScheduler.runLoads(['A', 'B'], graph, self._loadTable)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLoadScheduler)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
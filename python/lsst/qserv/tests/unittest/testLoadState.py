@@ -0,0 +1,118 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for incremental loading state.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests.dataConfig import DataConfig
+from lsst.qserv.tests.fileDigest import FileDigests
+from lsst.qserv.tests.loadState import LoadState
+
+_DESCRIPTION = """
+tables:
+    directors:          ['Object']
+    partitioned-tables: ['Object', 'Source']
+extensions:
+    data: '.tsv'
+    schema: '.schema'
+"""
+
+
+class TestLoadState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dataDir = os.path.join(self.tmpdir, "data")
+        for subdir in ("schema", "partition"):
+            os.makedirs(os.path.join(self.dataDir, subdir))
+        self._write("description.yaml", _DESCRIPTION)
+        for table in ("Object", "Source", "Filter"):
+            self._write(os.path.join("schema", table + ".schema"),
+                        "CREATE TABLE %s (id INT);\n" % table)
+            self._write(table + ".tsv", "1\n")
+        self._write(os.path.join("partition", "Object.json"), "{}")
+        self.dataConfig = DataConfig(self.dataDir)
+        self.stateFile = os.path.join(self.tmpdir, "load_state.json")
+        self.digests = FileDigests(os.path.join(self.tmpdir, "digests.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, data):
+        with open(os.path.join(self.dataDir, name), 'w') as f:
+            f.write(data)
+
+    def _fingerprints(self, state, version=1):
+        return dict((table, state.tableFingerprint(self.dataConfig, table,
+                                                   ['mysql', version]))
+                    for table in self.dataConfig.orderedTables)
+
+    def test_tablesToLoad(self):
+        state = LoadState(self.stateFile, self.digests)
+        fingerprints = self._fingerprints(state)
+        self.assertFalse(state.knows("db"))
+        state.reset("db")
+        self.assertEqual(state.tablesToLoad(self.dataConfig, "db", fingerprints),
+                         set(["Object", "Source", "Filter"]))
+
+        # interrupted load
+        state.record("db", "Object", fingerprints["Object"])
+        state.record("db", "Filter", fingerprints["Filter"])
+        state = LoadState(self.stateFile, self.digests)
+        self.assertEqual(state.tablesToLoad(self.dataConfig, "db", fingerprints),
+                         set(["Source"]))
+        state.record("db", "Source", fingerprints["Source"])
+        self.assertEqual(state.tablesToLoad(self.dataConfig, "db", fingerprints),
+                         set())
+
+        # partitioning of director changed: its partitioned tables are reloaded
+        self._write(os.path.join("partition", "Object.json"), '{"part": 1}')
+        fingerprints = self._fingerprints(state)
+        self.assertEqual(state.tablesToLoad(self.dataConfig, "db", fingerprints),
+                         set(["Object", "Source"]))
+
+        # new loader version reloads everything
+        self.assertEqual(state.tablesToLoad(self.dataConfig, "db",
+                                            self._fingerprints(state, 2)),
+                         set(["Object", "Source", "Filter"]))
+
+    def test_data_change(self):
+        state = LoadState(self.stateFile, self.digests)
+        before = self._fingerprints(state)
+        self._write("Filter.tsv", "1\n2\n")
+        after = self._fingerprints(state)
+        self.assertNotEqual(before["Filter"], after["Filter"])
+        self.assertEqual(before["Object"], after["Object"])
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLoadState)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,89 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for detached queries poller.
+"""
+import threading
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests.sql import poller
+
+
+class _Server(object):
+    """Fake server, query N completes after N status checks.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetchStates(self, qids):
+        with self._lock:
+            self.calls.append(list(qids))
+            count = len(self.calls)
+        return dict((qid, 'COMPLETED' if count >= qid else 'EXECUTING')
+                    for qid in qids)
+
+
+class TestPoller(unittest.TestCase):
+
+    def test_batch(self):
+        server = _Server()
+        asyncPoller = poller.AsyncPoller(server.fetchStates, initial_delay=0.001,
+                                         max_delay=0.01)
+        for qid in (1, 2, 3):
+            asyncPoller.register(qid, 60)
+        finished = []
+        while True:
+            res = asyncPoller.waitAny()
+            if res is None:
+                break
+            finished.append(res)
+        self.assertEqual(sorted(finished),
+                         [(1, 'COMPLETED'), (2, 'COMPLETED'), (3, 'COMPLETED')])
+        # one status query for all outstanding queries
+        self.assertEqual(server.calls[0], [1, 2, 3])
+        self.assertTrue(len(server.calls) <= 4)
+
+    def test_wait_timeout(self):
+        asyncPoller = poller.AsyncPoller(lambda qids: {}, initial_delay=0.001,
+                                         max_delay=0.01)
+        asyncPoller.register(7, 0.05)
+        self.assertEqual(asyncPoller.wait(7), poller.TIMEOUT)
+        self.assertEqual(asyncPoller.pending(), 0)
+
+    def test_error(self):
+        def fetchStates(qids):
+            raise RuntimeError("server gone")
+        asyncPoller = poller.AsyncPoller(fetchStates, initial_delay=0.001)
+        asyncPoller.register(5, 60)
+        self.assertEqual(asyncPoller.wait(5), poller.ERROR)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestPoller)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,103 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for pooled in-process SQL executor.
+"""
+import io
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests.sql import const
+from lsst.qserv.tests.sql.pooledCmd import ConnectionPool, PooledCmd, formatRow
+from lsst.qserv.tests.sql.resultWriter import QueryError
+
+_CONFIG = {'mysqld': {'socket': '/tmp/mysql.sock', 'user': 'root', 'pass': 'x'}}
+
+
+class _Connection(object):
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestPooledCmd(unittest.TestCase):
+
+    def test_formatRow(self):
+        self.assertEqual(formatRow([b'1', None, b'abc']), b'1\tNULL\tabc\n')
+        self.assertEqual(formatRow([b'a\tb', b'c\nd', b'e\\f', b'g\0h']),
+                         b'a\\tb\tc\\nd\te\\\\f\tg\\0h\n')
+        self.assertEqual(formatRow(['objectId', 'ra_PS']), b'objectId\tra_PS\n')
+
+    def test_write(self):
+        out = io.BytesIO()
+        PooledCmd._write(['a', 'b'], [(b'1', b'2'), (b'3', None)], out, True)
+        self.assertEqual(out.getvalue(), b'a\tb\n1\t2\n3\tNULL\n')
+
+        out = io.BytesIO()
+        PooledCmd._write(['a', 'b'], [(b'1', b'2')], out, False)
+        self.assertEqual(out.getvalue(), b'1\t2\n')
+
+        # like mysql client, empty result set prints nothing
+        out = io.BytesIO()
+        PooledCmd._write(['a', 'b'], [], out, True)
+        self.assertEqual(out.getvalue(), b'')
+
+    def test_pool(self):
+        pool = ConnectionPool(_Connection, size=1)
+        conn1 = pool.acquire()
+        conn2 = pool.acquire()
+        self.assertIsNot(conn1, conn2)
+        pool.release(conn1)
+        # pool is full, second connection is closed
+        pool.release(conn2)
+        self.assertTrue(conn2.closed)
+        self.assertIs(pool.acquire(), conn1)
+        pool.release(conn1, broken=True)
+        self.assertTrue(conn1.closed)
+
+    def test_failure(self):
+        def query(query):
+            raise Exception(1064, "You have an error in your SQL syntax")
+
+        sqlCmd = PooledCmd(_CONFIG, const.MYSQL_SOCK, 'db')
+        sqlCmd._query = query
+        with self.assertRaises(QueryError) as cm:
+            sqlCmd._run("SELECT", io.BytesIO(), True)
+        self.assertEqual(cm.exception.status, 1064)
+        self.assertIn("SQL syntax", str(cm.exception))
+
+        sqlCmd = PooledCmd(_CONFIG, const.MYSQL_SOCK, 'db', keep_going=True)
+        sqlCmd._query = query
+        stats = sqlCmd._run("SELECT", io.BytesIO(), True)
+        self.assertEqual(stats['status'], 1064)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestPooledCmd)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,111 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for compiled query corpus.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import queryCorpus
+
+_QUERY = """-- fetch one object
+-- pragma sortresult async_timeout=60
+SELECT  objectId,   ra
+FROM {DBTAG_A}Object o -- noQserv
+-- withQserv FROM Object o, Source s
+WHERE o.objectId = 1
+"""
+
+
+class TestQueryCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.queriesDir = os.path.join(self.tmpdir, "queries")
+        os.mkdir(self.queriesDir)
+        self._write("0001_fetch.sql", _QUERY)
+        self._write("0002_broken.sql.FIXME", "SELECT 1")
+        self._write("1001_other.sql", "SELECT 2 FROM Source")
+        self.manifest = os.path.join(self.tmpdir, "queries.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, data):
+        with open(os.path.join(self.queriesDir, name), 'w') as f:
+            f.write(data)
+
+    def _corpus(self):
+        return queryCorpus.QueryCorpus(self.queriesDir, self.manifest,
+                                       ['Object', 'Source', 'Filter'])
+
+    def test_parse(self):
+        text, pragmas = queryCorpus.parseQuery(_QUERY.splitlines(), False)
+        self.assertEqual(text, "SELECT objectId, ra FROM {DBTAG_A}Object o  "
+                         "WHERE o.objectId = 1")
+        self.assertEqual(pragmas, {'sortresult': None, 'async_timeout': '60'})
+        text, _ = queryCorpus.parseQuery(_QUERY.splitlines(), True)
+        self.assertEqual(text, "SELECT objectId, ra FROM Object o, Source s "
+                         "WHERE o.objectId = 1")
+
+    def test_corpus(self):
+        corpus = self._corpus()
+        self.assertEqual([e['file'] for e in corpus.entries],
+                         ["0001_fetch.sql", "0002_broken.sql.FIXME",
+                          "1001_other.sql"])
+        self.assertEqual(corpus.select(1000), ["0001_fetch.sql"])
+        self.assertEqual(corpus.select(10000), ["0001_fetch.sql", "1001_other.sql"])
+        self.assertEqual(corpus.disabled(), {"0002_broken.sql.FIXME": "marked as FIXME"})
+
+        entry = corpus.entry("0001_fetch.sql")
+        self.assertEqual(entry['id'], 1)
+        self.assertEqual(entry['tables'], ['Object', 'Source'])
+        text, pragmas = corpus.query("0001_fetch.sql", True)
+        self.assertEqual(text, "SELECT objectId, ra FROM Object o, Source s "
+                         "WHERE o.objectId = 1")
+        pragmas['noheader'] = None
+        self.assertNotIn('noheader', corpus.query("0001_fetch.sql", True)[1])
+
+    def test_manifest(self):
+        self._corpus().entries
+        self.assertTrue(os.path.exists(self.manifest))
+
+        # unchanged files are not parsed again
+        parsed = []
+        corpus = self._corpus()
+        compileFile = corpus._compileFile
+        corpus._compileFile = lambda qFN: parsed.append(qFN) or compileFile(qFN)
+        self._write("1001_other.sql", "SELECT 3 FROM Filter f")
+        self.assertEqual(corpus.entry("1001_other.sql")['tables'], ['Filter'])
+        self.assertEqual(parsed, ["1001_other.sql"])
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestQueryCorpus)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
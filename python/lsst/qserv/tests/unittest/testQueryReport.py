@@ -0,0 +1,82 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for query measurements report.
+"""
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import queryReport
+
+
+class TestQueryReport(unittest.TestCase):
+
+    def test_percentile(self):
+        values = [4., 1., 3., 2., 5.]
+        self.assertEqual(queryReport.percentile(values, 50), 3.)
+        self.assertEqual(queryReport.percentile(values, 100), 5.)
+        self.assertAlmostEqual(queryReport.percentile(values, 95), 4.8)
+        self.assertIsNone(queryReport.percentile([], 50))
+
+    def test_report(self):
+        report = queryReport.QueryReport()
+        stats = dict(status=0, rows=2, bytes=12, first_byte_time=10.5)
+        report.add('qserv', '0002_b.sql', {}, 10., 11., stats)
+        report.add('qserv', '0001_a.sql', {'sortresult': None}, 10., 12., stats)
+        report.add('mysql', '0001_a.sql', {}, 10., 10.5,
+                   dict(status=1, rows=0, bytes=0, first_byte_time=None))
+
+        summary = report.summary()
+        self.assertEqual(summary['qserv']['queries'], 2)
+        self.assertEqual(summary['qserv']['rows'], 4)
+        self.assertEqual(summary['qserv']['wall_time']['max'], 2.)
+        self.assertEqual(summary['mysql']['failed'], 1)
+        self.assertEqual(summary['mysql']['time_to_first_byte']['count'], 0)
+
+        out_dir = tempfile.mkdtemp()
+        try:
+            report.write(out_dir)
+            with open(os.path.join(out_dir, "report.json")) as f:
+                data = json.load(f)
+            self.assertEqual([(r['mode'], r['query']) for r in data['queries']],
+                             [('mysql', '0001_a.sql'), ('qserv', '0001_a.sql'),
+                              ('qserv', '0002_b.sql')])
+            with open(os.path.join(out_dir, "report.csv")) as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual(rows[1]['pragmas'], 'sortresult')
+            self.assertEqual(float(rows[1]['time_to_first_byte']), 0.5)
+        finally:
+            shutil.rmtree(out_dir)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestQueryReport)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
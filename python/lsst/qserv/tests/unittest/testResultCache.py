@@ -0,0 +1,114 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for content-addressed query result cache.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock  # python2
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests.fileDigest import FileDigests
+from lsst.qserv.tests.resultCache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dataDir = os.path.join(self.tmpdir, "data")
+        os.makedirs(os.path.join(self.dataDir, "schema"))
+        self._write(os.path.join(self.dataDir, "Object.tsv"), "1\t2\n")
+        self._write(os.path.join(self.dataDir, "schema", "Object.schema"),
+                    "CREATE TABLE Object (id INT, ra DOUBLE);\n")
+        self.queries = [("0001_a.sql", "SELECT * FROM db.Object", {})]
+        self.cache = ResultCache(os.path.join(self.tmpdir, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    @staticmethod
+    def _write(filename, data):
+        with open(filename, 'w') as f:
+            f.write(data)
+
+    def test_key(self):
+        key = self.cache.key(self.dataDir, self.queries)
+        self.assertEqual(ResultCache(os.path.join(self.tmpdir, "cache"))
+                         .key(self.dataDir, self.queries), key)
+        self.assertNotEqual(self.cache.key(self.dataDir, self.queries, 'x'), key)
+
+        queries = [("0001_a.sql", "SELECT * FROM db.Object", {'sortresult': None})]
+        self.assertNotEqual(self.cache.key(self.dataDir, queries), key)
+
+        self._write(os.path.join(self.dataDir, "schema", "Object.schema"),
+                    "CREATE TABLE Object (id BIGINT, ra DOUBLE);\n")
+        self.assertNotEqual(self.cache.key(self.dataDir, self.queries), key)
+
+    def test_store_restore(self):
+        key = self.cache.key(self.dataDir, self.queries)
+        outputs = os.path.join(self.tmpdir, "outputs")
+        os.mkdir(outputs)
+        self._write(os.path.join(outputs, "0001_a.txt"), "id\n1\n")
+        manifest = os.path.join(self.tmpdir, "manifest.json")
+        self._write(manifest, "{}")
+
+        restored = os.path.join(self.tmpdir, "restored")
+        self.assertFalse(self.cache.restore(key, restored, {}))
+        self.cache.store(key, outputs, {"manifest.json": manifest})
+        # second store is a no-op
+        self.cache.store(key, outputs, {"manifest.json": manifest})
+
+        restoredManifest = os.path.join(self.tmpdir, "manifest2.json")
+        self.assertTrue(self.cache.restore(key, restored,
+                                           {"manifest.json": restoredManifest}))
+        self.assertEqual(os.listdir(restored), ["0001_a.txt"])
+        with open(restoredManifest) as f:
+            self.assertEqual(f.read(), "{}")
+
+    def test_sharedDigests(self):
+        fileDigests = FileDigests(os.path.join(self.tmpdir, "file_digests.json"))
+        path = os.path.join(self.dataDir, "Object.tsv")
+        digest = fileDigests.digest(path)
+        cache = ResultCache(os.path.join(self.tmpdir, "cache"), fileDigests)
+        with mock.patch("hashlib.sha256", wraps=hashlib.sha256) as sha256:
+            key = cache.key(self.dataDir, self.queries)
+        # digest of data file is not computed again, only schema and key ones
+        self.assertEqual(sha256.call_count, 2)
+        self.assertEqual(key, self.cache.key(self.dataDir, self.queries))
+        self.assertEqual(fileDigests.digest(path), digest)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestResultCache)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,96 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for streaming result comparison.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import resultComparator
+
+
+class TestResultComparator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.left = os.path.join(self.tmpdir, "mysql")
+        self.right = os.path.join(self.tmpdir, "qserv")
+        os.mkdir(self.left)
+        os.mkdir(self.right)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, dirname, name, data):
+        filename = os.path.join(dirname, name)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return filename
+
+    def test_files(self):
+        left = self._write(self.left, "a.txt", b"id\tra\tdecl\n1\t2.5\t3\n2\t4\t5\n")
+        right = self._write(self.right, "a.txt", b"id\tra\tdecl\n1\t2.5\t3\n2\t4\t6\n")
+        mismatch = resultComparator.compareFiles(left, right)
+        self.assertEqual((mismatch['row'], mismatch['column']), (3, 3))
+        self.assertEqual((mismatch['left'], mismatch['right']),
+                         (b"2\t4\t5", b"2\t4\t6"))
+        self.assertEqual(resultComparator.describe(mismatch),
+                         "row 3 column 3: {!r} != {!r}".format(b"2\t4\t5", b"2\t4\t6"))
+
+        self.assertIsNone(resultComparator.compareFiles(left, left))
+
+        shorter = self._write(self.right, "b.txt", b"id\tra\tdecl\n1\t2.5\t3\n")
+        mismatch = resultComparator.compareFiles(left, shorter)
+        self.assertEqual(mismatch['row'], 3)
+        self.assertIsNone(mismatch['column'])
+        self.assertIsNone(mismatch['right'])
+
+        fewerColumns = self._write(self.right, "c.txt", b"id\tra\n")
+        mismatch = resultComparator.compareFiles(left, fewerColumns)
+        self.assertEqual((mismatch['row'], mismatch['column']), (1, 3))
+
+    def test_dirs(self):
+        for name in ("0001.txt", "0002.txt", "0003.txt"):
+            self._write(self.left, name, b"x\n1\n")
+        self._write(self.right, "0001.txt", b"x\n1\n")
+        self._write(self.right, "0002.txt", b"x\n2\n")
+        self._write(self.right, "0004.txt", b"x\n1\n")
+        mismatches = resultComparator.compareDirs(self.left, self.right,
+                                                  parallel=2)
+        self.assertEqual(sorted(mismatches), ["0002.txt", "0003.txt", "0004.txt"])
+        self.assertEqual(mismatches["0002.txt"]['row'], 2)
+        self.assertEqual(mismatches["0003.txt"]['reason'],
+                         resultComparator.MISSING_RIGHT)
+        self.assertEqual(mismatches["0004.txt"]['reason'],
+                         resultComparator.MISSING_LEFT)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestResultComparator)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
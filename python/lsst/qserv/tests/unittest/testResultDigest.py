@@ -0,0 +1,103 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsstcorp.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for query result digests and manifests.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests.resultManifest import ResultManifest
+from lsst.qserv.tests.sql.resultDigest import ResultDigest
+
+
+def _digest(*chunks):
+    digest = ResultDigest()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest
+
+
+class TestResultDigest(unittest.TestCase):
+
+    def test_digest(self):
+        data = b"id\tra\n1\t2.5\n2\t3.5\n"
+        digest = _digest(data)
+        self.assertEqual(digest.ordered, hashlib.sha256(data).hexdigest())
+
+        # chunk boundaries do not matter
+        split = _digest(b"id\tr", b"a\n1", b"\t2.5\n2\t3.5\n")
+        self.assertEqual(split.ordered, digest.ordered)
+        self.assertEqual(split.multiset, digest.multiset)
+
+        # row order only matters for ordered digest
+        swapped = _digest(b"id\tra\n2\t3.5\n1\t2.5\n")
+        self.assertNotEqual(swapped.ordered, digest.ordered)
+        self.assertEqual(swapped.multiset, digest.multiset)
+
+        # but duplicated rows do
+        self.assertNotEqual(_digest(b"a\na\n").multiset, _digest(b"a\n").multiset)
+        self.assertNotEqual(_digest(b"a\nb").multiset, _digest(b"a\n").multiset)
+
+    def test_manifest(self):
+        stats = dict(status=0, rows=2, bytes=20)
+        ordered = _digest(b"1\n2\n")
+        swapped = _digest(b"2\n1\n")
+
+        mysql = ResultManifest()
+        qserv = ResultManifest()
+        for manifest, digest in ((mysql, ordered), (qserv, swapped)):
+            stats.update(digest=digest.ordered, multiset_digest=digest.multiset)
+            manifest.add('0001_sorted.sql', {'sortresult': None}, stats)
+            manifest.add('0002_unsorted.sql', {}, stats)
+        mysql.add('0003_mysql.sql', {}, stats)
+        self.assertEqual(mysql.diff(qserv), ['0002_unsorted.sql', '0003_mysql.sql'])
+
+        # queries failing in either mode differ, even with identical output
+        failed = dict(status=1, rows=0, bytes=0, digest=ordered.ordered,
+                      multiset_digest=ordered.multiset)
+        mysql.add('0004_failed.sql', {}, failed)
+        qserv.add('0004_failed.sql', {}, failed)
+        mysql.add('0005_qserv_failed.sql', {}, stats)
+        qserv.add('0005_qserv_failed.sql', {}, failed)
+        self.assertEqual(mysql.diff(qserv), ['0002_unsorted.sql', '0003_mysql.sql',
+                                             '0004_failed.sql', '0005_qserv_failed.sql'])
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "manifest_mysql.json")
+            mysql.write(filename)
+            self.assertEqual(ResultManifest.read(filename).entries, mysql.entries)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestResultDigest)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())
@@ -0,0 +1,69 @@
+# LSST Data Management System
+# Copyright 2019 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Unit tests for timing statistics and baseline comparison.
+"""
+import unittest
+
+from lsst.qserv.admin import logger
+from lsst.qserv.tests import queryReport
+from lsst.qserv.tests import timingBaseline
+
+
+class TestTimingBaseline(unittest.TestCase):
+
+    def test_describe(self):
+        stats = queryReport.describe([1., 2., 3., 4.])
+        self.assertEqual(stats['count'], 4)
+        self.assertEqual(stats['mean'], 2.5)
+        self.assertEqual(stats['median'], 2.5)
+        self.assertAlmostEqual(stats['stddev'], 1.2909944)
+        self.assertEqual(queryReport.describe([2.])['stddev'], 0.)
+
+    def test_regressions(self):
+        samples = {'qserv': {'0001_a.sql': [1., 1., 1.],
+                             '0002_b.sql': [2., 2., 2.]}}
+        baseline = timingBaseline.buildTimings("01", 3, 1, samples)
+        self.assertEqual(baseline['modes']['qserv']['case']['median'], 3.)
+
+        samples['qserv']['0002_b.sql'] = [2.1, 2.1, 2.1]
+        timings = timingBaseline.buildTimings("01", 3, 1, samples)
+        self.assertEqual(timingBaseline.findRegressions(timings, baseline), [])
+
+        samples['qserv']['0001_a.sql'] = [1.5, 1.5, 1.5]
+        timings = timingBaseline.buildTimings("01", 3, 1, samples)
+        regressions = timingBaseline.findRegressions(timings, baseline)
+        self.assertEqual([r['query'] for r in regressions],
+                         [timingBaseline.CASE, '0001_a.sql'])
+        self.assertAlmostEqual(regressions[0]['change'], 0.2)
+        self.assertAlmostEqual(regressions[1]['change'], 0.5)
+        self.assertEqual(len(timingBaseline.findRegressions(timings, baseline,
+                                                            threshold=0.3)), 1)
+
+
+def suite():
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestTimingBaseline)
+    return suite
+
+
+if __name__ == '__main__':
+    logger.setup_logging(logger.get_default_log_conf())
+    unittest.TextTestRunner(verbosity=2).run(suite())